@@ -0,0 +1,247 @@
+"""
+Native async versions of the market-data views.
+
+They return the same payloads as their counterparts in views.py, but wait on
+Polygon with ``polygon.aget`` and on the database with the async ORM, so one
+ASGI worker can keep many upstream requests in flight at once. urls.py routes
+to them when ``MARKET_DATA_ASYNC_VIEWS`` is on (the default under asgi.py).
+
+``async_api_view`` gives them the same DRF request handling as
+``@api_view``: authentication, permissions, throttling and content
+negotiation run first, and responses are rendered by the same renderers, so
+both versions answer with identical bodies.
+"""
+import asyncio
+import inspect
+import traceback
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import grades, market_data, polygon, quotes, scheduler, timeframes
+from .serializers import MonthlyGradeSerializer
+from .symbols import normalize_symbol
+from .views import (
+    EMPTY_GRADE,
+    INDEX_ETFS,
+    MARKET_DATA_UNAVAILABLE,
+    SECTOR_ETFS,
+    STOCK_SECTION_DEFAULTS,
+    _build_hot_stocks,
+    _build_index_prices,
+    _build_search_results,
+    _build_sector_performance,
+    _build_stock_detail,
+    _extract_stock_section,
+    _hot_stock_movers,
+    _hot_stock_sectors,
+    _hot_stocks_query,
+    _hot_stocks_request,
+    _mark_stale,
+    _search_request,
+    _stock_bars,
+    _stock_detail_requests,
+)
+
+
+class AsyncAPIView(APIView):
+    """
+    ``APIView`` whose handlers are coroutines. ``initial`` (authentication,
+    permissions, throttling, content negotiation) may query the database, so
+    it runs in a thread; the handler runs on the event loop.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def async_api_view(http_method_names):
+    """
+    ``@api_view`` for coroutine functions.
+    """
+    def decorator(func):
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        attrs = {method.lower(): handler for method in http_method_names}
+        attrs["http_method_names"] = [method.lower() for method in http_method_names] + ["options"]
+        attrs["__doc__"] = func.__doc__
+        attrs["__module__"] = func.__module__
+        return type(func.__name__, (AsyncAPIView,), attrs).as_view()
+    return decorator
+
+
+# Helper utilities
+async def _aget_closes(etf_map):
+    """
+    Map each key of ``etf_map`` to its ETF's (latest_close, prev_close).
+    """
+    quoted = await quotes.abatch_last_two_closes(etf_map.values())
+    return {key: quoted[symbol] for key, symbol in etf_map.items()}
+
+
+async def _aget_stock_section(name: str, req):
+    path, params, endpoint = req
+    return _extract_stock_section(
+        name, await polygon.aget(path, params, endpoint=endpoint)
+    )
+
+
+async def _aindex_prices_payload():
+    with polygon.track_staleness() as report:
+        closes = await _aget_closes(INDEX_ETFS)
+    results = _build_index_prices(closes)
+    _mark_stale(results.values(), report)
+    return results
+
+
+async def _asector_performance_payload():
+    with polygon.track_staleness() as report:
+        closes = await _aget_closes(SECTOR_ETFS)
+    results = _build_sector_performance(closes)
+    _mark_stale(results, report)
+    return results
+
+
+async def _ahot_stocks_payload(list_name, in_predictions):
+    path, params = _hot_stocks_request()
+    with polygon.track_staleness() as report:
+        data = await polygon.aget(path, params, endpoint="market_snapshot")
+    prediction_snapshot = None
+    if in_predictions:
+        prediction_snapshot = await sync_to_async(timeframes.get(timeframes.DEFAULT).snapshot)()
+    movers = _hot_stock_movers(data, in_predictions, prediction_snapshot).top(
+        list_name, settings.HOT_STOCKS_MAX_COUNT
+    )
+
+    latest = await grades.alatest_grades(mover.symbol for mover in movers)
+    grade_classes = {
+        mover.symbol: grades.grade_class(latest.get(mover.symbol))
+        for mover in movers
+    }
+    hot_list = _build_hot_stocks(
+        movers, grade_classes, _hot_stock_sectors(movers, prediction_snapshot)
+    )
+    _mark_stale(hot_list, report)
+    return hot_list
+
+
+# Index prices (Dow, S&P, Nasdaq via ETFs)
+@async_api_view(["GET"])
+@polygon.priority(scheduler.DASHBOARD)
+async def get_index_prices(request):
+    try:
+        results = await market_data.aread(market_data.INDEX_PRICES, _aindex_prices_payload)
+        if results is None:
+            return Response(MARKET_DATA_UNAVAILABLE, status=503)
+        return Response(results)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+
+# Hot stocks snapshot
+@async_api_view(["GET"])
+@polygon.priority(scheduler.DASHBOARD)
+async def get_hot_stocks(request):
+    try:
+        query = _hot_stocks_query(request.GET)
+        if query is None:
+            return Response({"error": "Invalid hot stocks filter"}, status=400)
+        list_name, count, in_predictions = query
+
+        hot_list = await market_data.aread(
+            market_data.hot_stocks_key(list_name, in_predictions),
+            lambda: _ahot_stocks_payload(list_name, in_predictions),
+        )
+        if hot_list is None:
+            return Response(MARKET_DATA_UNAVAILABLE, status=503)
+        return Response(hot_list[:max(count, 0)])
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+
+# Sector ETF performance
+@async_api_view(["GET"])
+@polygon.priority(scheduler.DASHBOARD)
+async def get_sector_performance(request):
+    try:
+        results = await market_data.aread(
+            market_data.SECTOR_PERFORMANCE, _asector_performance_payload
+        )
+        if results is None:
+            return Response(MARKET_DATA_UNAVAILABLE, status=503)
+        return Response(results)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+
+# Stock detail
+@async_api_view(["GET"])
+@polygon.priority(scheduler.INTERACTIVE)
+async def stock_detail(request, symbol):
+    try:
+        symbol = normalize_symbol(symbol)
+        calls = {
+            name: _aget_stock_section(name, req)
+            for name, req in _stock_detail_requests(symbol).items()
+        }
+        # The bar store read (a file read, or a sync when it is stale) and
+        # the grade query run while the upstream calls are in flight.
+        with polygon.track_staleness() as report:
+            fetched, bars, latest = await asyncio.gather(
+                polygon.agather(calls, STOCK_SECTION_DEFAULTS),
+                asyncio.to_thread(_stock_bars, symbol),
+                grades.alatest_grades([symbol]),
+            )
+        mg = latest.get(symbol)
+        grade = MonthlyGradeSerializer(mg).data if mg else EMPTY_GRADE
+
+        # Computing the indicators is CPU work; keep it off the event loop.
+        payload = await asyncio.to_thread(_build_stock_detail, symbol, fetched, bars, grade)
+        _mark_stale([payload], report)
+        return Response(payload)
+    except Exception as e:
+        traceback.print_exc()
+        return Response({"error": str(e)}, status=500)
+
+
+# Symbol search
+@async_api_view(["GET"])
+@polygon.priority(scheduler.SEARCH)
+async def search_stocks(request):
+    query = request.GET.get("query", "").strip()
+    if not query:
+        return Response([])
+
+    try:
+        path, params = _search_request(query)
+        with polygon.track_staleness() as report:
+            data = await polygon.aget(path, params, endpoint="search")
+        results = _build_search_results(data)
+        _mark_stale(results, report)
+        return Response(results)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
@@ -0,0 +1,269 @@
+"""
+Local store of daily OHLCV bars, synced incrementally from Polygon.
+
+Each symbol's bars live in ``BAR_STORE_DIR/<SYMBOL>.npy``: one float64 array
+of shape (6, n) whose rows are the columns ``t`` (epoch ms), ``o``, ``h``,
+``l``, ``c`` and ``v``, sorted by ``t``. Files are opened memory-mapped, so a
+date range is a zero-copy slice of contiguous columns.
+
+Only the newest bar changes during a session, so a sync fetches the bars
+from the last complete stored one onwards and rewrites the file
+atomically. Polygon's bars are split- and dividend-adjusted: when the close
+it now returns for that complete bar differs from the stored one, the whole
+history has been re-adjusted and is fetched again instead. The file
+counts as fresh until ``upstream_cache.expiry_for("aggs", <file mtime>)``,
+which applies the same market-hours rules as the response cache: the aggs
+TTL while the market is open, until the next open otherwise. When Polygon
+is unavailable the stored bars are served as they are, and a stale
+response from the upstream cache is never written or counted as a sync.
+"""
+import functools
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+
+from . import market_hours, polygon
+from .upstream_cache import expiry_for
+
+FIELDS = ("t", "o", "h", "l", "c", "v")
+T, O, H, L, C, V = range(len(FIELDS))
+
+EMPTY = np.empty((len(FIELDS), 0))
+EMPTY.flags.writeable = False
+
+logger = logging.getLogger(__name__)
+
+# Relative difference between a stored close and Polygon's current one
+# above which the history counts as re-adjusted. Well below any dividend,
+# well above float noise.
+READJUSTED_TOLERANCE = 1e-6
+
+_valid_symbol = re.compile(r"^[A-Z0-9.\-]{1,10}$")
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _lock(symbol: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(symbol, threading.Lock())
+
+
+def path_for(symbol: str) -> str:
+    if not _valid_symbol.match(symbol):
+        raise ValueError(f"Invalid symbol: {symbol!r}")
+    return os.path.join(settings.BAR_STORE_DIR, f"{symbol}.npy")
+
+
+def load(symbol: str) -> np.ndarray:
+    """
+    Return the stored bars of ``symbol`` memory-mapped read-only, or
+    ``EMPTY``.
+    """
+    try:
+        return np.load(path_for(symbol), mmap_mode="r")
+    except FileNotFoundError:
+        return EMPTY
+
+
+def _is_fresh(path: str) -> bool:
+    try:
+        synced_at = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+    return time.time() < expiry_for("aggs", synced_at)
+
+
+def _fetch(symbol: str, start: date, end: date) -> np.ndarray:
+    body = polygon.get(
+        f"/v2/aggs/ticker/{symbol}/range/1/day/{start}/{end}",
+        {"adjusted": "true", "sort": "asc", "limit": 50000},
+        endpoint="aggs",
+    )
+    if body.get("status") not in ("OK", "DELAYED"):
+        raise ValueError(f"Polygon aggs for {symbol} failed: {body.get('error') or body.get('status')}")
+    results = body.get("results") or []
+    bars = np.array(
+        [[bar.get(field, np.nan) for bar in results] for field in FIELDS], dtype=np.float64
+    )
+    return bars.reshape(len(FIELDS), len(results))
+
+
+def _version_path() -> str:
+    return os.path.join(settings.BAR_STORE_DIR, ".version")
+
+
+def version() -> int:
+    """
+    A value that changes whenever a sync adds or changes completed daily
+    bars of any symbol (the mtime of a marker file), so caches built from
+    many symbols' completed bars can tell when to rebuild. Rewriting the
+    partial bar of an open session leaves it alone.
+    """
+    try:
+        return os.stat(_version_path()).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _write(path: str, bars: np.ndarray):
+    """
+    Replace ``path`` atomically, so readers keep whichever version they
+    mapped.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(bars))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _bump_version():
+    with open(_version_path(), "a"):
+        pass
+    os.utime(_version_path())
+
+
+def _same(a: np.ndarray, b: np.ndarray) -> bool:
+    return a.shape == b.shape and np.array_equal(a, b, equal_nan=True)
+
+
+def _day(t: float) -> date:
+    return datetime.fromtimestamp(t / 1000, market_hours.MARKET_TZ).date()
+
+
+def _readjusted(stored: np.ndarray, fresh: np.ndarray) -> bool:
+    """
+    True if ``fresh`` (fetched from the day of ``stored``'s last complete
+    bar, the one before its newest) no longer has that bar's stored close,
+    i.e. Polygon has re-adjusted the history for a split or dividend.
+    """
+    if stored.shape[1] < 2 or not fresh.shape[1]:
+        return False
+    t, close = stored[T, -2], stored[C, -2]
+    i = np.searchsorted(fresh[T], t)
+    if i == fresh.shape[1] or fresh[T, i] != t:
+        return True
+    return not np.isclose(fresh[C, i], close, rtol=READJUSTED_TOLERANCE, atol=0)
+
+
+def sync(symbol: str) -> np.ndarray:
+    """
+    Fetch the bars of ``symbol`` not yet stored (re-fetching the newest
+    stored one, which may have been partial, and the complete one before
+    it) and return the updated bars. If Polygon has re-adjusted the history
+    since, the full history is fetched and replaces the stored bars.
+    """
+    path = path_for(symbol)
+    with _lock(symbol):
+        if _is_fresh(path):
+            return load(symbol)
+        stored = load(symbol)
+        today = market_hours.now().date()
+        history_start = today - timedelta(days=settings.BAR_STORE_HISTORY_DAYS)
+        if stored.shape[1]:
+            start = _day(stored[T, max(stored.shape[1] - 2, 0)])
+        else:
+            start = history_start
+        with polygon.track_staleness() as report:
+            fresh = _fetch(symbol, start, today)
+            readjusted = _readjusted(stored, fresh)
+            if readjusted:
+                logger.info("Bars of %s were re-adjusted upstream, re-fetching them", symbol)
+                fresh = _fetch(symbol, history_start, today)
+        if report.stale:
+            # Polygon was unavailable; keep the file due for another sync.
+            return stored
+
+        if readjusted:
+            bars = fresh
+        elif fresh.shape[1]:
+            keep = stored[:, stored[T] < fresh[T, 0]]
+            bars = np.concatenate([keep, fresh], axis=1)
+        else:
+            bars = stored
+        if not os.path.exists(path) or not _same(bars, stored):
+            # Also written when empty, so a symbol without bars counts as
+            # synced too.
+            _write(path, bars)
+            completed = market_hours.last_completed_day()
+            if not _same(between(bars, end=completed), between(stored, end=completed)):
+                _bump_version()
+        else:
+            os.utime(path)
+        return load(symbol)
+
+
+def sync_all(symbols) -> dict:
+    """
+    Sync the stale ones of ``symbols`` concurrently on the Polygon fan-out
+    pool. Returns symbol -> exception for the ones that failed.
+    """
+    calls, failed = {}, {}
+    for symbol in symbols:
+        try:
+            if not _is_fresh(path_for(symbol)):
+                calls[symbol] = functools.partial(sync, symbol)
+        except ValueError as e:
+            failed[symbol] = e
+    for symbol, future in polygon.submit_all(calls).items():
+        try:
+            future.result()
+        except Exception as e:
+            failed[symbol] = e
+    return failed
+
+
+def bars(symbol: str, start: date = None, end: date = None) -> np.ndarray:
+    """
+    Return the (6, n) bars of ``symbol`` with ``start <= day <= end`` as a
+    view of the memory-mapped file, syncing first if it is stale. Falls
+    back to the stored bars when the upstream is unavailable.
+    """
+    try:
+        path = path_for(symbol)
+    except ValueError:
+        return EMPTY
+    stored = None
+    if not _is_fresh(path):
+        try:
+            stored = sync(symbol)
+        except Exception:
+            logger.warning("Bar sync failed for %s, serving stored bars", symbol, exc_info=True)
+    if stored is None:
+        stored = load(symbol)
+
+    return between(stored, start, end)
+
+
+def between(bars: np.ndarray, start: date = None, end: date = None) -> np.ndarray:
+    """
+    Return the bars with ``start <= day <= end`` as a view of ``bars``.
+    """
+    lo, hi = 0, bars.shape[1]
+    if start is not None:
+        lo = np.searchsorted(bars[T], _epoch_ms(start), side="left")
+    if end is not None:
+        hi = np.searchsorted(bars[T], _epoch_ms(end + timedelta(days=1)), side="left")
+    return bars[:, lo:hi]
+
+
+def _epoch_ms(day: date) -> float:
+    return (np.datetime64(day, "ms") - np.datetime64(0, "ms")).astype(np.float64)
+
+
+def dates(bars: np.ndarray) -> list:
+    """
+    ISO dates (UTC) of the bars, as ``_build_chart_data`` formats them.
+    """
+    return bars[T].astype("datetime64[ms]").astype("datetime64[D]").astype(str).tolist()
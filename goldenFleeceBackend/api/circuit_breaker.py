@@ -0,0 +1,75 @@
+"""
+Circuit breaker for upstream calls.
+
+After ``failure_threshold`` consecutive failures the breaker opens and callers
+stop contacting the upstream for ``reset_timeout`` seconds. It then lets a
+single probe call through (half-open): success closes the breaker again,
+failure re-opens it for another ``reset_timeout``. A probe that ends without
+a verdict (cancelled) hands the slot back, and one that has not reported
+within ``probe_timeout`` seconds is presumed lost, so another caller may
+probe.
+"""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float,
+                 probe_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = reset_timeout if probe_timeout is None else probe_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Return True if the caller may contact the upstream now.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if (
+                self.state == OPEN and now - self.opened_at >= self.reset_timeout
+                or self.state == HALF_OPEN and now - self.probe_started >= self.probe_timeout
+            ):
+                # Let exactly one probe through; everyone else keeps failing fast.
+                self.state = HALF_OPEN
+                self.probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """
+        Record that an allowed call ended without an outcome (e.g. it was
+        cancelled). A half-open probe goes back to OPEN with its reset
+        timeout already elapsed, so the next caller probes again.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
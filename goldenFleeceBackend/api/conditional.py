@@ -0,0 +1,132 @@
+"""
+Conditional GET and rendered-body caching for the snapshot-backed
+prediction endpoints.
+
+Their responses only change when the prediction snapshot does, so the ETag
+is the snapshot's validator plus a digest of the request variant (path,
+query string and Accept header), and Last-Modified is when the snapshot was
+loaded. ``snapshot_conditional`` goes inside ``@api_view``, so
+authentication and throttling run first; a matching If-None-Match /
+If-Modified-Since is then answered with a 304 before the view runs. Otherwise the rendered body, and a gzip copy, are cached per
+ETag, so repeat requests for the same batch skip serialization and
+compression entirely.
+"""
+import gzip
+import hashlib
+import math
+import re
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .upstream_cache import MISSING, TTLCache
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+# Bodies shorter than this are not worth compressing.
+GZIP_MIN_LENGTH = 200
+
+_bodies = None
+_bodies_lock = threading.Lock()
+
+
+def get_body_cache() -> TTLCache:
+    global _bodies
+    if _bodies is None:
+        with _bodies_lock:
+            if _bodies is None:
+                _bodies = TTLCache(settings.PREDICTION_RESPONSE_CACHE_ENTRIES)
+    return _bodies
+
+
+def representation_etag(snapshot, request) -> str:
+    """
+    Weak ETag for this request's representation of ``snapshot``. Weak, as
+    the same entity is sent identity- or gzip-encoded.
+    """
+    variant = "{}?{}|{}".format(
+        request.path,
+        sorted(request.GET.lists()),
+        request.headers.get("Accept", ""),
+    )
+    digest = hashlib.blake2b(variant.encode(), digest_size=8).hexdigest()
+    return f'W/"{snapshot.etag}-{digest}"'
+
+
+def _from_cache(request, entry):
+    content_type, body, compressed = entry
+    if compressed is not None and _accepts_gzip.search(request.headers.get("Accept-Encoding", "")):
+        response = HttpResponse(compressed, content_type=content_type)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(body, content_type=content_type)
+    return response
+
+
+def _cacheable(response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.has_header("Content-Encoding")
+    )
+
+
+def _render(request, response):
+    """
+    Render the view's DRF ``Response``, which ``@api_view`` has not
+    finalized yet, with the renderer negotiated for ``request``.
+    """
+    view = request.parser_context["view"]
+    response = view.finalize_response(request, response)
+    response.render()
+    return response
+
+
+def snapshot_conditional(snapshot_func):
+    """
+    Decorate a GET view, below ``@api_view``, whose output depends only on
+    the request and on the ``PredictionSnapshot`` returned by
+    ``snapshot_func(request)``. When that returns None (bad parameters, no
+    data) the view runs unconditionally.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            snapshot = snapshot_func(request) if request.method in ("GET", "HEAD") else None
+            if not snapshot:
+                return view(request, *args, **kwargs)
+
+            etag = representation_etag(snapshot, request)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=snapshot.last_modified
+            )
+            if response is None:
+                bodies = get_body_cache()
+                entry = bodies.get(etag)
+                if entry is not MISSING:
+                    response = _from_cache(request, entry)
+                else:
+                    response = view(request, *args, **kwargs)
+                    if _cacheable(response):
+                        if hasattr(response, "render"):
+                            response = _render(request, response)
+                        body = response.content
+                        compressed = gzip.compress(body) if len(body) >= GZIP_MIN_LENGTH else None
+                        entry = (response["Content-Type"], body, compressed)
+                        bodies.set(etag, entry, expires_at=math.inf)
+                        response = _from_cache(request, entry)
+
+            if response.status_code in (200, 304):
+                response.headers["ETag"] = etag
+                response.headers["Last-Modified"] = http_date(snapshot.last_modified)
+            patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,146 @@
+"""
+Read-only fast path for the prediction serializers.
+
+The ``Preds*Serializer`` classes are ``ModelSerializer``s with
+``fields = '__all__'``: every row costs a model instance plus a
+``to_representation`` call per field. ``FastSerializer`` compiles a
+serializer class once into (name, converter) pairs and builds the same
+dicts straight from ``values_list()`` tuples, so the rendered JSON is
+byte-identical to DRF's.
+
+Converters mirror the DRF fields for database-typed values: None stays None,
+floats/ints/strings are coerced as DRF does, dates use ``isoformat`` (DRF's
+default ISO 8601 format), bools pass through ``bool`` and Decimals are
+quantized with a context built once instead of per value. Anything else
+calls the DRF field's own ``to_representation``. Serializer fields without a
+model column (``current_price``) are skipped, as DRF skips non-required
+fields missing from the instance.
+"""
+import decimal
+from datetime import date
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+def _decimal_converter(field):
+    """
+    ``DecimalField.to_representation`` for the default settings (coerced to a
+    string, not localized or normalized), with the quantize exponent and
+    context precomputed.
+    """
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(exponent, rounding=rounding, context=context))
+
+    return convert
+
+
+def _converter(field):
+    if type(field) is serializers.FloatField:
+        return float
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.BooleanField:
+        # Database bit columns come back as bool (or 0/1), where DRF's
+        # TRUE_VALUES/FALSE_VALUES lookup reduces to bool().
+        return bool
+    if (
+        type(field) is serializers.DecimalField
+        and field.decimal_places is not None
+        and getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+        and not field.localize
+        and not field.normalize_output
+    ):
+        return _decimal_converter(field)
+    if type(field) is serializers.DateField:
+        output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+        if output_format is not None and output_format.lower() == ISO_8601:
+            return date.isoformat
+    return field.to_representation
+
+
+class FastSerializer:
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        columns = {f.attname for f in model._meta.concrete_fields}
+        compiled = [
+            (name, field.source, _converter(field))
+            for name, field in serializer_class().fields.items()
+            if not field.write_only and field.source in columns
+        ]
+        self.names = tuple(name for name, _, _ in compiled)
+        # Pass these to values_list() to get tuples in the expected order.
+        self.sources = tuple(source for _, source, _ in compiled)
+        self.converters = tuple(convert for _, _, convert in compiled)
+
+    def only(self, names) -> "FastSerializer":
+        """
+        Return a copy restricted to the output fields in ``names``, keeping
+        the serializer's field order.
+        """
+        names = set(names)
+        narrowed = object.__new__(FastSerializer)
+        keep = [i for i, name in enumerate(self.names) if name in names]
+        narrowed.names = tuple(self.names[i] for i in keep)
+        narrowed.sources = tuple(self.sources[i] for i in keep)
+        narrowed.converters = tuple(self.converters[i] for i in keep)
+        return narrowed
+
+    def row(self, values) -> dict:
+        return {
+            name: None if value is None else convert(value)
+            for name, convert, value in zip(self.names, self.converters, values)
+        }
+
+    def rows(self, tuples) -> list:
+        row = self.row
+        return [row(values) for values in tuples]
+
+    def columns(self, columns, order=None) -> dict:
+        """
+        Columnar output: field name -> list of converted values, from
+        ``columns`` (value sequences in ``sources`` order), optionally
+        picking the rows in ``order``. No per-row dicts are built.
+        """
+        data = {}
+        for name, convert, column in zip(self.names, self.converters, columns):
+            if order is not None:
+                column = [column[i] for i in order]
+            data[name] = [None if value is None else convert(value) for value in column]
+        return data
+
+
+_renderer = JSONRenderer()
+
+
+def render(data) -> bytes:
+    """
+    Render ``data`` exactly as DRF's ``JSONRenderer`` does (it already uses
+    the C-accelerated stdlib encoder).
+    """
+    return _renderer.render(data)
+
+
+_compiled = {}
+
+
+def get_fast_serializer(serializer_class, fields=None) -> FastSerializer:
+    """
+    Return the compiled ``FastSerializer`` for ``serializer_class``, narrowed
+    to ``fields`` when given.
+    """
+    fast = _compiled.get(serializer_class)
+    if fast is None:
+        fast = _compiled[serializer_class] = FastSerializer(serializer_class)
+    return fast if fields is None else fast.only(fields)
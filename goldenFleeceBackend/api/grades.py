@@ -0,0 +1,46 @@
+"""
+Latest ``MonthlyGrade`` per symbol in a single query.
+
+The newest row of each symbol is picked with ``ROW_NUMBER() OVER (PARTITION
+BY symbol ORDER BY date DESC)``, so any number of symbols costs one round
+trip to the database instead of an aggregate plus a lookup per symbol.
+Symbols are matched exactly, so pass them normalized (``symbols.normalize_symbol``).
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import MonthlyGrade
+
+
+def _latest_grades_query(symbols):
+    return (
+        MonthlyGrade.objects
+        .filter(symbol__in=set(symbols))
+        .annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F("symbol")],
+                order_by=F("date").desc(),
+            )
+        )
+        .filter(row_number=1)
+    )
+
+
+def latest_grades(symbols):
+    """
+    Return a dict of upper-cased symbol -> latest ``MonthlyGrade`` for every
+    symbol in ``symbols`` that has a grade.
+    """
+    return {mg.symbol.upper(): mg for mg in _latest_grades_query(symbols)}
+
+
+async def alatest_grades(symbols):
+    """
+    Async version of ``latest_grades``.
+    """
+    return {mg.symbol.upper(): mg async for mg in _latest_grades_query(symbols)}
+
+
+def grade_class(mg):
+    return (mg.open_grade_class or "—") if mg else "—"
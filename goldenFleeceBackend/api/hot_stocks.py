@@ -0,0 +1,96 @@
+"""
+Market movers from one full-market snapshot.
+
+``/v2/snapshot/locale/us/markets/stocks/tickers`` without a ``tickers``
+parameter returns every US ticker in a single call. ``Movers`` parses it
+once into numeric fields and keeps the top ``HOT_STOCKS_MAX_COUNT`` gainers,
+losers and volume leaders, each selected with a heap (O(n log k) rather
+than sorting the whole market). Tickers below ``HOT_STOCKS_MIN_PRICE`` or
+``HOT_STOCKS_MIN_VOLUME`` are left out so illiquid names do not crowd the
+lists.
+
+The upstream cache hands back the same body object until the snapshot is
+refreshed, so ``get_movers`` only re-ranks when Polygon's data changed.
+"""
+import heapq
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+from .quotes import SNAPSHOT_PATH
+
+MARKET_SNAPSHOT_REQUEST = (SNAPSHOT_PATH, None)
+
+Mover = namedtuple("Mover", ["symbol", "price", "change", "change_pct", "volume"])
+
+# List name -> (heap function, ranking key).
+LISTS = {
+    "gainers": (heapq.nlargest, lambda m: m.change_pct),
+    "losers": (heapq.nsmallest, lambda m: m.change_pct),
+    "volume": (heapq.nlargest, lambda m: m.volume),
+}
+
+
+def _parse(item):
+    """
+    Return the ``Mover`` of one snapshot entry, or None if it lacks a price
+    or a change. Before the open (and while Polygon resets the snapshot
+    early in the morning) ``day`` is all zeros, so volume then falls back to
+    the previous session's.
+    """
+    day = item.get("day") or {}
+    price = (item.get("lastTrade") or {}).get("p") or day.get("c")
+    change = item.get("todaysChange")
+    change_pct = item.get("todaysChangePerc")
+    if not price or change is None or change_pct is None:
+        return None
+    volume = day.get("v") or (item.get("prevDay") or {}).get("v") or 0
+    return Mover(item["ticker"], price, change, change_pct, volume)
+
+
+class Movers:
+    def __init__(self, tickers, universe=None):
+        """
+        ``tickers`` is the snapshot's ``tickers`` list; ``universe``, if
+        given, is the set of (upper-case) symbols to keep.
+        """
+        min_price = settings.HOT_STOCKS_MIN_PRICE
+        min_volume = settings.HOT_STOCKS_MIN_VOLUME
+        candidates = []
+        for item in tickers:
+            if universe is not None and item.get("ticker") not in universe:
+                continue
+            mover = _parse(item)
+            if mover and mover.price >= min_price and mover.volume >= min_volume:
+                candidates.append(mover)
+
+        self.candidates = len(candidates)
+        k = settings.HOT_STOCKS_MAX_COUNT
+        self.lists = {
+            name: select(k, candidates, key=key) for name, (select, key) in LISTS.items()
+        }
+
+    def top(self, name: str, count: int):
+        return self.lists[name][:max(count, 0)]
+
+
+_cached = {}  # whole market? -> (snapshot body, universe version, Movers)
+_cached_lock = threading.Lock()
+
+
+def get_movers(body, universe=None, version=None) -> Movers:
+    """
+    Return the ``Movers`` of the snapshot ``body``, reusing the last result
+    for the same body object and universe ``version`` (e.g. the prediction
+    batch's etag).
+    """
+    key = universe is None
+    cached = _cached.get(key)
+    if cached and cached[0] is body and cached[1] == version:
+        return cached[2]
+    with _cached_lock:
+        cached = _cached.get(key)
+        if not (cached and cached[0] is body and cached[1] == version):
+            cached = _cached[key] = (body, version, Movers(body.get("tickers") or [], universe))
+        return cached[2]
@@ -0,0 +1,141 @@
+"""
+Technical indicators computed locally from daily closes.
+
+These replace Polygon's ``/v1/indicators/{sma,ema,macd,rsi}`` endpoints,
+whose values are pure functions of the bars already kept in ``bar_store``.
+Every function works along the last axis, so the same call handles one
+symbol's closes (shape ``(n,)``) or a whole universe at once (shape
+``(symbols, n)``). Leading NaNs (a symbol with a shorter history) are
+allowed; an indicator is NaN until it has a full window of data.
+
+- SMA: mean of the last ``window`` closes.
+- EMA: smoothing factor ``2 / (window + 1)``, seeded with the SMA of the
+  first ``window`` closes.
+- MACD: EMA(short) - EMA(long); the signal line is the EMA(signal_window)
+  of the MACD line and the histogram is their difference.
+- RSI: Wilder's smoothing (factor ``1 / window``) of gains and losses,
+  seeded with their simple averages.
+
+``polygon_values`` formats a series as Polygon's ``results.values``.
+``python manage.py validate_indicators`` compares the output with Polygon's.
+"""
+import math
+
+import numpy as np
+
+# Polygon returns this many values unless ``limit`` is given.
+DEFAULT_LIMIT = 10
+
+# Indicator -> parameters (Polygon's names) used by stock_detail and the
+# screener.
+PARAMS = {
+    "sma":  {"window": 50},
+    "ema":  {"window": 50},
+    "macd": {"short_window": 12, "long_window": 26, "signal_window": 9},
+    "rsi":  {"window": 14},
+}
+
+
+def sma(close, window: int) -> np.ndarray:
+    close = np.asarray(close, dtype=np.float64)
+    valid = np.isfinite(close)
+    sums = np.cumsum(np.where(valid, close, 0.0), axis=-1)
+    counts = np.cumsum(valid, axis=-1)
+    pad = np.zeros(close.shape[:-1] + (1,))
+    sums = np.concatenate([pad, sums], axis=-1)
+    counts = np.concatenate([pad, counts], axis=-1)
+
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] >= window:
+        window_sums = sums[..., window:] - sums[..., :-window]
+        full = counts[..., window:] - counts[..., :-window] == window
+        out[..., window - 1:] = np.where(full, window_sums / window, np.nan)
+    return out
+
+
+def _smooth(values, alpha: float, window: int) -> np.ndarray:
+    """
+    Exponential smoothing of ``values`` with factor ``alpha``, starting from
+    the SMA of the first full window. The recursion runs over time, one
+    vector operation per step across all series; a single series (as
+    stock_detail computes) steps over plain floats, which costs far less
+    than operations on 0-d arrays.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    seeds = sma(values, window)
+    if values.ndim == 1:
+        smoothed, prev = [], math.nan
+        for value, seed in zip(values.tolist(), seeds.tolist()):
+            prev = seed if math.isnan(prev) else alpha * value + (1 - alpha) * prev
+            smoothed.append(prev)
+        return np.array(smoothed, dtype=np.float64)
+    out = np.empty(values.shape)
+    prev = np.full(values.shape[:-1], np.nan)
+    for i in range(values.shape[-1]):
+        step = alpha * values[..., i] + (1 - alpha) * prev
+        prev = np.where(np.isnan(prev), seeds[..., i], step)
+        out[..., i] = prev
+    return out
+
+
+def ema(close, window: int) -> np.ndarray:
+    return _smooth(close, 2.0 / (window + 1), window)
+
+
+def macd(close, short_window: int, long_window: int, signal_window: int):
+    """
+    Return the (value, signal, histogram) series.
+    """
+    value = ema(close, short_window) - ema(close, long_window)
+    signal = ema(value, signal_window)
+    return value, signal, value - signal
+
+
+def rsi(close, window: int) -> np.ndarray:
+    close = np.asarray(close, dtype=np.float64)
+    change = np.diff(close, axis=-1)
+    # clip() keeps NaNs, so gaps stay gaps.
+    gains = _smooth(np.clip(change, 0.0, None), 1.0 / window, window)
+    losses = _smooth(np.clip(-change, 0.0, None), 1.0 / window, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    out = np.where(np.isnan(gains) | np.isnan(losses), np.nan, out)
+    # The first close has no change; keep the output aligned with ``close``.
+    return np.concatenate([np.full(close.shape[:-1] + (1,), np.nan), out], axis=-1)
+
+
+def compute(name: str, close, **params) -> dict:
+    """
+    Compute indicator ``name`` (sma, ema, macd or rsi) with Polygon's
+    parameter names and return its output columns by Polygon field name.
+    """
+    if name == "sma":
+        return {"value": sma(close, params["window"])}
+    if name == "ema":
+        return {"value": ema(close, params["window"])}
+    if name == "macd":
+        value, signal, histogram = macd(
+            close, params["short_window"], params["long_window"], params["signal_window"]
+        )
+        return {"value": value, "signal": signal, "histogram": histogram}
+    if name == "rsi":
+        return {"value": rsi(close, params["window"])}
+    raise ValueError(f"Unknown indicator: {name}")
+
+
+def polygon_values(name: str, timestamps, close, limit: int = DEFAULT_LIMIT, **params) -> list:
+    """
+    Return indicator ``name`` for one series in the shape of Polygon's
+    ``results.values``: ``{"timestamp": <ms>, "value": ...}`` dicts (plus
+    ``signal`` and ``histogram`` for MACD), newest first, at most ``limit``
+    of them. Bars without a value yet are left out, as Polygon does.
+    """
+    columns = compute(name, close, **params)
+    complete = np.logical_and.reduce([~np.isnan(column) for column in columns.values()])
+    defined = np.flatnonzero(complete)[::-1][:limit]
+    timestamps = np.asarray(timestamps)[defined].astype(np.int64).tolist()
+    picked = {field: column[defined].tolist() for field, column in columns.items()}
+    return [
+        {"timestamp": timestamp, **{field: picked[field][i] for field in picked}}
+        for i, timestamp in enumerate(timestamps)
+    ]
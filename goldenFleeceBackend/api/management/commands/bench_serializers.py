@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from rest_framework.renderers import JSONRenderer
+
+from api import timeframes
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark serializing and rendering the latest prediction batch with "
+        "the DRF serializers and with api.fast_serializers, in rows per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--time-frame", choices=list(timeframes.TIME_FRAMES), default=timeframes.DEFAULT
+        )
+        parser.add_argument(
+            "--rows", type=int, default=5000,
+            help="Repeat the latest batch up to this many rows (default 5000).",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Best of this many runs (default 5)."
+        )
+
+    def handle(self, *args, **options):
+        time_frame = timeframes.TIME_FRAMES[options["time_frame"]]
+        PredictionModel, PredictionSerializer = time_frame.model, time_frame.serializer
+        fast = time_frame.fast_serializer()
+        fields = [f.attname for f in PredictionModel._meta.concrete_fields]
+
+        latest_date = PredictionModel.objects.aggregate(Max("date"))["date__max"]
+        if not latest_date:
+            raise CommandError("No predictions available")
+        rows = list(
+            PredictionModel.objects.filter(date=latest_date)
+            .order_by("symbol")
+            .values_list(*fields)
+        )
+        rows = (rows * (options["rows"] // len(rows) + 1))[:options["rows"]]
+        positions = [fields.index(source) for source in fast.sources]
+        fast_rows = [tuple(row[i] for i in positions) for row in rows]
+
+        renderer = JSONRenderer()
+
+        def drf():
+            instances = [PredictionModel(*row) for row in rows]
+            return renderer.render(PredictionSerializer(instances, many=True).data)
+
+        def fast_path():
+            return renderer.render(fast.rows(fast_rows))
+
+        if drf() != fast_path():
+            raise CommandError("Fast serializer output differs from DRF output")
+
+        results = {}
+        for name, fn in (("drf", drf), ("fast", fast_path)):
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            results[name] = len(rows) / best
+            self.stdout.write(f"{name:>5}: {results[name]:,.0f} rows/s")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{PredictionModel.__name__}: {len(rows)} rows, output identical, "
+                f"{results['fast'] / results['drf']:.1f}x faster"
+            )
+        )
@@ -0,0 +1,108 @@
+import functools
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import bar_store, hot_stocks, market_data, market_hours, polygon, scheduler, screener
+from api.views import (
+    _hot_stocks_payload,
+    _index_prices_payload,
+    _sector_performance_payload,
+    _watchlist_closes_payload,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _jobs():
+    """
+    market_data key -> zero-argument callable computing its value.
+    """
+    jobs = {
+        market_data.INDEX_PRICES: _index_prices_payload,
+        market_data.SECTOR_PERFORMANCE: _sector_performance_payload,
+        market_data.WATCHLIST_CLOSES: _watchlist_closes_payload,
+    }
+    for list_name in hot_stocks.LISTS:
+        for in_predictions in (False, True):
+            key = market_data.hot_stocks_key(list_name, in_predictions)
+            jobs[key] = functools.partial(_hot_stocks_payload, list_name, in_predictions)
+    return jobs
+
+
+def _seconds_to_next_refresh() -> float:
+    """
+    MARKET_DATA_REFRESH_OPEN during the regular session; otherwise
+    MARKET_DATA_REFRESH_CLOSED, or less if the next session opens sooner.
+    """
+    now = market_hours.now()
+    if market_hours.is_open(now):
+        return settings.MARKET_DATA_REFRESH_OPEN
+    until_open = (market_hours.next_open(now) - now).total_seconds()
+    return max(1.0, min(settings.MARKET_DATA_REFRESH_CLOSED, until_open))
+
+
+class Command(BaseCommand):
+    help = (
+        "Keep the precomputed market data (index prices, sector performance, "
+        "hot stocks, watchlist quotes) in the market_data cache current, so "
+        "the views never call Polygon on the request path. While the market "
+        "is closed, also sync the screener universe's bars (symbols already "
+        "synced since the close are skipped without a call)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Refresh everything once and exit (e.g. from cron)."
+        )
+
+    # The refresher's Polygon calls go in the background lane, so they
+    # yield to the requests of users who are waiting.
+    @polygon.priority(scheduler.BACKGROUND)
+    def refresh(self) -> int:
+        """
+        Recompute and store every entry; return how many failed. A failed
+        entry keeps its previous value until it expires.
+
+        Each upstream request is fetched anew once per pass rather than read
+        from the response cache, whose TTLs would otherwise hold back data
+        this process exists to keep current.
+        """
+        failed = 0
+        with polygon.refetching():
+            for key, compute in _jobs().items():
+                try:
+                    market_data.store(key, compute())
+                except Exception:
+                    failed += 1
+                    logger.warning("Refreshing %s failed", key, exc_info=True)
+        return failed
+
+    @polygon.priority(scheduler.BACKGROUND)
+    def sync_bars(self):
+        symbols = screener.universe()
+        if not symbols:
+            return
+        failed = bar_store.sync_all(symbols)
+        if failed:
+            logger.warning("Bar sync failed for %d of %d symbols", len(failed), len(symbols))
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            started = time.monotonic()
+            failed = self.refresh()
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Refreshed market data in {elapsed:.1f}s"
+                + (f", {failed} entries failed" if failed else "")
+            )
+            if not market_hours.is_open():
+                self.sync_bars()
+                elapsed = time.monotonic() - started
+            if options["once"]:
+                return
+            time.sleep(max(0.0, _seconds_to_next_refresh() - elapsed))
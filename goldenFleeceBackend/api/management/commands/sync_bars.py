@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import bar_store, screener
+from api.symbols import normalize_symbols
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the local bar store up to date for the given symbols, or for "
+        "every symbol of the latest daily prediction batch (the screener's "
+        "universe). Symbols synced since the last close are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbols", nargs="*")
+
+    def handle(self, *args, **options):
+        symbols = normalize_symbols(options["symbols"]) or screener.universe()
+        if not symbols:
+            raise CommandError("No predictions available")
+
+        failed = bar_store.sync_all(symbols)
+        for symbol, e in failed.items():
+            self.stderr.write(f"{symbol}: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Synced {len(symbols) - len(failed)} of {len(symbols)} symbols")
+        )
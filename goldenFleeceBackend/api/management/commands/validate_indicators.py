@@ -0,0 +1,106 @@
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import bar_store, indicators, polygon
+from api.symbols import normalize_symbols
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the indicators stock_detail computes from the bar store "
+        "(api.indicators) with Polygon's /v1/indicators responses, or with "
+        "reference values and bars read from a directory (--reference)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbols", nargs="+")
+        parser.add_argument(
+            "--limit", type=int, default=50, help="Values compared per indicator (default 50)."
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=1e-4,
+            help="Largest difference accepted, relative to the close (default 1e-4).",
+        )
+        parser.add_argument(
+            "--record", metavar="DIR",
+            help="Save the Polygon responses to DIR as <SYMBOL>_<indicator>.json, and the bars as <SYMBOL>.npy.",
+        )
+        parser.add_argument(
+            "--reference", metavar="DIR",
+            help=(
+                "Compare against the responses and bars in DIR, in the layout --record "
+                "writes, instead of calling Polygon."
+            ),
+        )
+
+    def _polygon_values(self, symbol, name, params, options):
+        filename = f"{symbol}_{name}.json"
+        if options["reference"]:
+            with open(os.path.join(options["reference"], filename)) as f:
+                body = json.load(f)
+        else:
+            body = polygon.get(
+                f"/v1/indicators/{name}/{symbol}",
+                {"timespan": "day", "adjusted": "true", "series_type": "close",
+                 "order": "desc", "limit": options["limit"], **params},
+                endpoint="indicators",
+            )
+            if options["record"]:
+                os.makedirs(options["record"], exist_ok=True)
+                with open(os.path.join(options["record"], filename), "w") as f:
+                    json.dump(body, f)
+        return (body.get("results") or {}).get("values") or []
+
+    def _bars(self, symbol, options):
+        if options["reference"]:
+            try:
+                return np.load(os.path.join(options["reference"], f"{symbol}.npy"))
+            except FileNotFoundError:
+                return bar_store.EMPTY
+        bars = bar_store.bars(symbol)
+        if options["record"] and bars.shape[1]:
+            os.makedirs(options["record"], exist_ok=True)
+            np.save(os.path.join(options["record"], f"{symbol}.npy"), bars)
+        return bars
+
+    def handle(self, *args, **options):
+        worst = 0.0
+        for symbol in normalize_symbols(options["symbols"]):
+            bars = self._bars(symbol, options)
+            if not bars.shape[1]:
+                raise CommandError(f"No bars stored for {symbol}")
+            closes = dict(zip(bars[bar_store.T].astype("int64").tolist(), bars[bar_store.C].tolist()))
+            for name, params in indicators.PARAMS.items():
+                expected = self._polygon_values(symbol, name, params, options)
+                # Over the same window as stock_detail.
+                window = bars[:, -settings.INDICATOR_LOOKBACK_BARS:]
+                local = {
+                    v["timestamp"]: v
+                    for v in indicators.polygon_values(
+                        name, window[bar_store.T], window[bar_store.C], limit=window.shape[1], **params
+                    )
+                }
+                compared, diff = 0, 0.0
+                for value in expected:
+                    ours = local.get(value["timestamp"])
+                    if ours is None:
+                        continue
+                    # Differences are relative to the close (RSI: to its 0-100
+                    # range), since MACD and its histogram cross zero.
+                    scale = 100.0 if name == "rsi" else closes[value["timestamp"]]
+                    for field in ("value", "signal", "histogram"):
+                        if field in value:
+                            diff = max(diff, abs(ours[field] - value[field]) / scale)
+                    compared += 1
+                worst = max(worst, diff)
+                style = self.style.SUCCESS if diff <= options["tolerance"] else self.style.ERROR
+                self.stdout.write(style(
+                    f"{symbol:>6} {name:<5} {compared:>3}/{len(expected)} values, "
+                    f"max relative difference {diff:.2e}"
+                ))
+        if worst > options["tolerance"]:
+            raise CommandError(f"Largest difference {worst:.2e} exceeds {options['tolerance']:.0e}")
@@ -0,0 +1,51 @@
+"""
+Precomputed market data shared by every web worker.
+
+``manage.py refresh_market_data`` recomputes the dashboard payloads (index
+prices, sector performance, hot stocks and the closes of every watchlisted
+symbol) on a market-hours-aware schedule and writes them to the
+``market_data`` cache, which all workers share. The views only read that
+cache. When an entry is missing they answer 503, unless
+``MARKET_DATA_INLINE_FALLBACK`` (off by default) lets them compute it in
+the request as before, e.g. in development without a running refresher.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+INDEX_PRICES = "index_prices"
+SECTOR_PERFORMANCE = "sector_performance"
+WATCHLIST_CLOSES = "watchlist_closes"
+
+
+def hot_stocks_key(list_name: str, in_predictions: bool) -> str:
+    return f"hot_stocks:{list_name}:{'predictions' if in_predictions else 'market'}"
+
+
+def get_cache():
+    return caches["market_data"]
+
+
+def store(key: str, value):
+    get_cache().set(key, value)
+
+
+def read(key: str, compute):
+    """
+    Return the precomputed value of ``key``. If there is none, return
+    ``compute()`` when the inline fallback is on, else None. Inline results
+    are not stored: only the refresher decides what is current.
+    """
+    value = get_cache().get(key)
+    if value is None and settings.MARKET_DATA_INLINE_FALLBACK:
+        value = compute()
+    return value
+
+
+async def aread(key: str, acompute):
+    """
+    Async version of ``read``; ``acompute`` is a coroutine function.
+    """
+    value = await get_cache().aget(key)
+    if value is None and settings.MARKET_DATA_INLINE_FALLBACK:
+        value = await acompute()
+    return value
@@ -0,0 +1,101 @@
+"""
+US equity market calendar (NYSE/Nasdaq regular session).
+
+Only what the upstream cache and the bar store need: whether the regular
+session is open at a given moment, when the next one opens, and which
+trading day last closed. Holidays follow the NYSE rules
+(weekend holidays observed on the nearest weekday, except New Year's Day
+falling on a Saturday, which is not made up).
+"""
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from dateutil.easter import easter
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    first = date(year, month, 1)
+    offset = (weekday - first.weekday()) % 7
+    return first + timedelta(days=offset + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    nxt = date(year + (month == 12), month % 12 + 1, 1)
+    last = nxt - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=16)
+def holidays(year: int) -> frozenset:
+    days = {
+        _nth_weekday(year, 1, 0, 3),              # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),              # Washington's Birthday
+        easter(year) - timedelta(days=2),         # Good Friday
+        _last_weekday(year, 5, 0),                # Memorial Day
+        _observed(date(year, 7, 4)),              # Independence Day
+        _nth_weekday(year, 9, 0, 1),              # Labor Day
+        _nth_weekday(year, 11, 3, 4),             # Thanksgiving
+        _observed(date(year, 12, 25)),            # Christmas
+    }
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))    # Juneteenth
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    return frozenset(days)
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def now() -> datetime:
+    return datetime.now(MARKET_TZ)
+
+
+def is_open(at: datetime = None) -> bool:
+    """
+    True while the regular session is open at ``at`` (default: now).
+    """
+    at = (at or now()).astimezone(MARKET_TZ)
+    return is_trading_day(at.date()) and MARKET_OPEN <= at.time() < MARKET_CLOSE
+
+
+def next_open(at: datetime = None) -> datetime:
+    """
+    Return the start of the next regular session strictly after ``at``.
+    """
+    at = (at or now()).astimezone(MARKET_TZ)
+    day = at.date()
+    if at.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ)
+
+
+def last_completed_day(at: datetime = None) -> date:
+    """
+    Return the last trading day whose regular session had closed at ``at``
+    (default: now), i.e. the newest complete daily bar.
+    """
+    at = (at or now()).astimezone(MARKET_TZ)
+    day = at.date()
+    if at.time() < MARKET_CLOSE:
+        day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
@@ -1,6 +1,36 @@
 from django.db import models
 
-class PredsDaily(models.Model):
+
+class SymbolDateKey(models.Model):
+    """
+    Identity for the per-symbol history tables, whose real key is
+    ``(symbol, date)``.
+
+    Django 5.0 cannot declare a composite primary key, so ``date`` stands in
+    as the nominal ``primary_key`` (there is no surrogate id column). Rows
+    compare and hash by ``(symbol, date)`` instead of by that partial pk, so
+    two symbols' rows for the same day are never treated as the same object
+    in sets, dicts or caches. Never look these rows up by ``pk``.
+    """
+
+    class Meta:
+        abstract = True
+
+    def natural_key(self):
+        return (self.symbol, self.date)
+
+    def __eq__(self, other):
+        if not isinstance(other, models.Model):
+            return NotImplemented
+        if self._meta.concrete_model != other._meta.concrete_model:
+            return False
+        return self.natural_key() == other.natural_key()
+
+    def __hash__(self):
+        return hash((self._meta.concrete_model, self.natural_key()))
+
+
+class PredsDaily(SymbolDateKey):
     symbol = models.CharField(max_length=10)
     date = models.DateField(primary_key=True)
     pred = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
@@ -35,12 +65,18 @@ class PredsDaily(models.Model):
     class Meta:
         db_table = 'PredsDaily'  # Table name in database
         managed = False
-        unique_together = (('symbol', 'date'),)
+        constraints = [
+            models.UniqueConstraint(fields=["symbol", "date"], name="PredsDaily_symbol_date_uniq"),
+        ]
+        indexes = [
+            # See api/sql/covering_indexes.sql for the INCLUDE columns.
+            models.Index(fields=["symbol", "-date"], name="IX_PredsDaily_symbol_date"),
+        ]
 
     def __str__(self):
         return f"{self.symbol} - {self.date}"
 
-class PredsWeekly(models.Model):
+class PredsWeekly(SymbolDateKey):
     symbol = models.CharField(max_length=10)
     date = models.DateField(primary_key=True)
     sector = models.CharField(max_length=100, null=True, blank=True)
@@ -56,12 +92,18 @@ class PredsWeekly(models.Model):
     class Meta:
         db_table = 'PredsWeekly'  
         managed = False
-        unique_together = (('symbol', 'date'),)
+        constraints = [
+            models.UniqueConstraint(fields=["symbol", "date"], name="PredsWeekly_symbol_date_uniq"),
+        ]
+        indexes = [
+            # See api/sql/covering_indexes.sql for the INCLUDE columns.
+            models.Index(fields=["symbol", "-date"], name="IX_PredsWeekly_symbol_date"),
+        ]
 
     def __str__(self):
         return f"{self.symbol} - {self.date}"
 
-class PredsMonthly(models.Model):
+class PredsMonthly(SymbolDateKey):
     symbol = models.CharField(max_length=10)
     date = models.DateField(primary_key=True)
     sector = models.CharField(max_length=100, null=True, blank=True)
@@ -77,7 +119,13 @@ class PredsMonthly(models.Model):
     class Meta:
         db_table = 'PredsMonthly'  
         managed = False
-        unique_together = (('symbol', 'date'),)
+        constraints = [
+            models.UniqueConstraint(fields=["symbol", "date"], name="PredsMonthly_symbol_date_uniq"),
+        ]
+        indexes = [
+            # See api/sql/covering_indexes.sql for the INCLUDE columns.
+            models.Index(fields=["symbol", "-date"], name="IX_PredsMonthly_symbol_date"),
+        ]
 
     def __str__(self):
         return f"{self.symbol} - {self.date}"
@@ -141,7 +189,7 @@ class MonthlyAcc(models.Model):
         db_table = 'MonthlyAcc'
         managed = False
 
-class MonthlyGrade(models.Model):
+class MonthlyGrade(SymbolDateKey):
     symbol = models.CharField(max_length=10)
     date   = models.DateField(primary_key=True)   
 
@@ -152,7 +200,13 @@ class MonthlyGrade(models.Model):
     class Meta:
         db_table = 'MonthlyGrades'
         managed  = False
-        unique_together = (('symbol','date'),)
+        constraints = [
+            models.UniqueConstraint(fields=["symbol", "date"], name="MonthlyGrades_symbol_date_uniq"),
+        ]
+        indexes = [
+            # See api/sql/covering_indexes.sql for the INCLUDE columns.
+            models.Index(fields=["symbol", "-date"], name="IX_MonthlyGrades_symbol_date"),
+        ]
 
     def __str__(self):
         return f"{self.symbol} @ {self.date} → {self.open_grade_class}"
@@ -0,0 +1,620 @@
+"""
+Shared HTTP client for the Polygon.io market-data API.
+
+Every upstream call goes through one pooled ``requests.Session`` per worker
+process, so TCP/TLS connections are reused between requests. Each endpoint
+family gets its own timeout and transient failures are retried with backoff.
+
+``aget`` is the non-blocking twin of ``get`` used by the async views; it
+keeps one pooled ``httpx.AsyncClient`` per event loop. Both read through the
+market-hours-aware response cache in upstream_cache.py.
+
+Concurrent requests for the same normalized URL share one in-flight upstream
+call (single-flight). Recently expired entries are served immediately while
+a background refresh runs (stale-while-revalidate). Each endpoint family has a circuit breaker;
+while it is open, or when a call fails, the last good cached value is served
+instead. Calls the breaker lets through then take a token from the quota
+scheduler in scheduler.py, in the priority lane the view declared with
+``priority``. Views wrap their work in ``track_staleness()`` to learn whether any
+of the data they used was stale, so they can flag it in the payload, and
+``refetching()`` makes a block bypass the cache for data it must re-fetch.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import scheduler
+from .circuit_breaker import CircuitBreaker
+from .singleflight import SingleFlight
+from .upstream_cache import TTLCache, expiry_for
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_cache = None
+_cache_lock = threading.Lock()
+_breakers = {}
+_breakers_lock = threading.Lock()
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_background_tasks = set()
+_staleness = contextvars.ContextVar("polygon_staleness", default=None)
+_flights = SingleFlight()
+_lane = contextvars.ContextVar("polygon_lane", default=scheduler.DASHBOARD)
+_refetched = contextvars.ContextVar("polygon_refetched", default=None)
+
+# Retried in place. A 429 is not: a retry would spend quota the scheduler
+# never granted, so it is recorded as a failure and the caller falls back.
+RETRY_STATUSES = (500, 502, 503, 504)
+FAILURE_STATUSES = (429,) + RETRY_STATUSES
+
+FRESH = "fresh"
+REVALIDATE = "revalidate"
+EXPIRED = "expired"
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised when an endpoint's circuit is open and nothing is cached for the
+    request.
+    """
+
+
+class UpstreamSaturated(UpstreamUnavailable):
+    """
+    Raised when the quota scheduler dropped the call and nothing is cached.
+    """
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=settings.POLYGON_MAX_RETRIES,
+        backoff_factor=settings.POLYGON_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        # Never park a worker on an upstream's Retry-After.
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.POLYGON_POOL_SIZE,
+        pool_maxsize=settings.POLYGON_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Sent as a header so the key never shows up in URLs or access logs.
+    session.headers["Authorization"] = f"Bearer {settings.POLYGON_API_KEY}"
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return this process's pooled session, creating it on first use.
+
+    Creation is lazy so that pre-forking servers build one pool per worker
+    rather than sharing sockets inherited from the parent.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get_timeout(endpoint: str):
+    timeouts = settings.POLYGON_TIMEOUTS
+    return timeouts.get(endpoint, timeouts["default"])
+
+
+def get_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(settings.POLYGON_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def cache_stats() -> dict:
+    return get_cache().stats()
+
+
+def cache_key(path: str, params=None) -> str:
+    """
+    Normalize a request to a stable key: the path plus its query parameters
+    in sorted order, so equivalent requests share an entry.
+    """
+    if not params:
+        return path
+    return f"{path}?{urlencode(sorted(params.items()))}"
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                failure_threshold=settings.POLYGON_BREAKER_FAILURES,
+                reset_timeout=settings.POLYGON_BREAKER_RESET,
+                probe_timeout=settings.POLYGON_BREAKER_PROBE_TIMEOUT,
+            )
+        return breaker
+
+
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
+
+
+def singleflight_stats() -> dict:
+    return _flights.stats()
+
+
+def upstream_stats() -> dict:
+    return {
+        "cache": cache_stats(),
+        "breakers": breaker_stats(),
+        "singleflight": singleflight_stats(),
+        "scheduler": scheduler.get_scheduler().stats(),
+    }
+
+
+def priority(lane: str):
+    """
+    Decorator for sync or async views (or any other entry point, such as a
+    management command's methods): Polygon calls made while the view runs
+    are scheduled in ``lane`` (see scheduler.py). Calls made outside a
+    decorated function use the dashboard lane.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                token = _lane.set(lane)
+                try:
+                    return await view(*args, **kwargs)
+                finally:
+                    _lane.reset(token)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _lane.set(lane)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _lane.reset(token)
+        return wrapper
+    return decorator
+
+
+class StalenessReport:
+    """
+    Collects whether a request was answered from stale upstream data, and
+    the fetch time of the oldest such value.
+    """
+
+    def __init__(self):
+        self.stale = False
+        self.stored_at = None
+
+    def record(self, stored_at: float):
+        self.stale = True
+        if self.stored_at is None or stored_at < self.stored_at:
+            self.stored_at = stored_at
+
+    def marker(self) -> dict:
+        as_of = datetime.fromtimestamp(self.stored_at, timezone.utc)
+        return {"stale": True, "as_of": as_of.isoformat()}
+
+
+@contextmanager
+def track_staleness():
+    """
+    Record every stale value served by ``get``/``aget`` inside the block,
+    including calls fanned out through ``submit_all`` and ``agather``.
+    Blocks nest: what an inner block records counts for the enclosing one
+    too.
+    """
+    report = StalenessReport()
+    token = _staleness.set(report)
+    try:
+        yield report
+    finally:
+        _staleness.reset(token)
+        outer = _staleness.get()
+        if outer is not None and report.stale:
+            outer.record(report.stored_at)
+
+
+@contextmanager
+def refetching():
+    """
+    Inside the block, the first ``get``/``aget`` of each distinct request
+    goes to Polygon even if the response cache holds it; repeats are served
+    from the entry that call refreshed. For callers like the market-data
+    refresher, whose whole point is to pick up new data. A failed refetch
+    still falls back to the cached entry.
+    """
+    token = _refetched.set(set())
+    try:
+        yield
+    finally:
+        _refetched.reset(token)
+
+
+def _must_refetch(key: str) -> bool:
+    refetched = _refetched.get()
+    if refetched is None or key in refetched:
+        return False
+    refetched.add(key)
+    return True
+
+
+def _serve_stale(entry):
+    report = _staleness.get()
+    if report is not None:
+        report.record(entry.stored_at)
+    return entry.value
+
+
+def _served(outcome):
+    """
+    Unpack a (body, stale_entry) outcome from ``_fetch``/``_afetch``. The
+    staleness is recorded here, in each caller's own context, because a
+    single-flight outcome is shared by several requests.
+    """
+    body, stale_entry = outcome
+    return body if stale_entry is None else _serve_stale(stale_entry)
+
+
+def _freshness(entry) -> str:
+    now = time.time()
+    if entry.expires_at > now:
+        return FRESH
+    if now - entry.expires_at <= settings.POLYGON_STALE_WHILE_REVALIDATE:
+        return REVALIDATE
+    return EXPIRED
+
+
+def _is_cacheable(status_code: int, body) -> bool:
+    return (
+        200 <= status_code < 300
+        and isinstance(body, dict)
+        and body.get("status") not in ("ERROR", "NOT_AUTHORIZED")
+    )
+
+
+def _unavailable(endpoint: str, fallback):
+    if fallback is None:
+        raise UpstreamUnavailable(f"Polygon {endpoint} circuit is open")
+    return fallback.value, fallback
+
+
+def _saturated(lane: str, fallback):
+    if fallback is None:
+        raise UpstreamSaturated(f"Polygon quota exhausted for {lane} requests")
+    return fallback.value, fallback
+
+
+def _store(key: str, endpoint: str, status_code: int, body, fallback):
+    """
+    Record the outcome of an upstream call and return (body, stale_entry).
+    """
+    breaker = get_breaker(endpoint)
+    if status_code in FAILURE_STATUSES:
+        # Rate limited, or still failing after retries: prefer the last good value.
+        breaker.record_failure()
+        return (body, None) if fallback is None else (fallback.value, fallback)
+    breaker.record_success()
+    if _is_cacheable(status_code, body):
+        get_cache().set(key, body, expiry_for(endpoint))
+    return body, None
+
+
+def _claim_refresh(key: str) -> bool:
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def _release_refresh(key: str):
+    with _refreshing_lock:
+        _refreshing.discard(key)
+
+
+def _fetch(key: str, path: str, params, endpoint: str, lane: str, fallback=None):
+    """
+    Call Polygon through the endpoint's circuit breaker and the quota
+    scheduler. Returns (body, stale_entry), where stale_entry is the cached
+    ``fallback`` when it was served in place of a failed or dropped call.
+    """
+    # The breaker goes first: a call it rejects must not spend quota or
+    # wait for a token.
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        return _unavailable(endpoint, fallback)
+    if not scheduler.get_scheduler().acquire(lane):
+        # Dropped before it ran: a half-open probe hands its slot back.
+        breaker.release()
+        return _saturated(lane, fallback)
+    try:
+        resp = get_session().get(
+            f"{settings.POLYGON_HOST}{path}",
+            params=params,
+            timeout=get_timeout(endpoint),
+        )
+        body = resp.json()
+    except Exception:
+        breaker.record_failure()
+        if fallback is None:
+            raise
+        logger.warning("Polygon %s failed, serving stale %s", endpoint, key, exc_info=True)
+        return fallback.value, fallback
+    except BaseException:
+        # Cancelled or interrupted: no verdict on the upstream's health.
+        breaker.release()
+        raise
+    return _store(key, endpoint, resp.status_code, body, fallback)
+
+
+def _fetch_once(key: str, path: str, params, endpoint: str, lane: str, fallback=None):
+    return _flights.do(
+        key, lambda: _fetch(key, path, params, endpoint, lane, fallback)
+    )
+
+
+def _refresh_in_background(key: str, path: str, params, endpoint: str):
+    if not _claim_refresh(key):
+        return
+
+    def refresh():
+        try:
+            _fetch_once(key, path, params, endpoint, scheduler.BACKGROUND)
+        except Exception:
+            logger.info("Background refresh of %s failed", key, exc_info=True)
+        finally:
+            _release_refresh(key)
+
+    get_executor().submit(refresh)
+
+
+def get(path: str, params=None, *, endpoint: str = "default"):
+    """
+    GET ``path`` (e.g. ``/v2/aggs/...``) from Polygon and return the decoded
+    JSON body. ``endpoint`` selects the timeout from ``POLYGON_TIMEOUTS``,
+    the cache lifetime from ``POLYGON_CACHE_TTLS`` and the circuit breaker.
+
+    The returned body may be shared with other requests through the cache,
+    so callers must not mutate it. Raises ``UpstreamUnavailable`` if the
+    circuit is open and nothing is cached.
+    """
+    key = cache_key(path, params)
+    refetch = _must_refetch(key)
+    entry = get_cache().lookup(key)
+    if entry is None:
+        return _served(_fetch_once(key, path, params, endpoint, _lane.get()))
+
+    freshness = EXPIRED if refetch else _freshness(entry)
+    if freshness == FRESH:
+        return entry.value
+    if freshness == REVALIDATE:
+        _refresh_in_background(key, path, params, endpoint)
+        return _serve_stale(entry)
+    return _served(
+        _fetch_once(key, path, params, endpoint, _lane.get(), fallback=entry)
+    )
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the bounded thread pool used to fan out independent upstream
+    calls. It is shared by every request in the process, so a burst of
+    requests queues behind ``POLYGON_FANOUT_WORKERS`` threads instead of
+    opening an unbounded number of sockets.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.POLYGON_FANOUT_WORKERS,
+                    thread_name_prefix="polygon",
+                )
+    return _executor
+
+
+def submit_all(calls):
+    """
+    Start the zero-argument callables in ``calls`` (name -> callable) on the
+    fan-out pool and return a dict of name -> future. The caller is free to
+    do other work (e.g. database reads) before calling ``collect``.
+    """
+    executor = get_executor()
+    # Each call runs in a copy of the caller's context so that staleness is
+    # still reported to the request's ``track_staleness`` block.
+    return {
+        name: executor.submit(contextvars.copy_context().run, fn)
+        for name, fn in calls.items()
+    }
+
+
+def collect(futures, defaults):
+    """
+    Wait for the futures returned by ``submit_all`` and return a dict of
+    name -> result. A call that raised is logged and its result replaced by
+    ``defaults[name]``, so one failing upstream only empties its own section.
+    """
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception:
+            logger.warning("Polygon fetch %r failed", name, exc_info=True)
+            results[name] = defaults[name]
+    return results
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.POLYGON_HOST,
+        headers={"Authorization": f"Bearer {settings.POLYGON_API_KEY}"},
+        limits=httpx.Limits(
+            max_connections=settings.POLYGON_ASYNC_POOL_SIZE,
+            max_keepalive_connections=settings.POLYGON_POOL_SIZE,
+        ),
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the pooled async client for the running event loop. Connections
+    cannot be shared across loops, so each loop gets its own client; under
+    uvicorn that is one client per worker.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = _build_async_client()
+    return client
+
+
+def get_async_timeout(endpoint: str) -> httpx.Timeout:
+    connect, read = get_timeout(endpoint)
+    return httpx.Timeout(read, connect=connect)
+
+
+async def _afetch(key: str, path: str, params, endpoint: str, lane: str, fallback=None):
+    """
+    Async version of ``_fetch``.
+    """
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        return _unavailable(endpoint, fallback)
+    try:
+        acquired = await scheduler.get_scheduler().aacquire(lane)
+    except BaseException:
+        breaker.release()
+        raise
+    if not acquired:
+        breaker.release()
+        return _saturated(lane, fallback)
+    client = get_async_client()
+    retries = settings.POLYGON_MAX_RETRIES
+    try:
+        for attempt in range(retries + 1):
+            try:
+                resp = await client.get(
+                    path, params=params, timeout=get_async_timeout(endpoint)
+                )
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                    break
+            await asyncio.sleep(settings.POLYGON_BACKOFF_FACTOR * 2 ** attempt)
+        body = resp.json()
+    except Exception:
+        breaker.record_failure()
+        if fallback is None:
+            raise
+        logger.warning("Polygon %s failed, serving stale %s", endpoint, key, exc_info=True)
+        return fallback.value, fallback
+    except BaseException:
+        # Cancelled or interrupted: no verdict on the upstream's health.
+        breaker.release()
+        raise
+    return _store(key, endpoint, resp.status_code, body, fallback)
+
+
+async def _afetch_once(key: str, path: str, params, endpoint: str, lane: str, fallback=None):
+    return await _flights.ado(
+        key, lambda: _afetch(key, path, params, endpoint, lane, fallback)
+    )
+
+
+def _arefresh_in_background(key: str, path: str, params, endpoint: str):
+    if not _claim_refresh(key):
+        return
+
+    async def refresh():
+        try:
+            await _afetch_once(key, path, params, endpoint, scheduler.BACKGROUND)
+        except Exception:
+            logger.info("Background refresh of %s failed", key, exc_info=True)
+        finally:
+            _release_refresh(key)
+
+    # Run outside the request's context so the refresh is not reported as
+    # part of it, and keep a reference so the task is not collected early.
+    task = asyncio.get_running_loop().create_task(
+        refresh(), context=contextvars.Context()
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def aget(path: str, params=None, *, endpoint: str = "default"):
+    """
+    Async version of ``get``, with the same timeouts, cache, circuit
+    breakers, and retry and backoff policy for connection errors and 5xx
+    responses.
+    """
+    key = cache_key(path, params)
+    refetch = _must_refetch(key)
+    entry = get_cache().lookup(key)
+    if entry is None:
+        return _served(await _afetch_once(key, path, params, endpoint, _lane.get()))
+
+    freshness = EXPIRED if refetch else _freshness(entry)
+    if freshness == FRESH:
+        return entry.value
+    if freshness == REVALIDATE:
+        _arefresh_in_background(key, path, params, endpoint)
+        return _serve_stale(entry)
+    return _served(
+        await _afetch_once(key, path, params, endpoint, _lane.get(), fallback=entry)
+    )
+
+
+async def agather(calls, defaults):
+    """
+    Await the coroutines in ``calls`` (name -> coroutine) concurrently and
+    return a dict of name -> result, substituting ``defaults[name]`` for any
+    call that raised, like ``collect`` does for the threaded fan-out.
+    """
+    names = list(calls)
+    outcomes = await asyncio.gather(*calls.values(), return_exceptions=True)
+    results = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, Exception):
+            logger.warning("Polygon fetch %r failed", name, exc_info=outcome)
+            outcome = defaults[name]
+        results[name] = outcome
+    return results
@@ -0,0 +1,241 @@
+"""
+Per-process snapshot of the latest prediction batch.
+
+New predictions land once per day, week or month, but every request used to
+recompute ``MAX(date)`` and re-read the same rows. ``PredictionStore`` keeps
+the latest-date rows of one prediction table, with their confidence bands,
+as column tuples plus a symbol -> row index. Readers only touch the
+database through a cheap version probe (the newest date and its row count),
+run at most every ``PREDICTION_SNAPSHOT_PROBE_INTERVAL`` seconds; the rows
+are reloaded only when that version changes, or after
+``PREDICTION_SNAPSHOT_MAX_AGE`` seconds so accuracy-table updates between
+batches are picked up too.
+
+Each snapshot also ranks its rows once, when it is built (see ``RANKINGS``),
+so a top-N request is a walk over a ready-sorted index array.
+"""
+import threading
+import time
+import zlib
+from array import array
+
+from django.conf import settings
+from django.db.models import Count
+
+from .predictions import ACC_PREFIX, with_bands
+
+# Accuracy-table columns loaded alongside the bands for ranking and filtering.
+RANKING_ACC_FIELDS = ("liveAcc", "MktCap")
+
+
+def _weighted(values, weights):
+    return tuple(
+        v * w if v is not None and w is not None else None
+        for v, w in zip(values, weights)
+    )
+
+
+# rankBy name -> snapshot -> column to rank by, largest first.
+RANKINGS = {
+    "pred_close": lambda snap: snap.columns["pred_close"],
+    "pred_open": lambda snap: snap.columns["pred_open"],
+    "pred_close_weighted": lambda snap: _weighted(snap.columns["pred_close"], snap.acc_columns["liveAcc"]),
+    "pred_open_weighted": lambda snap: _weighted(snap.columns["pred_open"], snap.acc_columns["liveAcc"]),
+}
+
+
+def _descending(column) -> array:
+    """
+    Row order of ``column`` from largest to smallest, with NULLs last as in
+    SQL Server's ORDER BY ... DESC.
+    """
+    return array("I", sorted(
+        range(len(column)),
+        key=lambda i: (column[i] is None, -column[i] if column[i] is not None else 0),
+    ))
+
+
+class PredictionSnapshot:
+    """
+    The latest-date rows of a prediction table, column-major. Rows are in
+    symbol order, as the database sorts them.
+    """
+
+    def __init__(self, PredictionModel, acc_fields, version, rows):
+        self.version = version
+        self.date = version[0]
+        # Validators for conditional GETs. The checksum covers the accuracy
+        # columns too, which can change without a new batch.
+        self.etag = "{}-{}-{}-{:08x}".format(
+            PredictionModel._meta.db_table,
+            self.date.isoformat(),
+            version[1],
+            zlib.crc32(repr(rows).encode()),
+        )
+        # When this content was loaded: the accuracy columns can change
+        # within a batch, so the batch date alone would be too old.
+        self.last_modified = int(time.time())
+        self.fields = tuple(f.attname for f in PredictionModel._meta.concrete_fields)
+        self.acc_fields = tuple(acc_fields)
+
+        acc_names = self.acc_fields + RANKING_ACC_FIELDS
+        width = len(self.fields)
+        columns = tuple(zip(*rows)) if rows else ((),) * (width + 1 + len(acc_names))
+        self.columns = dict(zip(self.fields, columns[:width]))
+        self.acc_found = columns[width]
+        self.acc_columns = dict(zip(acc_names, columns[width + 1:]))
+        self.index = {
+            symbol.upper(): i for i, symbol in enumerate(self.columns["symbol"])
+        }
+        self.sector_keys = tuple(
+            sector.lower() if sector else None for sector in self.columns["sector"]
+        )
+        self.rankings = {
+            name: _descending(column(self)) for name, column in RANKINGS.items()
+        }
+
+    def __len__(self):
+        return len(self.acc_found)
+
+    def find(self, symbol):
+        """
+        Return the row index of ``symbol`` (normalized), or None.
+        """
+        return self.index.get(symbol)
+
+    def values(self, i, fields=None) -> tuple:
+        return tuple(self.columns[f][i] for f in fields or self.fields)
+
+    def tuples(self, fields, order=None):
+        """
+        Return the ``fields`` values of the rows in ``order`` (default: all,
+        in symbol order) as tuples, like ``values_list(*fields)``.
+        """
+        columns = [self.columns[f] for f in fields]
+        if order is None:
+            return list(zip(*columns))
+        return [tuple(column[i] for column in columns) for i in order]
+
+    def has_bands(self, i) -> bool:
+        return bool(self.acc_found[i])
+
+    def bands(self, i) -> dict:
+        """
+        Return row ``i``'s confidence bands, as ``predictions.band_data`` does.
+        """
+        return {field: self.acc_columns[field][i] for field in self.acc_fields}
+
+    def top(self, rank_by, count, sector=None, min_mkt_cap=None, max_mkt_cap=None):
+        """
+        Return the indices of the first ``count`` rows in ``rank_by`` order
+        (a ``RANKINGS`` name) that are in ``sector`` and whose market cap is
+        within [min_mkt_cap, max_mkt_cap]. Rows with an unknown market cap
+        are skipped when a bound is given.
+        """
+        order = self.rankings[rank_by]
+        if count <= 0:
+            return []
+        if sector is None and min_mkt_cap is None and max_mkt_cap is None:
+            return order[:count]
+
+        sector = sector.lower() if sector is not None else None
+        mkt_cap = self.acc_columns["MktCap"]
+        matches = []
+        for i in order:
+            if sector is not None and self.sector_keys[i] != sector:
+                continue
+            if min_mkt_cap is not None or max_mkt_cap is not None:
+                cap = mkt_cap[i]
+                if cap is None:
+                    continue
+                if min_mkt_cap is not None and cap < min_mkt_cap:
+                    continue
+                if max_mkt_cap is not None and cap > max_mkt_cap:
+                    continue
+            matches.append(i)
+            if len(matches) == count:
+                break
+        return matches
+
+
+class PredictionStore:
+    def __init__(self, PredictionModel, AccModel, acc_fields):
+        self.model = PredictionModel
+        self.acc_model = AccModel
+        self.acc_fields = tuple(acc_fields)
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _probe(self):
+        """
+        Return (newest date, rows on that date), or None for an empty table.
+        """
+        newest = (
+            self.model.objects.values("date")
+            .annotate(rows=Count("*"))
+            .order_by("-date")
+            .first()
+        )
+        return (newest["date"], newest["rows"]) if newest else None
+
+    def _load(self, version):
+        acc_names = self.acc_fields + RANKING_ACC_FIELDS
+        queryset = with_bands(
+            self.model.objects.filter(date=version[0]), self.acc_model, acc_names
+        )
+        fields = [f.attname for f in self.model._meta.concrete_fields]
+        bands = [f"{ACC_PREFIX}{field}" for field in acc_names]
+        rows = list(
+            queryset.order_by("symbol").values_list(*fields, "acc_found", *bands)
+        )
+        return PredictionSnapshot(self.model, self.acc_fields, version, rows)
+
+    def get(self):
+        """
+        Return the current ``PredictionSnapshot``, or None if the table is
+        empty. Probes and reloads as described in the module docstring.
+        """
+        now = time.monotonic()
+        if now - self._probed_at < settings.PREDICTION_SNAPSHOT_PROBE_INTERVAL:
+            return self._snapshot
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._probed_at < settings.PREDICTION_SNAPSHOT_PROBE_INTERVAL:
+                return self._snapshot
+            version = self._probe()
+            snapshot = self._snapshot
+            expired = now - self._loaded_at >= settings.PREDICTION_SNAPSHOT_MAX_AGE
+            if version is None:
+                snapshot = None
+            elif snapshot is None or snapshot.version != version or expired:
+                previous, snapshot = snapshot, self._load(version)
+                if previous is not None and previous.etag == snapshot.etag:
+                    # Unchanged content keeps its Last-Modified.
+                    snapshot.last_modified = previous.last_modified
+                self._loaded_at = now
+            self._snapshot = snapshot
+            self._probed_at = now
+            return snapshot
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(PredictionModel, AccModel, acc_fields) -> PredictionStore:
+    store = _stores.get(PredictionModel)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(PredictionModel)
+            if store is None:
+                store = _stores[PredictionModel] = PredictionStore(
+                    PredictionModel, AccModel, acc_fields
+                )
+    return store
+
+
+def get_snapshot(PredictionModel, AccModel, acc_fields):
+    return get_store(PredictionModel, AccModel, acc_fields).get()
@@ -0,0 +1,73 @@
+"""
+Query helpers for the prediction tables.
+
+Prediction rows (``PredsDaily``/``PredsWeekly``/``PredsMonthly``) carry no
+foreign key to their accuracy rows (``DailyAcc``/...), so the confidence
+bands are attached with correlated subqueries. The newest prediction and its
+bands then come back from a single statement, and the newest prediction of
+any number of symbols from one window-function query.
+
+Symbols must already be normalized (see ``symbols.normalize_symbol``); they are
+matched exactly so the lookups can seek on the ``(symbol, date)`` indexes.
+"""
+from django.db.models import Exists, F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+
+ACC_PREFIX = "acc_"
+
+
+def with_bands(queryset, AccModel, acc_fields):
+    """
+    Annotate each prediction row with ``acc_found`` and ``acc_<field>`` for
+    every field in ``acc_fields``, taken from the symbol's ``AccModel`` row.
+    """
+    acc = AccModel.objects.filter(symbol=OuterRef("symbol"))
+    return queryset.annotate(
+        acc_found=Exists(acc),
+        **{
+            f"{ACC_PREFIX}{field}": Subquery(acc.values(field)[:1])
+            for field in acc_fields
+        },
+    )
+
+
+def latest_prediction(PredictionModel, AccModel, acc_fields, symbol: str, columns=None):
+    """
+    Return the newest ``PredictionModel`` row for ``symbol`` annotated as in
+    ``with_bands``, or None if the symbol has no predictions. ``columns``
+    limits the prediction columns selected (see ``QuerySet.only``).
+    """
+    queryset = PredictionModel.objects.filter(symbol=symbol)
+    if columns is not None:
+        # Always name the pk: only() with no names would load every column.
+        queryset = queryset.only(PredictionModel._meta.pk.name, *columns)
+    return with_bands(queryset, AccModel, acc_fields).order_by("-date").first()
+
+
+def band_data(prediction, acc_fields) -> dict:
+    """
+    Return the band values annotated on ``prediction`` under their
+    accuracy-table names, as the accuracy serializers would render them.
+    """
+    return {field: getattr(prediction, f"{ACC_PREFIX}{field}") for field in acc_fields}
+
+
+def latest_predictions(PredictionModel, AccModel, acc_fields, symbols):
+    """
+    Return a dict of upper-cased symbol -> newest ``PredictionModel`` row
+    (annotated as in ``with_bands``) for every symbol in ``symbols`` that
+    has predictions, using one query regardless of how many are asked for.
+    """
+    queryset = (
+        PredictionModel.objects
+        .filter(symbol__in=set(symbols))
+        .annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F("symbol")],
+                order_by=F("date").desc(),
+            )
+        )
+    )
+    queryset = with_bands(queryset, AccModel, acc_fields).filter(row_number=1)
+    return {row.symbol.upper(): row for row in queryset}
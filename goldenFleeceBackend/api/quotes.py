@@ -0,0 +1,121 @@
+"""
+Latest and previous close for many tickers with as few Polygon calls as
+possible.
+
+One multi-ticker snapshot request covers every ticker Polygon has a current
+session for; only tickers missing from it (or reset before the open, when
+the snapshot's ``day`` bar is still empty) fall back to a 7-day aggs request.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from . import polygon
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = "/v2/snapshot/locale/us/markets/stocks/tickers"
+
+
+def _last_two_closes_request(ticker: str):
+    """
+    Return the (path, params) of the 7-day aggs request used for closes.
+    """
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=7)
+    return (
+        f"/v2/aggs/ticker/{ticker}/range/1/day/{start}/{end}",
+        {"adjusted": "true", "sort": "desc", "limit": 2},
+    )
+
+
+def _parse_last_two_closes(resp):
+    results = resp.get("results", [])
+    if not results:
+        return None, None
+
+    latest_close = results[0]["c"]
+    prev_close = results[1]["c"] if len(results) > 1 else latest_close
+    return latest_close, prev_close
+
+
+def _snapshot_request(tickers):
+    return SNAPSHOT_PATH, {"tickers": ",".join(tickers)}
+
+
+def _parse_snapshot(data):
+    """
+    Return ticker -> (latest_close, prev_close) for every snapshot entry
+    that has both a current-session and a previous-session close.
+    """
+    closes = {}
+    for item in data.get("tickers") or []:
+        latest_close = (item.get("day") or {}).get("c")
+        prev_close = (item.get("prevDay") or {}).get("c")
+        if latest_close and prev_close:
+            closes[item["ticker"]] = (latest_close, prev_close)
+    return closes
+
+
+def last_two_closes(ticker: str):
+    """
+    Return (latest_close, previous_close) for the given ticker using Polygon.
+    """
+    path, params = _last_two_closes_request(ticker)
+    return _parse_last_two_closes(polygon.get(path, params, endpoint="aggs"))
+
+
+def batch_last_two_closes(tickers):
+    """
+    Return ticker -> (latest_close, prev_close) for every ticker in
+    ``tickers``; tickers with no data map to (None, None).
+    """
+    tickers = list(tickers)
+    if not tickers:
+        # An empty tickers= would ask Polygon for the whole market.
+        return {}
+    path, params = _snapshot_request(tickers)
+    try:
+        closes = _parse_snapshot(polygon.get(path, params, endpoint="snapshot"))
+    except Exception:
+        logger.warning("Snapshot quote fetch failed", exc_info=True)
+        closes = {}
+
+    missing = [t for t in tickers if t not in closes]
+    if missing:
+        pending = polygon.submit_all(
+            {t: lambda t=t: last_two_closes(t) for t in missing}
+        )
+        closes.update(polygon.collect(pending, {t: (None, None) for t in missing}))
+    return {t: closes[t] for t in tickers}
+
+
+async def alast_two_closes(ticker: str):
+    path, params = _last_two_closes_request(ticker)
+    return _parse_last_two_closes(
+        await polygon.aget(path, params, endpoint="aggs")
+    )
+
+
+async def abatch_last_two_closes(tickers):
+    """
+    Async version of ``batch_last_two_closes``.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+    path, params = _snapshot_request(tickers)
+    try:
+        closes = _parse_snapshot(
+            await polygon.aget(path, params, endpoint="snapshot")
+        )
+    except Exception:
+        logger.warning("Snapshot quote fetch failed", exc_info=True)
+        closes = {}
+
+    missing = [t for t in tickers if t not in closes]
+    if missing:
+        closes.update(await polygon.agather(
+            {t: alast_two_closes(t) for t in missing},
+            {t: (None, None) for t in missing},
+        ))
+    return {t: closes[t] for t in tickers}
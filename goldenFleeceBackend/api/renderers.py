@@ -0,0 +1,31 @@
+"""
+Compact renderers for the bulk prediction endpoints.
+
+Both expect the columnar layout built by ``FastSerializer.columns`` (one
+array per field instead of one object per row) and are selected through
+content negotiation: ``Accept: application/vnd.goldenfleece.columnar+json``
+or ``application/msgpack``, or ``?format=columnar`` / ``?format=msgpack``.
+"""
+import msgpack
+from rest_framework.renderers import JSONRenderer, BaseRenderer
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    media_type = "application/vnd.goldenfleece.columnar+json"
+    format = "columnar"
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, use_bin_type=True)
+
+
+# Formats whose views should hand over columnar data.
+COLUMNAR_FORMATS = {ColumnarJSONRenderer.format, MessagePackRenderer.format}
@@ -0,0 +1,169 @@
+"""
+Token-bucket scheduler for the shared Polygon quota.
+
+Every upstream call takes one token from a bucket that refills at
+``POLYGON_RATE_PER_SECOND`` up to ``POLYGON_BURST``. Those are the limits of
+the whole Polygon account; each process enforces its own share of them
+(divided by ``POLYGON_WORKERS``), since buckets are not shared between
+processes. Callers belong to a
+priority lane (interactive > dashboard > search > background). A lane only
+gets a token when no higher-priority lane is waiting and when taking it
+leaves at least the lane's ``reserve`` of the bucket for higher lanes.
+
+Waiters queue until their lane's ``max_wait`` deadline. Work is dropped up
+front when its lane's queue is full, or when the bucket cannot possibly
+serve it before its deadline, so saturation sheds low-priority load instead
+of stalling important requests.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+
+INTERACTIVE = "interactive"
+DASHBOARD = "dashboard"
+SEARCH = "search"
+BACKGROUND = "background"
+
+
+class TokenBucketScheduler:
+    def __init__(self, rate: float, burst: float, lanes: dict):
+        self.rate = rate
+        self.burst = burst
+        self.lanes = lanes
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self.queued = {name: 0 for name in lanes}
+        self.granted = {name: 0 for name in lanes}
+        self.dropped = {name: 0 for name in lanes}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _floor(self, lane: str) -> float:
+        return self.lanes[lane]["reserve"] * self.burst
+
+    def _waiting_ahead(self, lane: str) -> int:
+        priority = self.lanes[lane]["priority"]
+        return sum(
+            self.queued[name]
+            for name, conf in self.lanes.items()
+            if conf["priority"] < priority
+        )
+
+    def _admit(self, lane: str, deadline: float, now: float) -> bool:
+        """
+        Decide whether to queue a new caller at all; called under the lock.
+        """
+        conf = self.lanes[lane]
+        if self.queued[lane] >= conf["max_queue"]:
+            return False
+        # Tokens needed before this caller can be served, in the best case.
+        needed = 1 + self._floor(lane) + self._waiting_ahead(lane) + self.queued[lane]
+        eta = max(0.0, needed - self.tokens) / self.rate
+        return now + eta <= deadline
+
+    def _try_take(self, lane: str):
+        """
+        Take a token for ``lane`` if allowed; called under the lock. Returns
+        (taken, seconds until a token could be available).
+        """
+        self._refill(time.monotonic())
+        floor = self._floor(lane)
+        if not self._waiting_ahead(lane) and self.tokens - 1 >= floor:
+            self.tokens -= 1
+            self.granted[lane] += 1
+            return True, 0.0
+        return False, max(1 + floor - self.tokens, 1) / self.rate
+
+    def _enter(self, lane: str, timeout=None):
+        now = time.monotonic()
+        wait = self.lanes[lane]["max_wait"] if timeout is None else timeout
+        deadline = now + wait
+        self._refill(now)
+        if not self._admit(lane, deadline, now):
+            self.dropped[lane] += 1
+            return None
+        self.queued[lane] += 1
+        return deadline
+
+    def _leave(self, lane: str, taken: bool):
+        self.queued[lane] -= 1
+        if not taken:
+            self.dropped[lane] += 1
+        self._cond.notify_all()
+
+    def acquire(self, lane: str, timeout: float = None) -> bool:
+        """
+        Block until ``lane`` gets a token. Returns False if the work was
+        dropped, either up front or because its deadline passed.
+        """
+        taken = False
+        with self._cond:
+            deadline = self._enter(lane, timeout)
+            if deadline is None:
+                return False
+            try:
+                while True:
+                    taken, wait = self._try_take(lane)
+                    remaining = deadline - time.monotonic()
+                    if taken or remaining <= 0:
+                        return taken
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._leave(lane, taken)
+
+    async def aacquire(self, lane: str, timeout: float = None) -> bool:
+        """
+        Async version of ``acquire``; sleeps on the event loop between
+        attempts instead of blocking a thread.
+        """
+        taken = False
+        with self._cond:
+            deadline = self._enter(lane, timeout)
+        if deadline is None:
+            return False
+        try:
+            while True:
+                with self._cond:
+                    taken, wait = self._try_take(lane)
+                remaining = deadline - time.monotonic()
+                if taken or remaining <= 0:
+                    return taken
+                await asyncio.sleep(min(wait, remaining))
+        finally:
+            with self._cond:
+                self._leave(lane, taken)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "tokens": round(self.tokens, 2),
+                "burst": self.burst,
+                "rate_per_second": self.rate,
+                "queue_depth": dict(self.queued),
+                "granted": dict(self.granted),
+                "dropped": dict(self.dropped),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> TokenBucketScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                workers = max(settings.POLYGON_WORKERS, 1)
+                _scheduler = TokenBucketScheduler(
+                    settings.POLYGON_RATE_PER_SECOND / workers,
+                    max(settings.POLYGON_BURST / workers, 1),
+                    settings.POLYGON_LANES,
+                )
+    return _scheduler
@@ -0,0 +1,188 @@
+"""
+Technical screener over the prediction universe.
+
+A ``Screen`` holds, for every symbol of the latest daily prediction batch,
+the latest close and SMA/EMA/MACD/RSI (``indicators.PARAMS``) together with
+the symbol's prediction and ``MonthlyGrade`` class. It is built from the
+bar store in one pass: the last ``SCREENER_LOOKBACK_BARS`` closes of every
+symbol go into a (symbols, days) matrix aligned on trading days, and each
+indicator is computed over the whole matrix at once. Filtering is then a
+handful of vectorized comparisons.
+
+Screens are built from the stored bars of completed sessions only, so the
+partial bar of an open session never moves them. They are cached per
+prediction batch and last completed trading day, and rebuilt when a sync
+stores completed bars (``bar_store.version``). ``manage.py refresh_market_data``
+syncs the bars of the universe after each close (``manage.py sync_bars``
+does it on demand).
+"""
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from . import bar_store, grades, indicators, market_hours, timeframes
+from .symbols import normalize_symbols
+
+
+def _optional(values: np.ndarray, i: int):
+    value = values[i]
+    return None if np.isnan(value) else float(value)
+
+
+class Screen:
+    def __init__(self, snapshot, bars, grade_classes):
+        self.snapshot = snapshot
+        self.symbols = tuple(symbol.upper() for symbol in snapshot.columns["symbol"])
+        lookback = settings.SCREENER_LOOKBACK_BARS
+        tails = [b[:, -lookback:] for b in bars]
+
+        # Align every symbol on the union of their trading days.
+        days = np.unique(np.concatenate([tail[bar_store.T] for tail in tails] or [np.empty(0)]))[-lookback:]
+        close = np.full((len(tails), len(days)), np.nan)
+        for i, tail in enumerate(tails):
+            pos = np.searchsorted(days, tail[bar_store.T])
+            found = pos < len(days)
+            found[found] = days[pos[found]] == tail[bar_store.T][found]
+            close[i, pos[found]] = tail[bar_store.C][found]
+
+        columns = {"close": close}
+        for name, params in indicators.PARAMS.items():
+            for field, column in indicators.compute(name, close, **params).items():
+                columns[name if field == "value" else f"{name}_{field}"] = column
+
+        # Each symbol is read at its own last close, so one whose latest bar
+        # is older than the last day is not read as NaN.
+        found = np.isfinite(close)
+        has_data = found.any(axis=1)
+        last = np.where(has_data, len(days) - 1 - np.argmax(found[:, ::-1], axis=1), 0)
+        rows = np.arange(len(tails))
+        self.values = {
+            name: np.where(has_data, column[rows, last], np.nan) if len(days) else np.full(len(tails), np.nan)
+            for name, column in columns.items()
+        }
+
+        self.as_of = (
+            np.datetime64(int(days[-1]), "ms").astype("datetime64[D]").item() if len(days) else None
+        )
+        self.pred_close = np.array(snapshot.columns["pred_close"], dtype=np.float64)
+        self.pred_open = np.array(snapshot.columns["pred_open"], dtype=np.float64)
+        self.sector_keys = np.array(snapshot.sector_keys, dtype=object)
+        self.grade_classes = tuple(grade_classes)
+        self.grade_keys = np.array(
+            [g.lower() if g else None for g in self.grade_classes], dtype=object
+        )
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def filter(self, rsi_below=None, rsi_above=None, above_sma=False, below_sma=False,
+               above_ema=False, below_ema=False, macd_above_signal=False, macd_below_signal=False,
+               min_pred_close=None, max_pred_close=None, grade_classes=None, sector=None):
+        """
+        Return the indices of the symbols matching every given condition, in
+        symbol order. Symbols lacking a value a condition needs do not match.
+        """
+        v = self.values
+        mask = np.ones(len(self), dtype=bool)
+        # NaN compares False, so missing values drop out on their own.
+        with np.errstate(invalid="ignore"):
+            if rsi_below is not None:
+                mask &= v["rsi"] < rsi_below
+            if rsi_above is not None:
+                mask &= v["rsi"] > rsi_above
+            if above_sma:
+                mask &= v["close"] > v["sma"]
+            if below_sma:
+                mask &= v["close"] < v["sma"]
+            if above_ema:
+                mask &= v["close"] > v["ema"]
+            if below_ema:
+                mask &= v["close"] < v["ema"]
+            if macd_above_signal:
+                mask &= v["macd"] > v["macd_signal"]
+            if macd_below_signal:
+                mask &= v["macd"] < v["macd_signal"]
+            if min_pred_close is not None:
+                mask &= self.pred_close >= min_pred_close
+            if max_pred_close is not None:
+                mask &= self.pred_close <= max_pred_close
+        if grade_classes:
+            mask &= np.isin(self.grade_keys, [g.lower() for g in grade_classes])
+        if sector is not None:
+            mask &= self.sector_keys == sector.lower()
+        return np.flatnonzero(mask).tolist()
+
+    def row(self, i: int) -> dict:
+        v = self.values
+        return {
+            "symbol": self.symbols[i],
+            "sector": self.snapshot.columns["sector"][i],
+            "close": _optional(v["close"], i),
+            "sma": _optional(v["sma"], i),
+            "ema": _optional(v["ema"], i),
+            "macd": _optional(v["macd"], i),
+            "macd_signal": _optional(v["macd_signal"], i),
+            "macd_histogram": _optional(v["macd_histogram"], i),
+            "rsi": _optional(v["rsi"], i),
+            "pred_close": _optional(self.pred_close, i),
+            "pred_open": _optional(self.pred_open, i),
+            "open_grade_class": self.grade_classes[i],
+        }
+
+
+_cached = (None, None)  # (key, Screen)
+_cached_lock = threading.Lock()
+
+
+def universe():
+    """
+    The symbols of the latest daily prediction batch, or None if there are
+    no predictions.
+    """
+    snapshot = timeframes.get(timeframes.DEFAULT).snapshot()
+    if snapshot is None:
+        return None
+    return normalize_symbols(snapshot.columns["symbol"])
+
+
+def build_screen(snapshot, completed) -> Screen:
+    """
+    Build the screen of ``snapshot``'s symbols from their stored bars up to
+    and including the day ``completed``.
+    """
+    symbols = [symbol.upper() for symbol in snapshot.columns["symbol"]]
+    bars = []
+    for symbol in symbols:
+        try:
+            bars.append(bar_store.between(bar_store.load(symbol), end=completed))
+        except ValueError:
+            bars.append(bar_store.EMPTY)
+    latest = grades.latest_grades(symbols)
+    grade_classes = [
+        latest[symbol].open_grade_class if symbol in latest else None for symbol in symbols
+    ]
+    return Screen(snapshot, bars, grade_classes)
+
+
+def get_screen():
+    """
+    Return the ``Screen`` for the current daily prediction batch and the
+    completed bars stored, building it on first use; None if there are no
+    predictions.
+    """
+    global _cached
+    snapshot = timeframes.get(timeframes.DEFAULT).snapshot()
+    if snapshot is None:
+        return None
+    completed = market_hours.last_completed_day()
+    key = (snapshot.etag, completed, bar_store.version())
+    cached_key, screen = _cached
+    if cached_key == key:
+        return screen
+    with _cached_lock:
+        cached_key, screen = _cached
+        if cached_key != key:
+            screen = build_screen(snapshot, completed)
+            _cached = (key, screen)
+        return screen
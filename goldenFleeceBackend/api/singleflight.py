@@ -0,0 +1,99 @@
+"""
+Single-flight request coalescing.
+
+While a call for a given key is in flight, other callers asking for the same
+key wait for it and share its result (or exception) instead of issuing their
+own. Works for threads (``do``) and for coroutines on an event loop (``ado``),
+and counts how many calls were coalesced.
+"""
+import asyncio
+import threading
+import weakref
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """
+        Return ``fn()``, sharing one execution among concurrent callers that
+        pass the same ``key``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, fn):
+        """
+        Async version of ``do``: ``fn`` is a zero-argument coroutine function.
+        Callers are coalesced per event loop.
+
+        The call runs in its own task, which every caller (the first one
+        included) awaits through ``asyncio.shield``: a cancelled caller stops
+        waiting, but the shared call goes on for the others.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+            task = calls.get(key)
+            if task is None:
+                task = calls[key] = loop.create_task(fn())
+                task.add_done_callback(lambda t: self._finish(calls, key, t))
+                self.leaders += 1
+            else:
+                self.followers += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, calls, key, task):
+        with self._lock:
+            if calls.get(key) is task:
+                del calls[key]
+        if not task.cancelled():
+            # Mark it retrieved so a call whose callers all went away does
+            # not log "exception was never retrieved".
+            task.exception()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.leaders + self.followers
+            return {
+                "in_flight": len(self._calls) + sum(map(len, self._async_calls.values())),
+                "upstream_calls": self.leaders,
+                "coalesced_calls": self.followers,
+                "coalescing_ratio": self.followers / total if total else 0.0,
+            }
@@ -0,0 +1,60 @@
+-- Covering indexes for the prediction and grade tables (Azure SQL / SQL Server).
+--
+-- The api models are unmanaged, so Django never creates these; apply this
+-- script by hand. Every statement is guarded and safe to re-run.
+--
+-- Access patterns served:
+--   * latest row per symbol: WHERE symbol = @s / symbol IN (...) ORDER BY date DESC,
+--     and ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY date DESC)
+--     -> IX_<table>_symbol_date, a seek on (symbol, date DESC). The INCLUDE
+--        list covers the columns the API serializes, so no key lookups.
+--   * latest batch for all symbols: WHERE date = (SELECT MAX(date) ...)
+--     -> IX_<table>_date, covering the ranking columns.
+--
+-- symbol is compared with = / IN against already upper-cased input. Do not
+-- wrap it in UPPER() or LIKE, which would turn these seeks back into scans.
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PredsDaily_symbol_date' AND object_id = OBJECT_ID('dbo.PredsDaily'))
+    CREATE UNIQUE NONCLUSTERED INDEX IX_PredsDaily_symbol_date
+        ON dbo.PredsDaily (symbol, date DESC)
+        INCLUDE (sector, pred, pred_sign, actual, actual_sign,
+                 pred_open, pred_close, actual_open, actual_close,
+                 pred_open_sign, pred_close_sign, actual_open_sign, actual_close_sign,
+                 inUpper, inLower, Above, Below, Perfect,
+                 inUpperO, inLowerO, PerfectO, inUpperC, inLowerC, PerfectC,
+                 AboveO, BelowO, AboveC, BelowC);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PredsDaily_date' AND object_id = OBJECT_ID('dbo.PredsDaily'))
+    CREATE NONCLUSTERED INDEX IX_PredsDaily_date
+        ON dbo.PredsDaily (date DESC)
+        INCLUDE (symbol, sector, pred_open, pred_close);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PredsWeekly_symbol_date' AND object_id = OBJECT_ID('dbo.PredsWeekly'))
+    CREATE UNIQUE NONCLUSTERED INDEX IX_PredsWeekly_symbol_date
+        ON dbo.PredsWeekly (symbol, date DESC)
+        INCLUDE (sector, pred_open, pred_close, actual_open, actual_close,
+                 pred_open_sign, pred_close_sign, actual_open_sign, actual_close_sign);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PredsWeekly_date' AND object_id = OBJECT_ID('dbo.PredsWeekly'))
+    CREATE NONCLUSTERED INDEX IX_PredsWeekly_date
+        ON dbo.PredsWeekly (date DESC)
+        INCLUDE (symbol, sector, pred_open, pred_close);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PredsMonthly_symbol_date' AND object_id = OBJECT_ID('dbo.PredsMonthly'))
+    CREATE UNIQUE NONCLUSTERED INDEX IX_PredsMonthly_symbol_date
+        ON dbo.PredsMonthly (symbol, date DESC)
+        INCLUDE (sector, pred_open, pred_close, actual_open, actual_close,
+                 pred_open_sign, pred_close_sign, actual_open_sign, actual_close_sign);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_PredsMonthly_date' AND object_id = OBJECT_ID('dbo.PredsMonthly'))
+    CREATE NONCLUSTERED INDEX IX_PredsMonthly_date
+        ON dbo.PredsMonthly (date DESC)
+        INCLUDE (symbol, sector, pred_open, pred_close);
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_MonthlyGrades_symbol_date' AND object_id = OBJECT_ID('dbo.MonthlyGrades'))
+    CREATE UNIQUE NONCLUSTERED INDEX IX_MonthlyGrades_symbol_date
+        ON dbo.MonthlyGrades (symbol, date DESC)
+        INCLUDE (open_grade, open_grade_sign, open_grade_class);
+
+-- The accuracy tables (DailyAcc, WeeklyAcc, MonthlyAcc) are keyed on symbol
+-- already; the band subqueries seek on that primary key.
@@ -0,0 +1,19 @@
+"""
+Ticker symbol normalization.
+
+Symbols are stored upper-case, so request input is normalized once at the
+view boundary and queried with plain ``symbol = %s`` / ``symbol IN (...)``
+predicates. Unlike ``symbol__iexact`` (``UPPER(symbol) LIKE UPPER(%s)`` on
+SQL Server) those can seek on the ``(symbol, date)`` indexes.
+"""
+
+
+def normalize_symbol(symbol) -> str:
+    return (symbol or "").strip().upper()
+
+
+def normalize_symbols(symbols) -> list:
+    """
+    Normalize ``symbols``, dropping blanks and duplicates but keeping order.
+    """
+    return list(dict.fromkeys(filter(None, map(normalize_symbol, symbols))))
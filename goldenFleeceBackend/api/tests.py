@@ -1,3 +1,1675 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from . import (
+    async_views,
+    bar_store,
+    circuit_breaker,
+    conditional,
+    fast_serializers,
+    grades,
+    hot_stocks,
+    indicators,
+    market_data,
+    market_hours,
+    polygon,
+    prediction_store,
+    predictions,
+    quotes,
+    scheduler,
+    screener,
+    timeframes,
+    upstream_cache,
+    views,
+)
+from .management.commands import refresh_market_data
+from .models import PredsDaily
+from .serializers import PredsDailySerializer
+from .singleflight import SingleFlight
+from .upstream_cache import CacheEntry
+
+TESTDATA = os.path.join(os.path.dirname(__file__), "testdata")
+
+# Keeps the market-data cache of every test in memory.
+MARKET_DATA_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "market_data": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests-market-data",
+    },
+}
+
+
+@override_settings(CACHES=MARKET_DATA_CACHES, MARKET_DATA_INLINE_FALLBACK=False)
+class AsyncViewTests(SimpleTestCase):
+    def setUp(self):
+        market_data.get_cache().clear()
+
+    def get_async(self, view, method="get", **headers):
+        request = getattr(AsyncRequestFactory(), method)("/api/index-prices/", headers=headers)
+        response = asyncio.run(view(request))
+        response.render()
+        return response
+
+    def get_sync(self, view, method="get"):
+        response = view(getattr(RequestFactory(), method)("/api/index-prices/"))
+        response.render()
+        return response
+
+    def test_views_are_coroutines(self):
+        for name in ("get_index_prices", "get_hot_stocks", "get_sector_performance",
+                     "stock_detail", "search_stocks"):
+            self.assertTrue(asyncio.iscoroutinefunction(getattr(async_views, name)), name)
+
+    def test_same_body_as_the_sync_view(self):
+        market_data.store(market_data.INDEX_PRICES, {"dow": {"price": "1.00", "change": "+0.00 (+0.00%)"}})
+        expected = self.get_sync(views.get_index_prices)
+        response = self.get_async(async_views.get_index_prices)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], expected["Content-Type"])
+        self.assertEqual(response.content, expected.content)
+
+    def test_missing_entry_is_unavailable(self):
+        response = self.get_async(async_views.get_sector_performance)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            response.content, self.get_sync(views.get_sector_performance).content
+        )
+
+    def test_invalid_query_is_a_bad_request(self):
+        request = AsyncRequestFactory().get("/api/hot-stocks/", {"list": "unknown"})
+        response = asyncio.run(async_views.get_hot_stocks(request))
+        response.render()
+        self.assertEqual(response.status_code, 400)
+
+    def test_method_not_allowed(self):
+        response = self.get_async(async_views.get_index_prices, method="post")
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(
+            response.content, self.get_sync(views.get_index_prices, method="post").content
+        )
+
+    def test_authentication_runs_first(self):
+        market_data.store(market_data.INDEX_PRICES, {})
+        response = self.get_async(async_views.get_index_prices, Authorization="Bearer not-a-token")
+        self.assertEqual(response.status_code, 401)
+
+
+def _snapshot_body(*tickers):
+    """
+    A multi-ticker snapshot body with (ticker, close, previous close) rows.
+    """
+    return {"status": "OK", "tickers": [
+        {"ticker": ticker, "day": {"c": close}, "prevDay": {"c": prev}}
+        for ticker, close, prev in tickers
+    ]}
+
+
+def _aggs_body(*closes):
+    """
+    A 7-day aggs body, newest close first as ``sort=desc`` returns it.
+    """
+    return {"status": "OK", "results": [{"c": close} for close in closes]}
+
+
+class QuotesTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(polygon, "get")
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, snapshot, aggs=None):
+        def get(path, params=None, *, endpoint="default"):
+            if path == quotes.SNAPSHOT_PATH:
+                return snapshot
+            ticker = path.split("/")[4]
+            return (aggs or {}).get(ticker, _aggs_body())
+        self.get.side_effect = get
+
+    def paths(self):
+        return sorted(c.args[0].split("/")[4] if "aggs" in c.args[0] else "snapshot"
+                      for c in self.get.call_args_list)
+
+    def test_one_snapshot_call_for_every_ticker(self):
+        self.respond(_snapshot_body(("DIA", 400.5, 401.0), ("SPY", 500.0, 498.0)))
+        self.assertEqual(
+            quotes.batch_last_two_closes(["SPY", "DIA"]),
+            {"SPY": (500.0, 498.0), "DIA": (400.5, 401.0)},
+        )
+        self.assertEqual(self.paths(), ["snapshot"])
+        self.assertEqual(self.get.call_args.args[1], {"tickers": "SPY,DIA"})
+
+    def test_missing_tickers_fall_back_to_aggs(self):
+        # Before the open the snapshot's day bar is still empty.
+        body = _snapshot_body(("SPY", 500.0, 498.0), ("QQQ", 0, 430.0))
+        self.respond(body, {"QQQ": _aggs_body(431.0, 429.5), "XLRE": _aggs_body(40.0)})
+        self.assertEqual(
+            quotes.batch_last_two_closes(["SPY", "QQQ", "XLRE", "NONE"]),
+            {"SPY": (500.0, 498.0), "QQQ": (431.0, 429.5), "XLRE": (40.0, 40.0), "NONE": (None, None)},
+        )
+        self.assertEqual(self.paths(), ["NONE", "QQQ", "XLRE", "snapshot"])
+
+    def test_failed_snapshot_falls_back_to_aggs(self):
+        def get(path, params=None, *, endpoint="default"):
+            if path == quotes.SNAPSHOT_PATH:
+                raise polygon.UpstreamUnavailable("circuit open")
+            return _aggs_body(10.0, 9.0)
+        self.get.side_effect = get
+        with self.assertLogs("api.quotes", "WARNING"):
+            closes = quotes.batch_last_two_closes(["SPY"])
+        self.assertEqual(closes, {"SPY": (10.0, 9.0)})
+
+    def test_async_version_matches(self):
+        self.respond(_snapshot_body(("SPY", 500.0, 498.0)), {"QQQ": _aggs_body(431.0, 429.5)})
+
+        async def aget(path, params=None, *, endpoint="default"):
+            return self.get(path, params, endpoint=endpoint)
+
+        with mock.patch.object(polygon, "aget", aget):
+            closes = asyncio.run(quotes.abatch_last_two_closes(["SPY", "QQQ"]))
+        self.assertEqual(closes, quotes.batch_last_two_closes(["SPY", "QQQ"]))
+
+    def test_no_tickers_makes_no_call(self):
+        # An empty tickers= would fetch the whole market.
+        self.assertEqual(quotes.batch_last_two_closes([]), {})
+        self.assertEqual(asyncio.run(quotes.abatch_last_two_closes([])), {})
+        self.get.assert_not_called()
+
+
+def _market_time(*args) -> datetime:
+    return datetime(*args, tzinfo=market_hours.MARKET_TZ)
+
+
+class MarketHoursTests(SimpleTestCase):
+    def test_holidays(self):
+        self.assertTrue(market_hours.is_trading_day(date(2025, 4, 17)))
+        self.assertFalse(market_hours.is_trading_day(date(2025, 4, 18)))  # Good Friday
+        self.assertFalse(market_hours.is_trading_day(date(2025, 6, 19)))  # Juneteenth
+        self.assertFalse(market_hours.is_trading_day(date(2026, 7, 3)))  # July 4th observed
+        # New Year's Day on a Saturday is not made up on the Friday before.
+        self.assertTrue(market_hours.is_trading_day(date(2021, 12, 31)))
+
+    def test_regular_session(self):
+        self.assertFalse(market_hours.is_open(_market_time(2025, 1, 6, 9, 29)))
+        self.assertTrue(market_hours.is_open(_market_time(2025, 1, 6, 9, 30)))
+        self.assertTrue(market_hours.is_open(_market_time(2025, 1, 6, 15, 59)))
+        self.assertFalse(market_hours.is_open(_market_time(2025, 1, 6, 16, 0)))
+        self.assertFalse(market_hours.is_open(_market_time(2025, 1, 4, 12, 0)))
+
+    def test_next_open_skips_weekends_and_holidays(self):
+        self.assertEqual(
+            market_hours.next_open(_market_time(2025, 1, 6, 8, 0)), _market_time(2025, 1, 6, 9, 30)
+        )
+        # Friday after the close -> Tuesday, Monday being Martin Luther King Jr. Day.
+        self.assertEqual(
+            market_hours.next_open(_market_time(2025, 1, 17, 16, 0)), _market_time(2025, 1, 21, 9, 30)
+        )
+
+    def test_last_completed_day(self):
+        last = market_hours.last_completed_day
+        self.assertEqual(last(_market_time(2025, 1, 8, 15, 59)), date(2025, 1, 7))
+        self.assertEqual(last(_market_time(2025, 1, 8, 16, 0)), date(2025, 1, 8))
+        self.assertEqual(last(_market_time(2025, 1, 11, 12, 0)), date(2025, 1, 10))
+        # Tuesday morning after Martin Luther King Jr. Day -> the Friday before.
+        self.assertEqual(last(_market_time(2025, 1, 21, 9, 0)), date(2025, 1, 17))
+
+
+class CacheExpiryTests(SimpleTestCase):
+    def test_session_ttl_while_open(self):
+        at = _market_time(2025, 1, 6, 11, 0).timestamp()
+        self.assertEqual(upstream_cache.expiry_for("snapshot", at), at + 15)
+        self.assertEqual(upstream_cache.expiry_for("unknown", at), at + 60)
+
+    def test_market_families_last_until_the_next_open(self):
+        at = _market_time(2025, 1, 17, 16, 30).timestamp()
+        next_open = _market_time(2025, 1, 21, 9, 30).timestamp()
+        for endpoint in ("aggs", "snapshot", "market_snapshot", "indicators"):
+            self.assertEqual(upstream_cache.expiry_for(endpoint, at), next_open, endpoint)
+
+    def test_other_families_keep_their_ttl_after_the_close(self):
+        at = _market_time(2025, 1, 17, 16, 30).timestamp()
+        self.assertEqual(upstream_cache.expiry_for("search", at), at + 60 * 60)
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_expired_entries_stay_for_lookup(self):
+        cache = upstream_cache.TTLCache(10)
+        cache.set("key", "value", expires_at=100.0)
+        self.assertEqual(cache.get("key", now=99.0), "value")
+        self.assertIs(cache.get("key", now=100.0), upstream_cache.MISSING)
+        self.assertEqual(cache.lookup("key", now=101.0).value, "value")
+        self.assertIs(cache.get("other"), upstream_cache.MISSING)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["stale_hits"], stats["misses"]), (1, 2, 1))
+
+    def test_evicts_the_least_recently_used(self):
+        cache = upstream_cache.TTLCache(2)
+        cache.set("a", 1, expires_at=float("inf"))
+        cache.set("b", 2, expires_at=float("inf"))
+        cache.get("a")
+        cache.set("c", 3, expires_at=float("inf"))
+        self.assertIs(cache.get("b"), upstream_cache.MISSING)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class _Upstream:
+    """
+    Stands in for the pooled session: answers every GET with ``body`` and
+    counts the calls.
+    """
+
+    def __init__(self, body=None, status_code=200):
+        self.body = {"status": "OK"} if body is None else body
+        self.status_code = status_code
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        if isinstance(self.body, Exception):
+            raise self.body
+        return mock.Mock(status_code=self.status_code, json=lambda: self.body)
+
+
+class PolygonTestCase(SimpleTestCase):
+    """
+    Runs ``polygon.get`` against an ``_Upstream`` with an empty cache and
+    closed circuit breakers.
+    """
+
+    def setUp(self):
+        polygon.get_cache().clear()
+        polygon._breakers.clear()
+        self.upstream = _Upstream()
+        patcher = mock.patch.object(polygon, "get_session", return_value=self.upstream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class PolygonCacheTests(PolygonTestCase):
+    def test_repeat_requests_are_served_from_the_cache(self):
+        first = polygon.get("/v3/reference/tickers/AAPL", endpoint="reference")
+        second = polygon.get("/v3/reference/tickers/AAPL", endpoint="reference")
+        self.assertIs(second, first)
+        self.assertEqual(self.upstream.calls, 1)
+
+    def test_equivalent_parameters_share_an_entry(self):
+        polygon.get("/v3/reference/tickers", {"search": "a", "limit": 5}, endpoint="search")
+        polygon.get("/v3/reference/tickers", {"limit": 5, "search": "a"}, endpoint="search")
+        self.assertEqual(self.upstream.calls, 1)
+
+    def test_errors_are_not_cached(self):
+        self.upstream.body = {"status": "ERROR", "error": "Unknown API Key"}
+        polygon.get("/v3/reference/tickers/AAPL", endpoint="reference")
+        polygon.get("/v3/reference/tickers/AAPL", endpoint="reference")
+        self.assertEqual(self.upstream.calls, 2)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(circuit_breaker.time, "monotonic", return_value=100.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = circuit_breaker.CircuitBreaker(
+            "test", failure_threshold=2, reset_timeout=30, probe_timeout=60
+        )
+
+    def trip(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+
+    def test_lets_one_probe_through_after_the_reset_timeout(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_probe_success_closes(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_probe_failure_reopens(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.clock.return_value = 160.0
+        self.assertTrue(self.breaker.allow())
+
+    def test_released_probe_can_be_retried_at_once(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.allow()
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, circuit_breaker.OPEN)
+        self.assertTrue(self.breaker.allow())
+
+    def test_release_does_not_affect_a_closed_breaker(self):
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, circuit_breaker.CLOSED)
+
+    def test_lost_probe_is_replaced_after_the_probe_timeout(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.allow()
+        self.clock.return_value = 189.0
+        self.assertFalse(self.breaker.allow())
+        self.clock.return_value = 190.0
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, circuit_breaker.HALF_OPEN)
+
+
+class _InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class StaleWhileRevalidateTests(PolygonTestCase):
+    PATH = "/v2/aggs/ticker/SPY/range/1/day/2025-01-01/2025-01-07"
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(polygon, "get_executor", return_value=_InlineExecutor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cache(self, body, expired_for):
+        polygon.get_cache().set(self.PATH, body, time.time() - expired_for)
+
+    def test_recently_expired_entry_is_served_and_refreshed(self):
+        self.cache({"status": "OK", "old": True}, expired_for=1)
+        self.upstream.body = {"status": "OK", "old": False}
+        with polygon.track_staleness() as report:
+            body = polygon.get(self.PATH, endpoint="aggs")
+        self.assertTrue(body["old"])
+        self.assertTrue(report.stale)
+        self.assertEqual(self.upstream.calls, 1)
+        self.assertFalse(polygon.get(self.PATH, endpoint="aggs")["old"])
+
+    def test_long_expired_entry_is_refetched(self):
+        self.cache({"status": "OK", "old": True}, expired_for=settings.POLYGON_STALE_WHILE_REVALIDATE + 1)
+        self.upstream.body = {"status": "OK", "old": False}
+        with polygon.track_staleness() as report:
+            body = polygon.get(self.PATH, endpoint="aggs")
+        self.assertFalse(body["old"])
+        self.assertFalse(report.stale)
+
+    def test_failed_refetch_serves_the_last_good_value(self):
+        self.cache({"status": "OK", "old": True}, expired_for=settings.POLYGON_STALE_WHILE_REVALIDATE + 1)
+        self.upstream.body = {"status": "ERROR"}
+        self.upstream.status_code = 503
+        with polygon.track_staleness() as report:
+            body = polygon.get(self.PATH, endpoint="aggs")
+        self.assertTrue(body["old"])
+        self.assertTrue(report.stale)
+        self.assertTrue(report.marker()["stale"])
+
+    def test_open_circuit_serves_the_last_good_value_without_a_call(self):
+        self.cache({"status": "OK", "old": True}, expired_for=settings.POLYGON_STALE_WHILE_REVALIDATE + 1)
+        breaker = polygon.get_breaker("aggs")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        with polygon.track_staleness() as report:
+            self.assertTrue(polygon.get(self.PATH, endpoint="aggs")["old"])
+        self.assertTrue(report.stale)
+        self.assertEqual(self.upstream.calls, 0)
+
+    def test_open_circuit_without_a_cached_value(self):
+        breaker = polygon.get_breaker("aggs")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        with self.assertRaises(polygon.UpstreamUnavailable):
+            polygon.get(self.PATH, endpoint="aggs")
+
+    def test_failures_open_the_circuit(self):
+        self.upstream.body = ConnectionError("reset")
+        for _ in range(settings.POLYGON_BREAKER_FAILURES):
+            with self.assertRaises(ConnectionError):
+                polygon.get(self.PATH, endpoint="aggs")
+        self.assertEqual(polygon.get_breaker("aggs").state, circuit_breaker.OPEN)
+
+    def test_stale_rows_are_flagged(self):
+        self.cache({"status": "OK"}, expired_for=1)
+        with polygon.track_staleness() as report:
+            polygon.get(self.PATH, endpoint="aggs")
+        rows = [{"price": "1.00"}]
+        views._mark_stale(rows, report)
+        self.assertEqual(set(rows[0]), {"price", "stale", "as_of"})
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_threads_share_one_call(self):
+        group = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "value"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(group.do("key", fn)))
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=lambda: results.append(group.do("key", fn)))
+        follower.start()
+        while group.stats()["coalesced_calls"] < 1:
+            pass
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(results, ["value", "value"])
+        self.assertEqual(len(calls), 1)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        group = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def scenario():
+            leader = asyncio.ensure_future(group.ado("key", fn))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(group.ado("key", fn))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        self.assertEqual(asyncio.run(scenario()), "value")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(group.stats()["in_flight"], 0)
+
+    def test_errors_reach_every_caller(self):
+        group = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream")
+
+        async def scenario():
+            return await asyncio.gather(
+                group.ado("key", fn), group.ado("key", fn), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+        self.assertEqual([type(r) for r in results], [ValueError, ValueError])
+        self.assertEqual(group.stats()["upstream_calls"], 1)
+
+    def test_later_calls_run_again(self):
+        group = SingleFlight()
+        self.assertEqual(group.do("key", lambda: 1), 1)
+        self.assertEqual(group.do("key", lambda: 2), 2)
+        self.assertEqual(group.stats()["upstream_calls"], 2)
+        self.assertEqual(group.stats()["coalescing_ratio"], 0.0)
+
+
+class _AsyncUpstream:
+    """
+    Async client stand-in: every GET takes ``delay`` seconds.
+    """
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = 0
+
+    async def get(self, path, params=None, timeout=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return mock.Mock(status_code=200, json=lambda: {"status": "OK", "path": path})
+
+
+class PolygonCoalescingTests(PolygonTestCase):
+    def test_concurrent_identical_fetches_share_one_call(self):
+        upstream = _AsyncUpstream()
+        stats = polygon.singleflight_stats()
+
+        async def scenario():
+            return await asyncio.gather(
+                *[polygon.aget("/v3/reference/tickers/NVDA", endpoint="reference") for _ in range(5)],
+                polygon.aget("/v3/reference/tickers/AMD", endpoint="reference"),
+            )
+
+        with mock.patch.object(polygon, "get_async_client", return_value=upstream):
+            results = asyncio.run(scenario())
+        self.assertEqual(upstream.calls, 2)
+        self.assertEqual([r["path"] for r in results[:5]], ["/v3/reference/tickers/NVDA"] * 5)
+        after = polygon.singleflight_stats()
+        self.assertEqual(after["upstream_calls"] - stats["upstream_calls"], 2)
+        self.assertEqual(after["coalesced_calls"] - stats["coalesced_calls"], 4)
+
+
+class SchedulerTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(scheduler.time, "monotonic", return_value=100.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = scheduler.TokenBucketScheduler(
+            rate=10, burst=4, lanes=settings.POLYGON_LANES
+        )
+
+    def take(self, lane):
+        return self.scheduler.acquire(lane, timeout=0)
+
+    def test_burst_then_refill_rate(self):
+        self.assertEqual([self.take(scheduler.INTERACTIVE) for _ in range(5)], [True] * 4 + [False])
+        self.clock.return_value = 100.25
+        self.assertEqual([self.take(scheduler.INTERACTIVE) for _ in range(3)], [True, True, False])
+
+    def test_lower_lanes_wait_behind_higher_ones(self):
+        self.scheduler.queued[scheduler.DASHBOARD] += 1  # a dashboard call is waiting
+        self.assertFalse(self.take(scheduler.SEARCH))
+        self.assertFalse(self.take(scheduler.BACKGROUND))
+        self.assertTrue(self.take(scheduler.DASHBOARD))
+        self.assertTrue(self.take(scheduler.INTERACTIVE))
+
+    def test_reserve_is_kept_for_higher_lanes(self):
+        # Background keeps a quarter of the bucket (one token) free.
+        self.assertEqual([self.take(scheduler.BACKGROUND) for _ in range(4)], [True] * 3 + [False])
+        self.assertTrue(self.take(scheduler.INTERACTIVE))
+
+    def test_full_queue_drops_up_front(self):
+        self.scheduler.queued[scheduler.SEARCH] = settings.POLYGON_LANES[scheduler.SEARCH]["max_queue"]
+        self.assertFalse(self.scheduler.acquire(scheduler.SEARCH))
+        self.assertEqual(self.scheduler.stats()["dropped"][scheduler.SEARCH], 1)
+
+    def test_drops_work_that_cannot_meet_its_deadline(self):
+        for _ in range(4):
+            self.take(scheduler.INTERACTIVE)
+        # The next token is 0.1s away; the search lane waits at most 1s, so
+        # it is queued, but not behind 20 dashboard callers.
+        self.scheduler.queued[scheduler.DASHBOARD] = 20
+        self.assertFalse(self.scheduler.acquire(scheduler.SEARCH))
+        self.assertEqual(self.scheduler.queued[scheduler.SEARCH], 0)
+
+    def test_async_waits_for_a_token(self):
+        for _ in range(4):
+            self.take(scheduler.INTERACTIVE)
+
+        async def sleep(seconds):
+            self.clock.return_value += seconds
+
+        with mock.patch.object(scheduler.asyncio, "sleep", sleep):
+            self.assertTrue(asyncio.run(self.scheduler.aacquire(scheduler.DASHBOARD)))
+        # One token refills every 0.1s.
+        self.assertLess(self.clock.return_value, 100.25)
+
+    def test_stats(self):
+        self.take(scheduler.INTERACTIVE)
+        stats = self.scheduler.stats()
+        self.assertEqual(stats["tokens"], 3)
+        self.assertEqual(stats["granted"][scheduler.INTERACTIVE], 1)
+        self.assertEqual(stats["queue_depth"][scheduler.INTERACTIVE], 0)
+
+    @override_settings(POLYGON_WORKERS=4, POLYGON_RATE_PER_SECOND=50, POLYGON_BURST=100)
+    def test_each_worker_gets_its_share_of_the_account_limit(self):
+        with mock.patch.object(scheduler, "_scheduler", None):
+            shared = scheduler.get_scheduler()
+        self.assertEqual((shared.rate, shared.burst), (12.5, 25))
+
+
+class PolygonSchedulingTests(PolygonTestCase):
+    PATH = "/v3/reference/tickers/AAPL"
+
+    def setUp(self):
+        super().setUp()
+        self.scheduler = mock.Mock()
+        patcher = mock.patch.object(scheduler, "get_scheduler", return_value=self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_circuit(self):
+        breaker = polygon.get_breaker("reference")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        return breaker
+
+    def test_calls_use_the_view_lane(self):
+        @polygon.priority(scheduler.SEARCH)
+        def view():
+            return polygon.get(self.PATH, endpoint="reference")
+
+        view()
+        self.scheduler.acquire.assert_called_once_with(scheduler.SEARCH)
+
+    def test_open_circuit_takes_no_token(self):
+        self.open_circuit()
+        with self.assertRaises(polygon.UpstreamUnavailable):
+            polygon.get(self.PATH, endpoint="reference")
+        self.scheduler.acquire.assert_not_called()
+
+    def test_dropped_probe_is_released(self):
+        breaker = self.open_circuit()
+        breaker.opened_at -= breaker.reset_timeout
+        self.scheduler.acquire.return_value = False
+        with self.assertRaises(polygon.UpstreamSaturated):
+            polygon.get(self.PATH, endpoint="reference")
+        self.assertEqual(self.upstream.calls, 0)
+        self.assertEqual(breaker.state, circuit_breaker.OPEN)
+        self.assertTrue(breaker.allow())
+
+    def test_async_dropped_probe_is_released(self):
+        breaker = self.open_circuit()
+        breaker.opened_at -= breaker.reset_timeout
+        self.scheduler.aacquire = mock.AsyncMock(return_value=False)
+        with self.assertRaises(polygon.UpstreamSaturated):
+            asyncio.run(polygon.aget(self.PATH, endpoint="reference"))
+        self.assertTrue(breaker.allow())
+
+    def test_rate_limited_response_is_not_retried_and_serves_the_cached_value(self):
+        polygon.get_cache().set(self.PATH, {"status": "OK", "cached": True}, time.time() - 3600)
+        self.upstream.body = {"status": "ERROR"}
+        self.upstream.status_code = 429
+        self.assertTrue(polygon.get(self.PATH, endpoint="reference")["cached"])
+        self.assertEqual(self.upstream.calls, 1)
+        self.assertEqual(polygon.get_breaker("reference").failures, 1)
+
+
+PREDICTION_DATE = date(2025, 1, 6)
+PREDICTION_FIELDS = tuple(f.attname for f in PredsDaily._meta.concrete_fields)
+
+
+def _prediction(symbol, bands=(1.5, -1.5), live_acc=None, mkt_cap=None, **values):
+    """
+    One row of the daily prediction table as ``PredictionStore`` loads it:
+    the ``PredsDaily`` columns, then ``acc_found`` and the accuracy columns
+    (upper_95C, lower_95C, liveAcc, MktCap). ``bands=None`` means the symbol
+    has no accuracy row.
+    """
+    row = dict.fromkeys(PREDICTION_FIELDS)
+    row.update(symbol=symbol, date=PREDICTION_DATE, **values)
+    upper, lower = bands or (None, None)
+    return (*row.values(), bands is not None, upper, lower, live_acc, mkt_cap)
+
+
+def _daily_snapshot(*rows):
+    rows = sorted(rows)
+    return prediction_store.PredictionSnapshot(
+        PredsDaily, timeframes.get("daily").acc_fields, (PREDICTION_DATE, len(rows)), rows
+    )
+
+
+def _database_prediction(symbol, bands=(1.5, -1.5), **values):
+    """
+    A ``PredsDaily`` row annotated as ``predictions.with_bands`` does.
+    """
+    prediction = PredsDaily(symbol=symbol, date=date(2024, 12, 30), **values)
+    prediction.acc_found = bands is not None
+    prediction.acc_upper_95C, prediction.acc_lower_95C = bands or (None, None)
+    return prediction
+
+
+class PredictionViewTestCase(SimpleTestCase):
+    """
+    Serves the daily time frame from ``self.daily`` (a snapshot, or None)
+    and the others from nothing, and fails any database fallback unless a
+    test stubs it.
+    """
+
+    daily = None
+
+    def setUp(self):
+        def get_snapshot(PredictionModel, AccModel, acc_fields):
+            return self.daily if PredictionModel is PredsDaily else None
+
+        for target, kwargs in (
+            (prediction_store, {"get_snapshot": mock.Mock(side_effect=get_snapshot)}),
+            (predictions, {"latest_prediction": mock.Mock(return_value=None),
+                           "latest_predictions": mock.Mock(return_value={})}),
+        ):
+            patcher = mock.patch.multiple(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        conditional.get_body_cache().clear()
+        self.factory = APIRequestFactory()
+
+    def call(self, view, path, data=None, method="get", **extra):
+        if method == "post":
+            request = self.factory.post(path, data, format="json", **extra)
+        else:
+            request = self.factory.get(path, data, **extra)
+        response = view(request)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+
+class PredictionSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = _daily_snapshot(
+            _prediction("MSFT", pred_close=-0.25, sector="Tech", bands=None),
+            _prediction("AAPL", pred_close=0.5, sector="Tech"),
+        )
+
+    def test_rows_are_indexed_by_symbol(self):
+        self.assertEqual(len(self.snapshot), 2)
+        self.assertEqual(self.snapshot.find("AAPL"), 0)
+        self.assertEqual(self.snapshot.find("MSFT"), 1)
+        self.assertIsNone(self.snapshot.find("TSLA"))
+
+    def test_values_and_bands(self):
+        self.assertEqual(self.snapshot.values(0, ("symbol", "pred_close")), ("AAPL", 0.5))
+        self.assertEqual(
+            self.snapshot.tuples(("symbol", "sector"), [1, 0]), [("MSFT", "Tech"), ("AAPL", "Tech")]
+        )
+        self.assertTrue(self.snapshot.has_bands(0))
+        self.assertEqual(self.snapshot.bands(0), {"upper_95C": 1.5, "lower_95C": -1.5})
+        self.assertFalse(self.snapshot.has_bands(1))
+
+    def test_etag_covers_the_accuracy_columns(self):
+        same = _daily_snapshot(
+            _prediction("MSFT", pred_close=-0.25, sector="Tech", bands=None),
+            _prediction("AAPL", pred_close=0.5, sector="Tech"),
+        )
+        moved = _daily_snapshot(
+            _prediction("MSFT", pred_close=-0.25, sector="Tech", bands=None),
+            _prediction("AAPL", pred_close=0.5, sector="Tech", bands=(1.75, -1.5)),
+        )
+        self.assertEqual(same.etag, self.snapshot.etag)
+        self.assertNotEqual(moved.etag, self.snapshot.etag)
+        self.assertTrue(self.snapshot.etag.startswith("PredsDaily-2025-01-06-2-"))
+
+
+@override_settings(PREDICTION_SNAPSHOT_PROBE_INTERVAL=30, PREDICTION_SNAPSHOT_MAX_AGE=3600)
+class PredictionStoreTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(prediction_store.time, "monotonic", return_value=1000.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = prediction_store.PredictionStore(
+            PredsDaily, None, timeframes.get("daily").acc_fields
+        )
+        self.version = (PREDICTION_DATE, 1)
+        self.rows = [_prediction("AAPL", pred_close=0.5)]
+        self.probe = mock.Mock(side_effect=lambda: self.version)
+        self.load = mock.Mock(side_effect=lambda version: _daily_snapshot(*self.rows))
+        self.store._probe, self.store._load = self.probe, self.load
+
+    def test_probes_at_most_once_per_interval(self):
+        first = self.store.get()
+        self.clock.return_value = 1029.0
+        self.assertIs(self.store.get(), first)
+        self.assertEqual((self.probe.call_count, self.load.call_count), (1, 1))
+        self.clock.return_value = 1030.0
+        self.assertIs(self.store.get(), first)
+        self.assertEqual((self.probe.call_count, self.load.call_count), (2, 1))
+
+    def test_new_version_reloads(self):
+        first = self.store.get()
+        self.version = (date(2025, 1, 7), 1)
+        self.clock.return_value = 1030.0
+        self.assertIsNot(self.store.get(), first)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_reloads_after_max_age(self):
+        with mock.patch.object(prediction_store.time, "time", return_value=1_736_200_000):
+            first = self.store.get()
+        self.clock.return_value = 1000.0 + 3600
+        second = self.store.get()
+        self.assertIsNot(second, first)
+        # Same content: Last-Modified stays that of the first load.
+        self.assertEqual(second.last_modified, 1_736_200_000)
+
+        self.rows = [_prediction("AAPL", pred_close=0.5, live_acc=0.7)]
+        self.clock.return_value = 1000.0 + 7200
+        self.assertNotEqual(self.store.get().etag, first.etag)
+
+    def test_empty_table(self):
+        self.version = None
+        self.assertIsNone(self.store.get())
+        self.load.assert_not_called()
+
+
+class PredictionViewsFromSnapshotTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(
+            _prediction("AAPL", pred_close=0.5), _prediction("MSFT", pred_close=-0.25)
+        )
+
+    def test_prediction_detail(self):
+        response = self.call(lambda r: views.prediction_detail(r, " aapl"), "/api/prediction/aapl/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["pred_close"], 0.5)
+        self.assertEqual(response.data["upper_95C"], 1.5)
+        predictions.latest_prediction.assert_not_called()
+
+    def test_older_symbols_are_read_from_the_database(self):
+        predictions.latest_prediction.return_value = _database_prediction("TSLA", pred_close=2.0)
+        response = self.call(lambda r: views.prediction_detail(r, "TSLA"), "/api/prediction/TSLA/")
+        self.assertEqual(response.data["pred_close"], 2.0)
+        self.assertEqual(response.data["date"], "2024-12-30")
+
+    def test_all_predictions(self):
+        response = self.call(views.all_predictions, "/api/all-predictions/")
+        self.assertEqual([row["symbol"] for row in json.loads(response.content)], ["AAPL", "MSFT"])
+
+    def test_no_batch(self):
+        self.daily = None
+        self.assertEqual(self.call(views.all_predictions, "/api/all-predictions/").status_code, 404)
+        self.assertEqual(self.call(views.top_predictions, "/api/top-predictions/").status_code, 404)
+
+
+class TopPredictionsTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(
+            _prediction("AAA", pred_close=0.1, pred_open=0.9, sector="Tech", live_acc=0.9, mkt_cap=5e9),
+            _prediction("BBB", pred_close=0.3, pred_open=None, sector="Energy", live_acc=0.2, mkt_cap=2e11),
+            _prediction("CCC", pred_close=None, pred_open=0.5, sector="tech", live_acc=0.5),
+            _prediction("DDD", pred_close=0.2, pred_open=-0.1, sector="Tech", live_acc=None, mkt_cap=1e9),
+        )
+
+    def top(self, **params):
+        response = self.call(views.top_predictions, "/api/top-predictions/", params)
+        if response.status_code != 200:
+            return response.status_code
+        return [row["symbol"] for row in json.loads(response.content)]
+
+    def test_rankings_put_nulls_last(self):
+        self.assertEqual(self.top(), ["BBB", "DDD", "AAA", "CCC"])
+        self.assertEqual(self.top(rankBy="pred_open"), ["AAA", "CCC", "DDD", "BBB"])
+        # pred_close * liveAcc: BBB 0.06, AAA 0.09; DDD has no accuracy.
+        self.assertEqual(self.top(rankBy="pred_close_weighted"), ["AAA", "BBB", "CCC", "DDD"])
+
+    def test_count(self):
+        self.assertEqual(self.top(count=2), ["BBB", "DDD"])
+        self.assertEqual(self.top(count=0), [])
+
+    def test_filters(self):
+        self.assertEqual(self.top(sector="TECH"), ["DDD", "AAA", "CCC"])
+        self.assertEqual(self.top(minMktCap=2e9), ["BBB", "AAA"])
+        self.assertEqual(self.top(sector="tech", maxMktCap=2e9, count=5), ["DDD"])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.top(rankBy="volume"), 400)
+        self.assertEqual(self.top(minMktCap="big"), 400)
+        self.assertEqual(self.top(timeFrame="hourly"), 400)
+
+    def test_rankings_are_built_once_per_snapshot(self):
+        self.assertEqual(list(self.daily.rankings["pred_close"]), [1, 3, 0, 2])
+        self.assertEqual(list(self.daily.top("pred_close", 2)), [1, 3])
+
+
+class StreamPredictionsTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(
+            *[_prediction(f"S{i:03d}", pred_close=i / 7, pred=Decimal(i) / 3) for i in range(7)]
+        )
+
+    def body(self, **params):
+        response = self.call(views.all_predictions, "/api/all-predictions/", params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return b"".join(response.streaming_content)
+        return response.content
+
+    @override_settings(PREDICTION_STREAM_CHUNK_SIZE=3)
+    def test_streamed_body_matches_the_rendered_one(self):
+        self.assertEqual(self.body(stream="1"), self.body())
+        self.assertEqual(self.body(stream="1", fields="symbol,pred"), self.body(fields="symbol,pred"))
+
+    def test_streams_in_chunks(self):
+        with override_settings(PREDICTION_STREAM_CHUNK_SIZE=3):
+            response = self.call(views.all_predictions, "/api/all-predictions/", {"stream": "1"})
+            chunks = list(response.streaming_content)
+        self.assertEqual(response["Content-Type"], "application/json")
+        # "[", three chunks of rows, "]"
+        self.assertEqual(len(chunks), 5)
+
+    def test_empty_batch(self):
+        fast = timeframes.get("daily").fast_serializer()
+        self.assertEqual(b"".join(views._stream_predictions(_daily_snapshot(), fast)), b"[]")
+
+
+class FastSerializerTests(SimpleTestCase):
+    def rows(self):
+        return [
+            PredsDaily(
+                symbol="AAPL", date=date(2025, 1, 6), pred=Decimal("0.12345"), pred_sign=1,
+                actual=None, sector="Tech", pred_open=0.1, pred_close=-0.25, actual_close=1e16,
+                inUpper=True, inLower=None, PerfectO=False,
+            ),
+            PredsDaily(
+                symbol="msft", date=date(2025, 1, 7), pred=Decimal("-3"), pred_sign=-1,
+                actual=Decimal("0.5"), sector=None, pred_open=None, pred_close=2,
+                actual_open_sign=0, Above=True,
+            ),
+        ]
+
+    def test_rows_match_drf(self):
+        instances = self.rows()
+        fast = fast_serializers.get_fast_serializer(PredsDailySerializer)
+        tuples = [tuple(getattr(row, source) for source in fast.sources) for row in instances]
+        self.assertEqual(
+            fast_serializers.render(fast.rows(tuples)),
+            fast_serializers.render(PredsDailySerializer(instances, many=True).data),
+        )
+
+    def test_every_time_frame_matches_drf(self):
+        for time_frame in timeframes.TIME_FRAMES.values():
+            instance = time_frame.model(
+                symbol="AAPL", date=date(2025, 1, 6), pred_open=-1, pred_close=0.5,
+            )
+            fast = time_frame.fast_serializer()
+            self.assertEqual(
+                fast.row([getattr(instance, source) for source in fast.sources]),
+                dict(time_frame.serializer(instance).data),
+                time_frame.name,
+            )
+
+    def test_columns_match_rows(self):
+        fast = fast_serializers.get_fast_serializer(PredsDailySerializer, ["symbol", "pred"])
+        columns = fast.columns([["AAPL", "MSFT"], [Decimal("0.5"), None]], order=[1, 0])
+        self.assertEqual(columns, {"symbol": ["MSFT", "AAPL"], "pred": [None, "0.5000"]})
+
+    def test_only_keeps_serializer_order(self):
+        fast = fast_serializers.get_fast_serializer(PredsDailySerializer, ["pred", "symbol"])
+        self.assertEqual(fast.names, ("symbol", "pred"))
+
+
+class SparseFieldsTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(_prediction("AAPL", pred_close=0.5, sector="Tech"))
+
+    def detail(self, symbol="AAPL", **params):
+        return self.call(lambda r: views.prediction_detail(r, symbol), f"/api/prediction/{symbol}/", params)
+
+    def test_only_the_requested_fields(self):
+        response = self.detail(fields="pred_close,symbol,upper_95C")
+        self.assertEqual(list(response.data), ["symbol", "pred_close", "upper_95C"])
+        rows = json.loads(self.call(views.all_predictions, "/api/all-predictions/", {"fields": "sector"}).content)
+        self.assertEqual(rows, [{"sector": "Tech"}])
+
+    def test_unknown_fields(self):
+        response = self.detail(fields="symbol,secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"error": "Unknown fields: secret"})
+        response = self.call(views.top_predictions, "/api/top-predictions/", {"fields": "upper_95C"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_fieldset_means_every_field(self):
+        self.assertEqual(self.detail(fields="").data, self.detail().data)
+        self.assertEqual(self.detail(fields=" , ").data, self.detail().data)
+
+    def test_database_reads_select_only_the_requested_columns(self):
+        predictions.latest_prediction.return_value = _database_prediction("TSLA", pred_close=2.0)
+        response = self.detail("TSLA", fields="pred_close,lower_95C")
+        self.assertEqual(response.data, {"pred_close": 2.0, "lower_95C": -1.5})
+        args = predictions.latest_prediction.call_args
+        self.assertEqual(args.args[2], ["lower_95C"])
+        self.assertEqual(args.kwargs["columns"], ("pred_close",))
+
+        self.detail("TSLA")
+        self.assertIsNone(predictions.latest_prediction.call_args.kwargs["columns"])
+
+
+class CompactFormatTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(
+            _prediction("AAPL", pred_close=0.5, pred=Decimal("0.25")),
+            _prediction("MSFT", pred_close=0.75),
+        )
+
+    def test_columnar_json(self):
+        response = self.call(
+            views.all_predictions, "/api/all-predictions/", {"format": "columnar", "fields": "symbol,pred"}
+        )
+        self.assertEqual(response["Content-Type"], "application/vnd.goldenfleece.columnar+json")
+        self.assertEqual(
+            json.loads(response.content), {"symbol": ["AAPL", "MSFT"], "pred": ["0.2500", None]}
+        )
+
+    def test_msgpack_by_accept_header(self):
+        response = self.call(
+            views.top_predictions, "/api/top-predictions/", {"fields": "symbol,pred_close"},
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            msgpack.unpackb(response.content), {"symbol": ["MSFT", "AAPL"], "pred_close": [0.75, 0.5]}
+        )
+
+    def test_formats_carry_the_same_values(self):
+        rows = json.loads(self.call(views.all_predictions, "/api/all-predictions/").content)
+        columns = msgpack.unpackb(
+            self.call(views.all_predictions, "/api/all-predictions/", {"format": "msgpack"}).content
+        )
+        self.assertEqual(list(columns), list(rows[0]))
+        self.assertEqual([dict(zip(columns, values)) for values in zip(*columns.values())], rows)
+
+    def test_streaming_is_json_only(self):
+        response = self.call(
+            views.all_predictions, "/api/all-predictions/", {"format": "columnar", "stream": "1"}
+        )
+        self.assertFalse(response.streaming)
+        self.assertEqual(json.loads(response.content)["symbol"], ["AAPL", "MSFT"])
+
+    def test_errors_render_in_the_negotiated_format(self):
+        response = self.call(
+            views.all_predictions, "/api/all-predictions/", {"format": "msgpack", "fields": "nope"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(msgpack.unpackb(response.content), {"error": "Unknown fields: nope"})
+
+
+class _Snapshot:
+    etag = "PredsDaily-2025-01-06-1"
+    last_modified = 1_736_200_000
+
+
+class SnapshotConditionalTests(SimpleTestCase):
+    def setUp(self):
+        conditional.get_body_cache().clear()
+        self.calls = 0
+        self.factory = APIRequestFactory()
+
+        @api_view(["GET"])
+        @conditional.snapshot_conditional(lambda request: _Snapshot)
+        def view(request):
+            self.calls += 1
+            return Response([{"symbol": f"S{i:03d}", "pred": i} for i in range(20)])
+
+        self.view = view
+
+    def get(self, **headers):
+        response = self.view(self.factory.get("/predictions/", **headers))
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def test_sets_validators(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith(f'W/"{_Snapshot.etag}-'))
+        self.assertEqual(response["Last-Modified"], "Mon, 06 Jan 2025 21:46:40 GMT")
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.get()["ETag"]
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.calls, 1)
+
+    def test_other_etag_gets_the_body(self):
+        self.get()
+        response = self.get(HTTP_IF_NONE_MATCH='W/"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeat_requests_reuse_the_rendered_body(self):
+        first = self.get()
+        second = self.get()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.calls, 1)
+
+    def test_gzip_when_accepted(self):
+        plain = self.get()
+        compressed = self.get(HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertNotEqual(compressed.content, plain.content)
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+
+    def test_authentication_runs_before_revalidation(self):
+        etag = self.get()["ETag"]
+        response = self.get(HTTP_IF_NONE_MATCH=etag, HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(response.status_code, 401)
+
+
+class PredictionConditionalGetTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(_prediction("AAPL", pred_close=0.5))
+
+    def test_new_batch_changes_the_etag(self):
+        etag = self.call(views.all_predictions, "/api/all-predictions/")["ETag"]
+        response = self.call(views.all_predictions, "/api/all-predictions/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.daily = _daily_snapshot(_prediction("AAPL", pred_close=0.75))
+        response = self.call(views.all_predictions, "/api/all-predictions/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]["pred_close"], 0.75)
+
+    def test_variants_have_their_own_etags(self):
+        etags = {
+            self.call(views.top_predictions, "/api/top-predictions/", params, **headers)["ETag"]
+            for params, headers in (
+                ({}, {}),
+                ({"count": 1}, {}),
+                ({}, {"HTTP_ACCEPT": "application/msgpack"}),
+            )
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_errors_are_not_cached(self):
+        response = self.call(views.top_predictions, "/api/top-predictions/", {"rankBy": "nope"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertEqual(conditional.get_body_cache().stats()["entries"], 0)
+
+
+class PredictionHorizonsTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(_prediction("AAPL", pred_close=0.5))
+        predictions.latest_prediction.side_effect = (
+            lambda model, acc, bands, symbol, columns=None: _database_prediction(symbol, pred_close=1.0)
+            if model is not PredsDaily else None
+        )
+
+    def horizons(self, **params):
+        return self.call(
+            lambda r: views.prediction_horizons(r, "aapl"), "/api/prediction/aapl/horizons/", params
+        )
+
+    def test_every_horizon_by_default(self):
+        response = self.horizons()
+        self.assertEqual(list(response.data), ["daily", "weekly", "monthly"])
+        self.assertEqual(response.data["daily"]["pred_close"], 0.5)
+        self.assertEqual(response.data["weekly"]["pred_close"], 1.0)
+        # Daily came from its snapshot, the others from one query each.
+        models = [c.args[0] for c in predictions.latest_prediction.call_args_list]
+        self.assertEqual(models, [timeframes.get("weekly").model, timeframes.get("monthly").model])
+
+    def test_requested_horizons_in_order(self):
+        response = self.horizons(timeFrames="Monthly,daily,monthly")
+        self.assertEqual(list(response.data), ["monthly", "daily"])
+
+    def test_invalid_horizon(self):
+        self.assertEqual(self.horizons(timeFrames="daily,hourly").status_code, 400)
+
+    def test_fields_apply_to_every_horizon(self):
+        response = self.horizons(fields="pred_close,upper_95C")
+        for data in response.data.values():
+            self.assertEqual(data, {"pred_close": data["pred_close"], "upper_95C": 1.5})
+        self.assertEqual(self.horizons(fields="bogus").status_code, 400)
+
+    def test_registry(self):
+        self.assertIs(timeframes.get("WEEKLY"), timeframes.TIME_FRAMES["weekly"])
+        self.assertIsNone(timeframes.get(None))
+        self.assertEqual(timeframes.get("daily").acc_fields, ["upper_95C", "lower_95C"])
+
+
+def _bars(*days):
+    """
+    A (6, n) bar array with one bar per ``date`` in ``days``, closing at
+    its day of the month. Like Polygon's, each bar starts at midnight New
+    York time (05:00 UTC in winter).
+    """
+    t = [float(bar_store._epoch_ms(day)) + 5 * 3600 * 1000 for day in days]
+    close = [float(day.day) for day in days]
+    return np.array([t, close, close, close, close, [1000.0] * len(days)])
+
+
+class BarStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        overrides = override_settings(BAR_STORE_DIR=self.dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(bar_store, "_fetch")
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_stale(self, symbol):
+        os.utime(bar_store.path_for(symbol), (0, 0))
+
+    def test_first_read_syncs_and_later_reads_are_fresh(self):
+        self.fetch.return_value = _bars(date(2025, 1, 6), date(2025, 1, 7))
+        self.assertEqual(bar_store.bars("AAPL").shape, (6, 2))
+        self.assertEqual(bar_store.bars("AAPL").shape, (6, 2))
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_stale_file_fetches_from_the_last_stored_day(self):
+        self.fetch.return_value = _bars(date(2025, 1, 6), date(2025, 1, 7))
+        bar_store.bars("AAPL")
+        self.make_stale("AAPL")
+        self.fetch.return_value = _bars(date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 8))
+        bars = bar_store.bars("AAPL")
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual(self.fetch.call_args.args[1], date(2025, 1, 6))
+        self.assertEqual(bar_store.dates(bars), ["2025-01-06", "2025-01-07", "2025-01-08"])
+        self.assertEqual(bars[bar_store.C].tolist(), [6.0, 7.0, 8.0])
+
+    def test_partial_newest_bar_is_replaced(self):
+        self.fetch.return_value = _bars(date(2025, 1, 6), date(2025, 1, 7))
+        bar_store.bars("AAPL")
+        self.make_stale("AAPL")
+        completed = _bars(date(2025, 1, 6), date(2025, 1, 7))
+        completed[bar_store.C, 1] = 7.5
+        self.fetch.return_value = completed
+        bars = bar_store.bars("AAPL")
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual(bars[bar_store.C].tolist(), [6.0, 7.5])
+
+    def test_readjusted_history_is_fetched_again(self):
+        days = [date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 8)]
+        self.fetch.return_value = _bars(*days)
+        bar_store.bars("AAPL")
+        self.make_stale("AAPL")
+
+        # A 2:1 split: Polygon now returns every earlier bar at half price.
+        def halved(*days):
+            bars = _bars(*days)
+            bars[bar_store.O:bar_store.V] /= 2
+            return bars
+
+        self.fetch.side_effect = [halved(*days[1:], date(2025, 1, 9)), halved(*days, date(2025, 1, 9))]
+        with self.assertLogs("api.bar_store", "INFO"):
+            bars = bar_store.bars("AAPL")
+        today = market_hours.now().date()
+        self.assertEqual(self.fetch.call_args_list[1].args[1], date(2025, 1, 7))
+        self.assertEqual(
+            self.fetch.call_args_list[2].args[1],
+            today - timedelta(days=settings.BAR_STORE_HISTORY_DAYS),
+        )
+        self.assertEqual(bars[bar_store.C].tolist(), [3.0, 3.5, 4.0, 4.5])
+
+    def test_unchanged_bars_only_renew_freshness(self):
+        self.fetch.return_value = _bars(date(2025, 1, 6))
+        bar_store.bars("AAPL")
+        version = bar_store.version()
+        self.make_stale("AAPL")
+        bar_store.bars("AAPL")
+        self.assertTrue(bar_store._is_fresh(bar_store.path_for("AAPL")))
+        self.assertEqual(bar_store.version(), version)
+
+    def test_version_moves_only_with_completed_bars(self):
+        clock = mock.patch.object(market_hours, "now", return_value=_market_time(2025, 1, 8, 12, 0))
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.fetch.return_value = _bars(date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 8))
+        bar_store.bars("AAPL")
+        version = bar_store.version()
+
+        # The open session's bar moves: not a completed day.
+        self.make_stale("AAPL")
+        partial = _bars(date(2025, 1, 7), date(2025, 1, 8))
+        partial[bar_store.C, 1] = 8.5
+        self.fetch.return_value = partial
+        self.assertEqual(bar_store.bars("AAPL")[bar_store.C].tolist(), [6.0, 7.0, 8.5])
+        self.assertEqual(bar_store.version(), version)
+
+        # After the close the same bar is complete.
+        market_hours.now.return_value = _market_time(2025, 1, 8, 16, 30)
+        self.make_stale("AAPL")
+        self.fetch.return_value = _bars(date(2025, 1, 7), date(2025, 1, 8))
+        self.assertEqual(bar_store.bars("AAPL")[bar_store.C].tolist(), [6.0, 7.0, 8.0])
+        self.assertNotEqual(bar_store.version(), version)
+
+    def test_stale_upstream_response_is_not_stored(self):
+        self.fetch.return_value = _bars(date(2025, 1, 6))
+        bar_store.bars("AAPL")
+        self.make_stale("AAPL")
+
+        def stale_fetch(symbol, start, end):
+            # What polygon.get does when it serves a cached body in place of
+            # a failed call.
+            return polygon._serve_stale(CacheEntry(_bars(date(2025, 1, 6), date(2025, 1, 7)), 0, 0))
+
+        self.fetch.side_effect = stale_fetch
+        with polygon.track_staleness() as report:
+            bars = bar_store.bars("AAPL")
+        self.assertEqual(bars.shape, (6, 1))
+        self.assertTrue(report.stale)
+        self.assertFalse(bar_store._is_fresh(bar_store.path_for("AAPL")))
+
+    def test_symbol_without_bars_counts_as_synced(self):
+        self.fetch.return_value = np.empty((6, 0))
+        self.assertEqual(bar_store.bars("NODATA").shape, (6, 0))
+        self.assertTrue(bar_store._is_fresh(bar_store.path_for("NODATA")))
+
+    def test_failed_sync_serves_stored_bars(self):
+        self.fetch.return_value = _bars(date(2025, 1, 6))
+        bar_store.bars("AAPL")
+        self.make_stale("AAPL")
+        self.fetch.side_effect = ValueError("upstream down")
+        with self.assertLogs("api.bar_store", "WARNING"):
+            self.assertEqual(bar_store.bars("AAPL").shape, (6, 1))
+
+    def test_invalid_symbol(self):
+        self.assertEqual(bar_store.bars("../etc").shape, (6, 0))
+        self.fetch.assert_not_called()
+
+
+class ScreenerTests(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = _daily_snapshot(
+            _prediction("AAPL", sector="Technology", pred_close=101.0),
+            _prediction("MSFT", sector="Technology", pred_close=202.0),
+        )
+        self.bars = {
+            "AAPL": _bars(date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 8)),
+            "MSFT": _bars(date(2025, 1, 6), date(2025, 1, 7)),
+        }
+        patchers = [
+            mock.patch.object(prediction_store, "get_snapshot", side_effect=lambda *args: self.snapshot),
+            mock.patch.object(bar_store, "load", side_effect=lambda s: self.bars.get(s, bar_store.EMPTY)),
+            mock.patch.object(grades, "latest_grades", return_value={}),
+            mock.patch.object(market_hours, "now", return_value=_market_time(2025, 1, 8, 12, 0)),
+            mock.patch.object(bar_store, "version", return_value=1),
+            mock.patch.object(screener, "build_screen", wraps=screener.build_screen),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        screener._cached = (None, None)
+        self.addCleanup(setattr, screener, "_cached", (None, None))
+
+    def closes(self, screen):
+        return [screen.row(i)["close"] for i in range(len(screen))]
+
+    def test_open_session_bar_is_not_screened(self):
+        screen = screener.get_screen()
+        self.assertEqual(screen.as_of, date(2025, 1, 7))
+        self.assertEqual(self.closes(screen), [7.0, 7.0])
+
+    def test_cached_until_a_day_completes(self):
+        screen = screener.get_screen()
+        market_hours.now.return_value = _market_time(2025, 1, 8, 15, 59)
+        self.assertIs(screener.get_screen(), screen)
+
+        market_hours.now.return_value = _market_time(2025, 1, 8, 16, 30)
+        screen = screener.get_screen()
+        self.assertEqual(screen.as_of, date(2025, 1, 8))
+        # MSFT's bar for the day is not stored yet: read at its last close.
+        self.assertEqual(self.closes(screen), [8.0, 7.0])
+        self.assertEqual(screener.build_screen.call_count, 2)
+
+    def test_rebuilt_when_completed_bars_are_stored(self):
+        market_hours.now.return_value = _market_time(2025, 1, 8, 16, 30)
+        screener.get_screen()
+        self.bars["MSFT"] = _bars(date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 8))
+        bar_store.version.return_value = 2
+        self.assertEqual(self.closes(screener.get_screen()), [8.0, 8.0])
+        self.assertEqual(screener.build_screen.call_count, 2)
+
+    def test_rebuilt_for_a_new_batch(self):
+        screener.get_screen()
+        self.snapshot = _daily_snapshot(_prediction("AAPL", sector="Technology", pred_close=103.0))
+        self.assertEqual(screener.get_screen().row(0)["pred_close"], 103.0)
+
+
+def _ticker(symbol, change_pct, volume=1_000_000, price=10.0, prev_volume=None):
+    """
+    One entry of the full-market snapshot, as Polygon returns it.
+    """
+    return {
+        "ticker": symbol,
+        "lastTrade": {"p": price},
+        "todaysChange": price * change_pct / 100,
+        "todaysChangePerc": change_pct,
+        "day": {"c": price, "v": volume},
+        "prevDay": {"v": prev_volume},
+    }
+
+
+@override_settings(HOT_STOCKS_MAX_COUNT=2, HOT_STOCKS_MIN_PRICE=1.0, HOT_STOCKS_MIN_VOLUME=1000)
+class HotStocksTests(SimpleTestCase):
+    def setUp(self):
+        hot_stocks._cached.clear()
+        self.addCleanup(hot_stocks._cached.clear)
+        self.tickers = [
+            _ticker("AAA", 5.0, volume=2000),
+            _ticker("BBB", -3.0, volume=9000),
+            _ticker("CCC", 1.0, volume=5000),
+            _ticker("DDD", -7.0, volume=3000),
+            _ticker("EEE", 9.0, volume=1000),
+        ]
+
+    def symbols(self, movers, name, count=10):
+        return [m.symbol for m in movers.top(name, count)]
+
+    def test_top_k_of_each_list(self):
+        movers = hot_stocks.Movers(self.tickers)
+        self.assertEqual(movers.candidates, 5)
+        self.assertEqual(self.symbols(movers, "gainers"), ["EEE", "AAA"])
+        self.assertEqual(self.symbols(movers, "losers"), ["DDD", "BBB"])
+        self.assertEqual(self.symbols(movers, "volume"), ["BBB", "CCC"])
+        self.assertEqual(self.symbols(movers, "gainers", 1), ["EEE"])
+        self.assertEqual(movers.top("gainers", -1), [])
+
+    def test_illiquid_and_incomplete_tickers_are_left_out(self):
+        self.tickers += [
+            _ticker("PENNY", 50.0, price=0.5),
+            _ticker("THIN", 40.0, volume=999),
+            {"ticker": "NOPRICE", "todaysChange": 1.0, "todaysChangePerc": 30.0, "day": {"c": 0, "v": 0}},
+        ]
+        movers = hot_stocks.Movers(self.tickers)
+        self.assertEqual(movers.candidates, 5)
+        self.assertEqual(self.symbols(movers, "gainers"), ["EEE", "AAA"])
+
+    def test_universe_filter(self):
+        movers = hot_stocks.Movers(self.tickers, frozenset({"AAA", "BBB", "CCC"}))
+        self.assertEqual(self.symbols(movers, "gainers"), ["AAA", "CCC"])
+        self.assertEqual(self.symbols(movers, "losers"), ["BBB", "CCC"])
+
+    def test_volume_falls_back_to_the_previous_session(self):
+        # Before the open the day's aggregates are all zeros.
+        movers = hot_stocks.Movers([_ticker("PRE", 2.0, volume=0, prev_volume=50_000)])
+        self.assertEqual(movers.top("volume", 1)[0].volume, 50_000)
+
+    def test_get_movers_reuses_the_result_per_body_and_version(self):
+        body = {"tickers": self.tickers}
+        movers = hot_stocks.get_movers(body)
+        self.assertIs(hot_stocks.get_movers(body), movers)
+        # The same content in a new body object (a refreshed snapshot) re-ranks.
+        self.assertIsNot(hot_stocks.get_movers({"tickers": self.tickers}), movers)
+
+        universe = frozenset({"AAA"})
+        in_universe = hot_stocks.get_movers(body, universe, "batch-1")
+        self.assertIs(hot_stocks.get_movers(body, universe, "batch-1"), in_universe)
+        self.assertIsNot(hot_stocks.get_movers(body, frozenset({"BBB"}), "batch-2"), in_universe)
+
+
+@override_settings(CACHES=MARKET_DATA_CACHES)
+class RefreshMarketDataTests(PolygonTestCase):
+    PATH = "/v3/reference/tickers/AAPL"
+
+    def setUp(self):
+        super().setUp()
+        market_data.get_cache().clear()
+        self.scheduler = mock.Mock()
+        patcher = mock.patch.object(scheduler, "get_scheduler", return_value=self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.command = refresh_market_data.Command(stdout=StringIO())
+
+    def jobs(self, **jobs):
+        patcher = mock.patch.object(refresh_market_data, "_jobs", return_value=jobs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch(self):
+        return polygon.get(self.PATH, endpoint="reference")
+
+    def test_calls_use_the_background_lane(self):
+        self.jobs(reference=self.fetch)
+        self.command.refresh()
+        self.scheduler.acquire.assert_called_once_with(scheduler.BACKGROUND)
+
+    def test_each_pass_bypasses_the_cache_once(self):
+        self.fetch()  # cached by a view
+        self.jobs(first=self.fetch, second=self.fetch)
+        self.assertEqual(self.command.refresh(), 0)
+        self.assertEqual(self.upstream.calls, 2)
+        self.command.refresh()
+        self.assertEqual(self.upstream.calls, 3)
+        self.assertEqual(market_data.get_cache().get("first"), {"status": "OK"})
+        # Outside a pass the cache serves again.
+        self.fetch()
+        self.assertEqual(self.upstream.calls, 3)
+
+    def test_failed_entry_is_counted_and_keeps_its_value(self):
+        market_data.store("broken", "previous")
+        self.jobs(broken=mock.Mock(side_effect=ValueError("unexpected body")), reference=self.fetch)
+        with self.assertLogs("api.management.commands.refresh_market_data", "WARNING"):
+            self.assertEqual(self.command.refresh(), 1)
+        self.assertEqual(market_data.get_cache().get("broken"), "previous")
+        self.assertEqual(market_data.get_cache().get("reference"), {"status": "OK"})
+
+    def test_bars_sync_only_while_closed(self):
+        self.jobs()
+        lanes = []
+        with mock.patch.object(screener, "universe", return_value=["AAPL"]), \
+                mock.patch.object(bar_store, "sync_all", side_effect=lambda symbols: lanes.append(polygon._lane.get()) or {}), \
+                mock.patch.object(market_hours, "is_open", return_value=True):
+            call_command(self.command, "--once")
+            bar_store.sync_all.assert_not_called()
+
+            market_hours.is_open.return_value = False
+            call_command(self.command, "--once")
+            bar_store.sync_all.assert_called_once_with(["AAPL"])
+        self.assertEqual(lanes, [scheduler.BACKGROUND])
+
+
+class BatchPredictionsTests(PredictionViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daily = _daily_snapshot(
+            _prediction("AAPL", pred_close=0.5),
+            _prediction("MSFT", pred_close=-0.25, bands=None),
+        )
+
+    def post(self, data):
+        return self.call(views.batch_predictions, "/api/predictions/batch/", data, method="post")
+
+    def test_invalid_bodies_are_bad_requests(self):
+        for body in ([], "AAPL", {"symbols": 5}, {"symbols": [1]}, {"symbols": ["AAPL", None]},
+                     {"symbols": "AAPL", "timeFrames": {"daily": 1}}):
+            response = self.post(body)
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_symbol_limits(self):
+        self.assertEqual(self.post({"symbols": []}).status_code, 400)
+        too_many = [f"S{i}" for i in range(settings.PREDICTION_BATCH_MAX_SYMBOLS + 1)]
+        self.assertEqual(self.post({"symbols": too_many}).status_code, 400)
+
+    def test_invalid_time_frame(self):
+        self.assertEqual(self.post({"symbols": ["AAPL"], "timeFrames": ["hourly"]}).status_code, 400)
+
+    def test_entries_match_prediction_detail(self):
+        predictions.latest_predictions.return_value = {"TSLA": _database_prediction("TSLA", pred_close=1.0)}
+        predictions.latest_prediction.side_effect = (
+            lambda model, acc, bands, symbol, columns=None: _database_prediction(symbol, pred_close=1.0)
+            if symbol == "TSLA" else None
+        )
+        response = self.post({"symbols": ["aapl", "MSFT", "TSLA", "NONE"], "timeFrames": ["daily"]})
+        self.assertEqual(response.status_code, 200)
+        for symbol in ("AAPL", "MSFT", "TSLA", "NONE"):
+            detail = self.call(
+                lambda request: views.prediction_detail(request, symbol), f"/api/prediction/{symbol}/"
+            )
+            self.assertEqual(response.data[symbol]["daily"], detail.data, symbol)
+        self.assertEqual(response.data["AAPL"]["daily"]["upper_95C"], 1.5)
+        self.assertEqual(response.data["MSFT"]["daily"], {"error": "Confidence interval data not found"})
+
+    def test_one_query_per_time_frame_for_missing_symbols(self):
+        response = self.call(
+            views.batch_predictions, "/api/predictions/batch/",
+            {"symbols": "AAPL, TSLA,NVDA", "timeFrames": "daily,Weekly"},
+        )
+        self.assertEqual(set(response.data), {"AAPL", "TSLA", "NVDA"})
+        self.assertEqual(set(response.data["AAPL"]), {"daily", "weekly"})
+        calls = predictions.latest_predictions.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0].args[3], ["TSLA", "NVDA"])
+        self.assertEqual(calls[1].args[3], ["AAPL", "TSLA", "NVDA"])
+
+
+class IndicatorTests(SimpleTestCase):
+    def setUp(self):
+        self.close = np.load(os.path.join(TESTDATA, "pandas_indicators", "SAMPLE.npy"))[bar_store.C]
+
+    def reference_ema(self, close, window):
+        alpha = 2.0 / (window + 1)
+        out = [np.nan] * len(close)
+        prev = sum(close[:window]) / window
+        out[window - 1] = prev
+        for i in range(window, len(close)):
+            prev = alpha * close[i] + (1 - alpha) * prev
+            out[i] = prev
+        return np.array(out)
+
+    def test_ema_matches_the_recursive_definition(self):
+        np.testing.assert_allclose(
+            indicators.ema(self.close, 50), self.reference_ema(self.close.tolist(), 50), rtol=1e-12
+        )
+
+    def test_one_series_matches_the_matrix_path(self):
+        close = self.close.copy()
+        close[:30] = np.nan  # a shorter history
+        matrix = np.vstack([close, self.close])
+        for name, params in indicators.PARAMS.items():
+            single = indicators.compute(name, close, **params)
+            batch = indicators.compute(name, matrix, **params)
+            for field, column in single.items():
+                np.testing.assert_array_equal(column, batch[field][0])
+
+    def test_polygon_values_are_newest_first_and_complete(self):
+        t = np.arange(len(self.close), dtype=np.float64)
+        values = indicators.polygon_values("macd", t, self.close, limit=5, **indicators.PARAMS["macd"])
+        self.assertEqual([v["timestamp"] for v in values], list(range(len(t) - 1, len(t) - 6, -1)))
+        self.assertEqual(set(values[0]), {"timestamp", "value", "signal", "histogram"})
+
+
+class ValidateIndicatorsTests(SimpleTestCase):
+    def test_matches_pandas_reference(self):
+        # The reference values were computed with pandas from synthetic bars,
+        # in the layout --record writes.
+        out = StringIO()
+        call_command(
+            "validate_indicators", "SAMPLE",
+            "--reference", os.path.join(TESTDATA, "pandas_indicators"),
+            stdout=out,
+        )
+        self.assertEqual(out.getvalue().count("50/50 values"), 4)
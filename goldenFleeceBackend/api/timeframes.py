@@ -0,0 +1,58 @@
+"""
+Registry of prediction time frames (horizons).
+
+Each horizon maps to its prediction table, its accuracy table (the
+confidence bands) and their serializers. Views look horizons up here
+instead of dispatching on the name.
+"""
+from collections import namedtuple
+
+from . import fast_serializers, prediction_store
+from .models import DailyAcc, MonthlyAcc, PredsDaily, PredsMonthly, PredsWeekly, WeeklyAcc
+from .serializers import (
+    DailyAccSerializer,
+    MonthlyAccSerializer,
+    PredsDailySerializer,
+    PredsMonthlySerializer,
+    PredsWeeklySerializer,
+    WeeklyAccSerializer,
+)
+
+DEFAULT = "daily"
+
+
+class TimeFrame(namedtuple("TimeFrame", ["name", "model", "serializer", "acc_model", "acc_serializer"])):
+    __slots__ = ()
+
+    @property
+    def acc_fields(self):
+        """
+        Confidence band columns returned with each prediction.
+        """
+        return self.acc_serializer.Meta.fields
+
+    def snapshot(self):
+        """
+        The latest batch, see ``prediction_store``; None if there is none.
+        """
+        return prediction_store.get_snapshot(self.model, self.acc_model, self.acc_fields)
+
+    def fast_serializer(self, fields=None):
+        return fast_serializers.get_fast_serializer(self.serializer, fields)
+
+
+TIME_FRAMES = {
+    tf.name: tf
+    for tf in (
+        TimeFrame("daily", PredsDaily, PredsDailySerializer, DailyAcc, DailyAccSerializer),
+        TimeFrame("weekly", PredsWeekly, PredsWeeklySerializer, WeeklyAcc, WeeklyAccSerializer),
+        TimeFrame("monthly", PredsMonthly, PredsMonthlySerializer, MonthlyAcc, MonthlyAccSerializer),
+    )
+}
+
+
+def get(name):
+    """
+    Return the ``TimeFrame`` called ``name`` (case-insensitive), or None.
+    """
+    return TIME_FRAMES.get((name or "").lower())
@@ -0,0 +1,108 @@
+"""
+In-process cache for decoded Polygon responses.
+
+Entries expire on a per-endpoint schedule tied to the US market calendar:
+while the regular session is open each endpoint family uses its short TTL
+from ``POLYGON_CACHE_TTLS``; once the market is closed, families listed in
+``POLYGON_CACHE_UNTIL_OPEN`` stay valid until the next open, because daily
+bars, snapshots and indicators cannot change before then. The cache is an
+LRU bounded by ``POLYGON_CACHE_MAX_ENTRIES`` and counts hits and misses.
+
+Expired entries are kept until evicted: they are the "last good value" the
+client serves, marked stale, while it revalidates or while the upstream's
+circuit breaker is open.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from django.conf import settings
+
+from . import market_hours
+
+MISSING = object()
+
+CacheEntry = namedtuple("CacheEntry", ["value", "expires_at", "stored_at"])
+
+
+def expiry_for(endpoint: str, at: float = None) -> float:
+    """
+    Return the epoch timestamp at which a response for ``endpoint`` fetched
+    at ``at`` (default: now) stops being fresh.
+    """
+    at = time.time() if at is None else at
+    ttls = settings.POLYGON_CACHE_TTLS
+    expires = at + ttls.get(endpoint, ttls["default"])
+    if endpoint in settings.POLYGON_CACHE_UNTIL_OPEN:
+        moment = datetime.fromtimestamp(at, market_hours.MARKET_TZ)
+        if not market_hours.is_open(moment):
+            expires = max(expires, market_hours.next_open(moment).timestamp())
+    return expires
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping of key -> value with a per-entry expiry time.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, now: float = None):
+        """
+        Return the fresh value stored under ``key``, or ``MISSING``.
+        """
+        entry = self.lookup(key, now)
+        if entry is None or entry.expires_at <= (time.time() if now is None else now):
+            return MISSING
+        return entry.value
+
+    def lookup(self, key, now: float = None):
+        """
+        Return the ``CacheEntry`` stored under ``key`` whether fresh or
+        expired, or None. Counts a hit, a stale hit or a miss.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.expires_at > now:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry
+
+    def set(self, key, value, expires_at: float):
+        with self._lock:
+            self._entries[key] = CacheEntry(value, expires_at, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
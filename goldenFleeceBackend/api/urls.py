@@ -1,24 +1,34 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views, views
 from .views import (
     prediction_detail,
+    prediction_horizons,
     top_predictions,
     all_predictions,
-    get_index_prices,       
-    get_hot_stocks,        
-    get_sector_performance,
-    stock_detail,
-    search_stocks,
+    batch_predictions,
+    screener_view,
+    upstream_stats,
+    watchlist_quotes,
 )
 
+# The market-data views come in a sync and a native async version.
+market_views = async_views if settings.MARKET_DATA_ASYNC_VIEWS else views
+
 urlpatterns = [
     path('prediction/<str:symbol>/', prediction_detail, name='prediction_detail'),
+    path('prediction/<str:symbol>/horizons/', prediction_horizons, name='prediction_horizons'),
     path('top-predictions/', top_predictions, name='top_predictions'),
     path('all-predictions/', all_predictions, name='all_predictions'),
+    path('predictions/batch/', batch_predictions, name='batch_predictions'),
+    path('screener/', screener_view, name='screener'),
 
     
-    path('index-prices/', get_index_prices, name='get_index_prices'),
-    path('hot-stocks/', get_hot_stocks, name='get_hot_stocks'),
-    path('sector-performance/', get_sector_performance, name='get_sector_performance'),
-    path('stock/<str:symbol>/', stock_detail, name='stock_detail'),
-    path('search-stocks/', search_stocks, name='search_stocks'),
+    path('index-prices/', market_views.get_index_prices, name='get_index_prices'),
+    path('hot-stocks/', market_views.get_hot_stocks, name='get_hot_stocks'),
+    path('sector-performance/', market_views.get_sector_performance, name='get_sector_performance'),
+    path('stock/<str:symbol>/', market_views.stock_detail, name='stock_detail'),
+    path('search-stocks/', market_views.search_stocks, name='search_stocks'),
+    path('watchlist-quotes/', watchlist_quotes, name='watchlist_quotes'),
+    path('upstream-stats/', upstream_stats, name='upstream_stats'),
 ]
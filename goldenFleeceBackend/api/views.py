@@ -1,80 +1,228 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
-from .models import (
-    PredsDaily,
-    PredsWeekly,
-    PredsMonthly,
-    DailyAcc,
-    WeeklyAcc,
-    MonthlyAcc,
-    MonthlyGrade,
-)
-from .serializers import (
-    PredsDailySerializer,
-    PredsWeeklySerializer,
-    PredsMonthlySerializer,
-    DailyAccSerializer,
-    WeeklyAccSerializer,
-    MonthlyAccSerializer,
-    MonthlyGradeSerializer,
-)
-from django.db.models import Max, F, FloatField, ExpressionWrapper
-import requests
+from django.http import StreamingHttpResponse
+from .serializers import MonthlyGradeSerializer
+from accounts.models import Watchlist
+from django.conf import settings
+from . import bar_store, fast_serializers, grades, hot_stocks, indicators, market_data, polygon, prediction_store, predictions, quotes, renderers, scheduler, screener, timeframes
+from .conditional import snapshot_conditional
+from .symbols import normalize_symbol, normalize_symbols
 import traceback
 from datetime import datetime, timedelta
-from requests.exceptions import JSONDecodeError
 
-POLYGON_API_KEY = "6ZgD13I3BYziPRbvkkjrA6GogAnJrKDR"
-POLYGON_HOST = "https://api.polygon.io"
+INDEX_ETFS = {"dow": "DIA", "snp": "SPY", "nasdaq": "QQQ"}
+
+SECTOR_ETFS = {
+    "Technology": "XLK",
+    "Financials": "XLF",
+    "Energy": "XLE",
+    "Healthcare": "XLV",
+    "Consumer Discretionary": "XLY",
+    "Industrials": "XLI",
+    "Utilities": "XLU",
+    "Consumer Staples": "XLP",
+    "Materials": "XLB",
+    "Real Estate": "XLRE",
+}
 
 # Helper utilities
-def _get_last_two_closes(ticker: str):
+def _format_change(last_close: float, prev_close: float):
+    diff = last_close - prev_close
+    pct = (diff / prev_close * 100) if prev_close else 0
+    sign = "+" if diff >= 0 else ""
+    return f"{sign}{diff:.2f} ({sign}{pct:.2f}%)"
+
+
+def _mark_stale(rows, report):
     """
-    Return (latest_close, previous_close) for the given ticker using Polygon.
+    Flag each row dict with ``stale``/``as_of`` if ``report`` (from
+    ``polygon.track_staleness``) saw any stale upstream data.
     """
-    end = datetime.utcnow().date()
-    start = end - timedelta(days=7)  
+    if report.stale:
+        marker = report.marker()
+        for row in rows:
+            row.update(marker)
 
-    url = (
-        f"{POLYGON_HOST}/v2/aggs/ticker/{ticker}/range/1/day/"
-        f"{start}/{end}?adjusted=true&sort=desc&limit=2&apiKey={POLYGON_API_KEY}"
-    )
-    resp = requests.get(url).json()
-    results = resp.get("results", [])
-    if not results:
-        return None, None
 
-    latest_close = results[0]["c"]
-    prev_close = results[1]["c"] if len(results) > 1 else latest_close
-    return latest_close, prev_close
+def _build_index_prices(closes):
+    """
+    ``closes`` maps each ``INDEX_ETFS`` label to (latest_close, prev_close).
+    """
+    results = {}
+    for label, (latest_close, prev_close) in closes.items():
+        if latest_close is None:
+            results[label] = {"price": None, "change": "Data error"}
+            continue
+
+        results[label] = {
+            "price": f"{latest_close:.2f}",
+            "change": _format_change(latest_close, prev_close),
+        }
+    return results
 
 
-def _format_change(last_close: float, prev_close: float):
-    diff = last_close - prev_close
-    pct = (diff / prev_close * 100) if prev_close else 0
-    sign = "+" if diff >= 0 else ""
-    return f"{sign}{diff:.2f} ({sign}{pct:.2f}%)"
+def _build_sector_performance(closes):
+    """
+    ``closes`` maps each ``SECTOR_ETFS`` name to (latest_close, prev_close).
+    """
+    results = []
+    for sector_name, (latest_close, prev_close) in closes.items():
+        symbol = SECTOR_ETFS[sector_name]
+        if latest_close is None:
+            results.append(
+                {
+                    "sector": sector_name,
+                    "ticker": symbol,
+                    "price": "N/A",
+                    "day_change": "Data error",
+                }
+            )
+            continue
 
+        results.append(
+            {
+                "sector": sector_name,
+                "ticker": symbol,
+                "price": f"{latest_close:.2f}",
+                "day_change": _format_change(latest_close, prev_close),
+            }
+        )
+    return results
 
-# Index prices (Dow, S&P, Nasdaq via ETFs)
-@api_view(["GET"])
-def get_index_prices(request):
+
+def _hot_stocks_request():
+    return hot_stocks.MARKET_SNAPSHOT_REQUEST
+
+
+def _hot_stocks_query(params):
+    """
+    Parse ``list`` (gainers, losers or volume), ``count`` and
+    ``universe=predictions``; None if invalid.
+    """
+    list_name = params.get("list", "gainers")
     try:
-        etf_map = {"dow": "DIA", "snp": "SPY", "nasdaq": "QQQ"}
+        count = min(int(params.get("count", settings.HOT_STOCKS_COUNT)), settings.HOT_STOCKS_MAX_COUNT)
+    except ValueError:
+        return None
+    if list_name not in hot_stocks.LISTS:
+        return None
+    return list_name, count, params.get("universe") == "predictions"
 
-        results = {}
-        for label, symbol in etf_map.items():
-            latest_close, prev_close = _get_last_two_closes(symbol)
-            if latest_close is None:
-                results[label] = {"price": None, "change": "Data error"}
-                continue
 
-            results[label] = {
-                "price": f"{latest_close:.2f}",
-                "change": _format_change(latest_close, prev_close),
+def _hot_stock_movers(body, in_predictions, prediction_snapshot):
+    """
+    Rank the full-market snapshot ``body``, over every ticker or only over
+    the daily prediction universe.
+    """
+    if not in_predictions:
+        return hot_stocks.get_movers(body)
+    if prediction_snapshot is None:
+        return hot_stocks.get_movers(body, frozenset())
+    return hot_stocks.get_movers(body, prediction_snapshot.index, prediction_snapshot.etag)
+
+
+def _hot_stock_sectors(movers, prediction_snapshot):
+    sectors = {}
+    for mover in movers:
+        row = prediction_snapshot.find(mover.symbol) if prediction_snapshot else None
+        if row is not None:
+            sectors[mover.symbol] = prediction_snapshot.columns["sector"][row]
+    return sectors
+
+
+def _build_hot_stocks(movers, grades, sectors):
+    """
+    ``movers`` are ranked ``hot_stocks.Mover``s, ``grades`` maps each symbol
+    to its latest monthly grade class and ``sectors`` to its sector, if known.
+    """
+    hot_list = []
+    for rank, mover in enumerate(movers, start=1):
+        sign = "+" if mover.change >= 0 else ""
+        hot_list.append(
+            {
+                "symbol": mover.symbol,
+                "company": mover.symbol,
+                "ai_score": grades.get(mover.symbol, "—"),
+                "change": f"{sign}{mover.change:.2f} ({sign}{mover.change_pct:.2f}%)",
+                "price": f"{mover.price:.2f}",
+                "avg_volume": mover.volume,
+                "sector": sectors.get(mover.symbol) or "N/A",
+                "rank": rank,
             }
+        )
+    return hot_list
+
+
+MARKET_DATA_UNAVAILABLE = {"error": "Market data is not available yet"}
+
+
+# Payloads computed by the market data refresher (see api/market_data.py),
+# or inline when MARKET_DATA_INLINE_FALLBACK is on.
+def _index_prices_payload():
+    with polygon.track_staleness() as report:
+        quoted = quotes.batch_last_two_closes(INDEX_ETFS.values())
+    closes = {label: quoted[symbol] for label, symbol in INDEX_ETFS.items()}
+    results = _build_index_prices(closes)
+    _mark_stale(results.values(), report)
+    return results
+
+
+def _sector_performance_payload():
+    with polygon.track_staleness() as report:
+        quoted = quotes.batch_last_two_closes(SECTOR_ETFS.values())
+    closes = {name: quoted[symbol] for name, symbol in SECTOR_ETFS.items()}
+    results = _build_sector_performance(closes)
+    _mark_stale(results, report)
+    return results
+
+
+def _hot_stocks_payload(list_name, in_predictions):
+    """
+    The first HOT_STOCKS_MAX_COUNT rows of a hot stocks list; requests take
+    their ``count`` from the front.
+    """
+    path, params = _hot_stocks_request()
+    with polygon.track_staleness() as report:
+        data = polygon.get(path, params, endpoint="market_snapshot")
+    prediction_snapshot = timeframes.get(timeframes.DEFAULT).snapshot() if in_predictions else None
+    movers = _hot_stock_movers(data, in_predictions, prediction_snapshot).top(
+        list_name, settings.HOT_STOCKS_MAX_COUNT
+    )
+
+    # fetch latest monthly grade class for every ticker in one query
+    latest = grades.latest_grades(mover.symbol for mover in movers)
+    grade_classes = {
+        mover.symbol: grades.grade_class(latest.get(mover.symbol))
+        for mover in movers
+    }
 
+    hot_list = _build_hot_stocks(
+        movers, grade_classes, _hot_stock_sectors(movers, prediction_snapshot)
+    )
+    _mark_stale(hot_list, report)
+    return hot_list
+
+
+def _watchlist_closes_payload():
+    """
+    (latest_close, prev_close) of every symbol on any user's watchlist.
+    """
+    symbols = normalize_symbols(Watchlist.objects.values_list("symbol", flat=True).distinct())
+    with polygon.track_staleness():
+        return quotes.batch_last_two_closes(symbols)
+
+
+# Index prices (Dow, S&P, Nasdaq via ETFs)
+@api_view(["GET"])
+@polygon.priority(scheduler.DASHBOARD)
+def get_index_prices(request):
+    try:
+        results = market_data.read(market_data.INDEX_PRICES, _index_prices_payload)
+        if results is None:
+            return Response(MARKET_DATA_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         return Response(results, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -82,62 +230,26 @@ def get_index_prices(request):
 
 # Hot stocks snapshot
 @api_view(["GET"])
+@polygon.priority(scheduler.DASHBOARD)
 def get_hot_stocks(request):
+    """
+    Top market movers from one full-market snapshot: ``list`` is gainers
+    (default), losers or volume, ``count`` defaults to HOT_STOCKS_COUNT and
+    ``universe=predictions`` keeps only symbols we have predictions for.
+    """
     try:
-        symbols = ["AAPL", "NVDA", "TSLA", "AMZN", "GOOGL", "MSFT", "META", "NFLX"]
-        tickers_param = ",".join(symbols)
-        url = (
-            f"{POLYGON_HOST}/v2/snapshot/locale/us/markets/stocks/tickers"
-            f"?tickers={tickers_param}&apiKey={POLYGON_API_KEY}"
-        )
-        data = requests.get(url).json()
-        tickers = data.get("tickers", [])
-
-        hot_list = []
-        for item in tickers:
-            sym = item["ticker"]
-            price = item["lastTrade"]["p"]
-            change = item["todaysChange"]
-            change_pct = item["todaysChangePerc"]
-            sign = "+" if change >= 0 else ""
-
-            # fetch latest monthly grade class
-            latest_date = (
-                MonthlyGrade.objects
-                .filter(symbol__iexact=sym)
-                .aggregate(Max("date"))["date__max"]
-            )
-            if latest_date:
-                mg = MonthlyGrade.objects.get(
-                    symbol__iexact=sym, date=latest_date
-                )
-                grade_class = mg.open_grade_class or "—"
-            else:
-                grade_class = "—"
-
-            hot_list.append(
-                {
-                    "symbol": sym,
-                    "company": sym,
-                    "ai_score": grade_class,
-                    "change": f"{sign}{change:.2f} ({sign}{change_pct:.2f}%)",
-                    "price": f"{price:.2f}",
-                    "avg_volume": item["day"]["v"],
-                    "sector": "N/A",
-                }
-            )
-
-        # sort by change_pct desc
-        hot_list.sort(
-            key=lambda x: float(x["change"].split("(")[-1].rstrip("%)")), 
-            reverse=True
+        query = _hot_stocks_query(request.GET)
+        if query is None:
+            return Response({"error": "Invalid hot stocks filter"}, status=400)
+        list_name, count, in_predictions = query
+
+        hot_list = market_data.read(
+            market_data.hot_stocks_key(list_name, in_predictions),
+            lambda: _hot_stocks_payload(list_name, in_predictions),
         )
-
-        # assign rank
-        for i, itm in enumerate(hot_list, start=1):
-            itm["rank"] = i
-
-        return Response(hot_list, status=200)
+        if hot_list is None:
+            return Response(MARKET_DATA_UNAVAILABLE, status=503)
+        return Response(hot_list[:max(count, 0)], status=200)
 
     except Exception as e:
         return Response({"error": str(e)}, status=500)
@@ -145,175 +257,578 @@ def get_hot_stocks(request):
 
 # Sector ETF performance
 @api_view(["GET"])
+@polygon.priority(scheduler.DASHBOARD)
 def get_sector_performance(request):
     try:
-        etf_map = {
-            "Technology": "XLK",
-            "Financials": "XLF",
-            "Energy": "XLE",
-            "Healthcare": "XLV",
-            "Consumer Discretionary": "XLY",
-            "Industrials": "XLI",
-            "Utilities": "XLU",
-            "Consumer Staples": "XLP",
-            "Materials": "XLB",
-            "Real Estate": "XLRE",
-        }
+        results = market_data.read(market_data.SECTOR_PERFORMANCE, _sector_performance_payload)
+        if results is None:
+            return Response(MARKET_DATA_UNAVAILABLE, status=503)
+        return Response(results, status=200)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+
+# Watchlist quotes
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@polygon.priority(scheduler.DASHBOARD)
+def watchlist_quotes(request):
+    """
+    Price and day change of every symbol on the user's watchlist, from the
+    closes the refresher keeps for all watchlisted symbols. A symbol added
+    since the last refresh has a null price and change.
+    """
+    try:
+        symbols = normalize_symbols(
+            Watchlist.objects.filter(user=request.user)
+            .order_by("-created_at")
+            .values_list("symbol", flat=True)
+        )
+        closes = market_data.get_cache().get(market_data.WATCHLIST_CLOSES)
+        if closes is None and not settings.MARKET_DATA_INLINE_FALLBACK:
+            return Response(MARKET_DATA_UNAVAILABLE, status=503)
+        closes = dict(closes or {})
+        missing = [symbol for symbol in symbols if symbol not in closes]
+        if missing and settings.MARKET_DATA_INLINE_FALLBACK:
+            with polygon.track_staleness():
+                closes.update(quotes.batch_last_two_closes(missing))
 
         results = []
-        for sector_name, symbol in etf_map.items():
-            latest_close, prev_close = _get_last_two_closes(symbol)
+        for symbol in symbols:
+            if symbol not in closes:
+                results.append({"symbol": symbol, "price": None, "change": None})
+                continue
+            latest_close, prev_close = closes[symbol]
             if latest_close is None:
-                results.append(
-                    {
-                        "sector": sector_name,
-                        "ticker": symbol,
-                        "price": "N/A",
-                        "day_change": "Data error",
-                    }
-                )
+                results.append({"symbol": symbol, "price": None, "change": "Data error"})
                 continue
-
-            results.append(
-                {
-                    "sector": sector_name,
-                    "ticker": symbol,
-                    "price": f"{latest_close:.2f}",
-                    "day_change": _format_change(latest_close, prev_close),
-                }
-            )
-
+            results.append({
+                "symbol": symbol,
+                "price": f"{latest_close:.2f}",
+                "change": _format_change(latest_close, prev_close),
+            })
         return Response(results, status=200)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
 
 # Predictions
+def _split_param(value):
+    """
+    Accept either a list of strings or a comma-separated string and return
+    its non-empty, stripped items. Raises ValueError for anything else, such
+    as a number in a JSON body.
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError("Expected a string or a list of strings")
+    return [item.strip() for item in value if item.strip()]
+
+
+def _requested_fields(request, allowed):
+    """
+    Parse the sparse fieldset in ``?fields=a,b``. Returns (fields, unknown):
+    fields is None when the parameter is absent or names no field (so
+    ``?fields=`` means every field), unknown lists any names not in
+    ``allowed``.
+    """
+    fields = _split_param(request.GET.get("fields"))
+    if not fields:
+        return None, []
+    return fields, [f for f in fields if f not in allowed]
+
+
+def _unknown_fields(unknown):
+    return Response({"error": f"Unknown fields: {', '.join(unknown)}"}, status=400)
+
+
+# Bulk prediction endpoints can also answer in a columnar JSON layout or as
+# MessagePack (see api/renderers.py).
+BULK_PREDICTION_RENDERERS = [
+    *api_settings.DEFAULT_RENDERER_CLASSES,
+    renderers.ColumnarJSONRenderer,
+    renderers.MessagePackRenderer,
+]
+
+
+def _requested_snapshot(request):
+    """
+    The snapshot for the request's ``timeFrame``, or None if it is invalid
+    or has no predictions; used for conditional GETs.
+    """
+    time_frame = timeframes.get(request.GET.get("timeFrame", timeframes.DEFAULT))
+    return time_frame.snapshot() if time_frame else None
+
+
+def _snapshot_rows(request, fast, snapshot, rows=None):
+    """
+    Serialize the snapshot rows in ``rows`` (default: all) for the
+    negotiated renderer: columnar for the compact formats, a list of
+    objects otherwise.
+    """
+    if request.accepted_renderer.format in renderers.COLUMNAR_FORMATS:
+        return fast.columns([snapshot.columns[s] for s in fast.sources], rows)
+    return fast.rows(snapshot.tuples(fast.sources, rows))
+
+
+def _narrow(time_frame, fields):
+    """
+    Return (fast serializer, band fields) for ``time_frame`` limited to
+    ``fields``, or everything when ``fields`` is None.
+    """
+    fast = time_frame.fast_serializer()
+    if fields is None:
+        return fast, list(time_frame.acc_fields)
+    return fast.only(fields), [f for f in time_frame.acc_fields if f in fields]
+
+
+def _snapshot_entry(snapshot, symbol, fast, bands):
+    """
+    The newest prediction of ``symbol`` as (payload, status) if it is in the
+    latest batch ``snapshot``, else None.
+    """
+    row = snapshot.find(symbol) if snapshot else None
+    if row is None:
+        return None
+    if not snapshot.has_bands(row):
+        return {"error": "Confidence interval data not found"}, 404
+    data = fast.row(snapshot.values(row, fast.sources))
+    data.update({f: v for f, v in snapshot.bands(row).items() if f in bands})
+    return data, 200
+
+
+def _prediction_entry(prediction, fast, bands):
+    """
+    ``prediction`` (a row annotated by ``predictions.with_bands``, or None
+    if the symbol has none) as (payload, status).
+    """
+    if prediction is None:
+        return {"error": "Prediction not found"}, 404
+    if not prediction.acc_found:
+        return {"error": "Confidence interval data not found"}, 404
+    data = fast.row([getattr(prediction, source) for source in fast.sources])
+    data.update(predictions.band_data(prediction, bands))
+    return data, 200
+
+
+def _database_entry(time_frame, symbol, fast, bands, narrowed):
+    """
+    The newest prediction of ``symbol`` as (payload, status), read with its
+    confidence bands in one query. When ``narrowed``, only the serialized
+    columns are selected.
+    """
+    prediction = predictions.latest_prediction(
+        time_frame.model, time_frame.acc_model, bands, symbol,
+        columns=fast.sources if narrowed else None,
+    )
+    return _prediction_entry(prediction, fast, bands)
+
+
 @api_view(["GET"])
 def prediction_detail(request, symbol):
     try:
-        time_frame = request.GET.get("timeFrame", "daily").lower()
-
-        if time_frame == "daily":
-            PredictionModel = PredsDaily
-            PredictionSerializer = PredsDailySerializer
-            AccModel = DailyAcc
-            AccSerializer = DailyAccSerializer
-        elif time_frame == "weekly":
-            PredictionModel = PredsWeekly
-            PredictionSerializer = PredsWeeklySerializer
-            AccModel = WeeklyAcc
-            AccSerializer = WeeklyAccSerializer
-        elif time_frame == "monthly":
-            PredictionModel = PredsMonthly
-            PredictionSerializer = PredsMonthlySerializer
-            AccModel = MonthlyAcc
-            AccSerializer = MonthlyAccSerializer
-        else:
+        symbol = normalize_symbol(symbol)
+        time_frame = timeframes.get(request.GET.get("timeFrame", timeframes.DEFAULT))
+        if time_frame is None:
             return Response({"error": "Invalid time frame"}, status=400)
 
-        latest_date = (
-            PredictionModel.objects.filter(symbol__iexact=symbol).aggregate(Max("date"))[
-                "date__max"
-            ]
+        fields, unknown = _requested_fields(
+            request, time_frame.fast_serializer().names + tuple(time_frame.acc_fields)
         )
-        if not latest_date:
-            return Response({"error": "Prediction not found"}, status=404)
-
-        prediction = PredictionModel.objects.get(
-            symbol__iexact=symbol, date=latest_date
+        if unknown:
+            return _unknown_fields(unknown)
+        fast, bands = _narrow(time_frame, fields)
+
+        # Served from the latest batch; otherwise its newest row (if any) is
+        # older and is read from the database.
+        data, status_code = (
+            _snapshot_entry(time_frame.snapshot(), symbol, fast, bands)
+            or _database_entry(time_frame, symbol, fast, bands, fields is not None)
         )
-        prediction_serializer = PredictionSerializer(prediction)
-
-        acc_data = AccModel.objects.get(symbol__iexact=symbol)
-        acc_serializer = AccSerializer(acc_data)
-
-        data = prediction_serializer.data
-        data.update(acc_serializer.data)
-        return Response(data)
-    except PredictionModel.DoesNotExist:
-        return Response({"error": "Prediction not found"}, status=404)
-    except AccModel.DoesNotExist:
-        return Response({"error": "Confidence interval data not found"}, status=404)
+        return Response(data, status=status_code)
     except Exception as e:
         return Response({"error": "An error occurred"}, status=500)
 
 
 @api_view(["GET"])
+def prediction_horizons(request, symbol):
+    """
+    Latest prediction plus confidence bands of one symbol for several time
+    frames: ?timeFrames=daily,weekly,monthly (default all) and optional
+    ?fields=. Returns {time_frame: prediction | {"error": ...}}.
+
+    Horizons in their latest batch come from the snapshots; the others are
+    read from the database, one query per table.
+    """
+    try:
+        symbol = normalize_symbol(symbol)
+        names = _split_param(request.GET.get("timeFrames")) or list(timeframes.TIME_FRAMES)
+        requested = [timeframes.get(name) for name in dict.fromkeys(n.lower() for n in names)]
+        if None in requested:
+            return Response({"error": "Invalid time frame"}, status=400)
+
+        allowed = set()
+        for time_frame in requested:
+            allowed.update(time_frame.fast_serializer().names, time_frame.acc_fields)
+        fields, unknown = _requested_fields(request, allowed)
+        if unknown:
+            return _unknown_fields(unknown)
+
+        results = {}
+        for time_frame in requested:
+            fast, bands = _narrow(time_frame, fields)
+            entry = _snapshot_entry(time_frame.snapshot(), symbol, fast, bands)
+            if entry is None:
+                entry = _database_entry(time_frame, symbol, fast, bands, fields is not None)
+            results[time_frame.name] = entry[0]
+
+        return Response(results)
+    except Exception:
+        return Response({"error": "Error fetching predictions"}, status=500)
+
+
+@api_view(["GET", "POST"])
+def batch_predictions(request):
+    """
+    Latest prediction plus confidence bands for many symbols and time frames.
+
+    GET ?symbols=AAPL,MSFT&timeFrames=daily,weekly or POST
+    {"symbols": [...], "timeFrames": [...]}; timeFrames defaults to all three.
+    Returns {symbol: {time_frame: prediction | {"error": ...}}}, using one
+    query per time frame however many symbols are requested.
+    """
+    try:
+        params = request.data if request.method == "POST" else request.GET
+        if not isinstance(params, dict):
+            return Response({"error": "Request body must be a JSON object"}, status=400)
+        try:
+            symbols = normalize_symbols(_split_param(params.get("symbols")))
+            names = _split_param(params.get("timeFrames")) or list(timeframes.TIME_FRAMES)
+        except ValueError:
+            return Response(
+                {"error": "symbols and timeFrames must be strings or lists of strings"},
+                status=400,
+            )
+        time_frames = [timeframes.get(name) for name in dict.fromkeys(n.lower() for n in names)]
+
+        if not symbols:
+            return Response({"error": "No symbols provided"}, status=400)
+        if len(symbols) > settings.PREDICTION_BATCH_MAX_SYMBOLS:
+            return Response(
+                {"error": f"At most {settings.PREDICTION_BATCH_MAX_SYMBOLS} symbols per request"},
+                status=400,
+            )
+        if None in time_frames:
+            return Response({"error": "Invalid time frame"}, status=400)
+
+        results = {symbol: {} for symbol in symbols}
+        for time_frame in time_frames:
+            fast, bands = _narrow(time_frame, None)
+            snapshot = time_frame.snapshot()
+            entries = {s: _snapshot_entry(snapshot, s, fast, bands) for s in symbols}
+            # Symbols missing from the latest batch fall back to the database.
+            missing = [s for s, entry in entries.items() if entry is None]
+            if missing:
+                latest = predictions.latest_predictions(
+                    time_frame.model, time_frame.acc_model, bands, missing
+                )
+                for symbol in missing:
+                    entries[symbol] = _prediction_entry(latest.get(symbol), fast, bands)
+            for symbol, (data, _) in entries.items():
+                results[symbol][time_frame.name] = data
+
+        return Response(results)
+    except Exception:
+        return Response({"error": "Error fetching batch predictions"}, status=500)
+
+
+def _optional_float(value):
+    return float(value) if value not in (None, "") else None
+
+
+@api_view(["GET"])
+@renderer_classes(BULK_PREDICTION_RENDERERS)
+@snapshot_conditional(_requested_snapshot)
 def top_predictions(request):
+    """
+    Top ``count`` predictions of the latest batch (default 20).
+
+    ``rankBy`` is pred_close (default), pred_open, pred_close_weighted or
+    pred_open_weighted (the change times the symbol's live accuracy).
+    ``sector``, ``minMktCap`` and ``maxMktCap`` filter the ranked rows, and
+    ``fields`` picks the columns returned. Also available in the columnar
+    and MessagePack formats.
+    """
     try:
-        time_frame = request.GET.get("timeFrame", "daily").lower()
+        time_frame = timeframes.get(request.GET.get("timeFrame", timeframes.DEFAULT))
         count = int(request.GET.get("count", 20))
+        rank_by = request.GET.get("rankBy", "pred_close")
+        sector = request.GET.get("sector") or None
 
-        if time_frame == "daily":
-            PredictionModel = PredsDaily
-            PredictionSerializer = PredsDailySerializer
-        elif time_frame == "weekly":
-            PredictionModel = PredsWeekly
-            PredictionSerializer = PredsWeeklySerializer
-        elif time_frame == "monthly":
-            PredictionModel = PredsMonthly
-            PredictionSerializer = PredsMonthlySerializer
-        else:
+        if time_frame is None:
             return Response({"error": "Invalid time frame"}, status=400)
-
-        latest_date = PredictionModel.objects.aggregate(Max("date"))["date__max"]
-        if not latest_date:
+        if rank_by not in prediction_store.RANKINGS:
+            return Response({"error": "Invalid rankBy"}, status=400)
+        try:
+            min_mkt_cap = _optional_float(request.GET.get("minMktCap"))
+            max_mkt_cap = _optional_float(request.GET.get("maxMktCap"))
+        except ValueError:
+            return Response({"error": "Invalid market cap filter"}, status=400)
+        fast = time_frame.fast_serializer()
+        fields, unknown = _requested_fields(request, fast.names)
+        if unknown:
+            return _unknown_fields(unknown)
+        if fields is not None:
+            fast = fast.only(fields)
+
+        snapshot = time_frame.snapshot()
+        if not snapshot:
             return Response({"error": "No predictions available"}, status=404)
 
-        predictions = PredictionModel.objects.filter(date=latest_date).annotate(
-            predicted_change_percentage=ExpressionWrapper(
-                F("pred_close") * 100, output_field=FloatField()
-            )
-        )
-
-        top_stocks = predictions.order_by("-predicted_change_percentage")[:count]
-        serializer = PredictionSerializer(top_stocks, many=True)
-        return Response(serializer.data)
+        # Rankings are precomputed per batch, so this is a slice or a short walk
+        rows = snapshot.top(rank_by, count, sector, min_mkt_cap, max_mkt_cap)
+        return Response(_snapshot_rows(request, fast, snapshot, rows))
     except Exception:
         return Response({"error": "Error fetching top predictions"}, status=500)
 
 
+def _stream_predictions(snapshot, fast):
+    """
+    Yield the JSON array of every snapshot row, serializing and rendering
+    PREDICTION_STREAM_CHUNK_SIZE rows at a time. The bytes are identical to
+    rendering the whole list at once.
+    """
+    chunk_size = settings.PREDICTION_STREAM_CHUNK_SIZE
+    yield b"["
+    separator = b""
+    for start in range(0, len(snapshot), chunk_size):
+        rows = range(start, min(start + chunk_size, len(snapshot)))
+        items = fast_serializers.render(fast.rows(snapshot.tuples(fast.sources, rows)))[1:-1]
+        if items:
+            yield separator + items
+            separator = b","
+    yield b"]"
+
+
 @api_view(["GET"])
+@renderer_classes(BULK_PREDICTION_RENDERERS)
+@snapshot_conditional(_requested_snapshot)
 def all_predictions(request):
+    """
+    Every prediction of the latest batch, in symbol order, limited to the
+    columns in ``fields`` if given. With ``stream=1`` the JSON body is
+    streamed in chunks instead of built in memory first. Also available in
+    the columnar and MessagePack formats.
+    """
     try:
-        time_frame = request.GET.get("timeFrame", "daily").lower()
-
-        if time_frame == "daily":
-            PredictionModel = PredsDaily
-            PredictionSerializer = PredsDailySerializer
-        elif time_frame == "weekly":
-            PredictionModel = PredsWeekly
-            PredictionSerializer = PredsWeeklySerializer
-        elif time_frame == "monthly":
-            PredictionModel = PredsMonthly
-            PredictionSerializer = PredsMonthlySerializer
-        else:
+        time_frame = timeframes.get(request.GET.get("timeFrame", timeframes.DEFAULT))
+        if time_frame is None:
             return Response({"error": "Invalid time frame"}, status=400)
-
-        latest_date = PredictionModel.objects.aggregate(Max("date"))["date__max"]
-        if not latest_date:
+        fast = time_frame.fast_serializer()
+        fields, unknown = _requested_fields(request, fast.names)
+        if unknown:
+            return _unknown_fields(unknown)
+        if fields is not None:
+            fast = fast.only(fields)
+
+        snapshot = time_frame.snapshot()
+        if not snapshot:
             return Response({"error": "No predictions available"}, status=404)
 
-        predictions = (
-            PredictionModel.objects.filter(date=latest_date)
-            .annotate(
-                predicted_change_percentage=ExpressionWrapper(
-                    F("pred_close") * 100, output_field=FloatField()
-                )
+        # Snapshot rows are already in symbol order
+        if request.GET.get("stream") == "1" and request.accepted_renderer.format == "json":
+            return StreamingHttpResponse(
+                _stream_predictions(snapshot, fast),
+                content_type="application/json",
             )
-            .order_by("symbol")
+        return Response(_snapshot_rows(request, fast, snapshot))
+    except Exception:
+        return Response({"error": "Error fetching all predictions"}, status=500)
+
+
+# Screener
+SCREENER_FLAGS = {
+    "aboveSma": "above_sma",
+    "belowSma": "below_sma",
+    "aboveEma": "above_ema",
+    "belowEma": "below_ema",
+    "macdAboveSignal": "macd_above_signal",
+    "macdBelowSignal": "macd_below_signal",
+}
+
+SCREENER_BOUNDS = {
+    "rsiBelow": "rsi_below",
+    "rsiAbove": "rsi_above",
+    "minPredClose": "min_pred_close",
+    "maxPredClose": "max_pred_close",
+}
+
+
+@api_view(["GET"])
+def screener_view(request):
+    """
+    Symbols of the daily prediction universe matching every given condition
+    on their latest close, SMA(50), EMA(50), MACD(12/26/9) and RSI(14), their
+    latest daily prediction and their monthly grade class. Computed from the
+    local bar store once per trading day (see ``api.screener``).
+
+    Conditions: ``rsiBelow``, ``rsiAbove``, ``minPredClose``, ``maxPredClose``
+    (numbers); ``aboveSma``, ``belowSma``, ``aboveEma``, ``belowEma``,
+    ``macdAboveSignal``, ``macdBelowSignal`` (set to 1); ``gradeClass``
+    (comma-separated) and ``sector``. At most ``count`` rows (default 100).
+    """
+    try:
+        try:
+            conditions = {
+                name: _optional_float(request.GET.get(param))
+                for param, name in SCREENER_BOUNDS.items()
+            }
+            count = int(request.GET.get("count", 100))
+        except ValueError:
+            return Response({"error": "Invalid screener filter"}, status=400)
+        conditions.update(
+            {name: request.GET.get(param) == "1" for param, name in SCREENER_FLAGS.items()}
         )
+        conditions["grade_classes"] = _split_param(request.GET.get("gradeClass"))
+        conditions["sector"] = request.GET.get("sector") or None
 
-        serializer = PredictionSerializer(predictions, many=True)
-        return Response(serializer.data)
+        screen = screener.get_screen()
+        if screen is None:
+            return Response({"error": "No predictions available"}, status=404)
+
+        matches = screen.filter(**conditions)
+        return Response({
+            "as_of": screen.as_of,
+            "matches": len(matches),
+            "results": [screen.row(i) for i in matches[:max(count, 0)]],
+        })
     except Exception:
-        return Response({"error": "Error fetching all predictions"}, status=500)
+        return Response({"error": "Error running screener"}, status=500)
 
 
 
 # Stock detail 
+def _stock_detail_requests(symbol: str):
+    """
+    Return section name -> (path, params, endpoint) for every upstream call
+    stock_detail makes. The calls are independent of each other.
+    """
+    reqs = {
+        "snapshot": (
+            f"/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}", None, "snapshot",
+        ),
+        "reference": (f"/v3/reference/tickers/{symbol}", None, "reference"),
+    }
+    return reqs
+
+
+EMPTY_GRADE = {"open_grade_sign":None,"open_grade_class":None}
+
+STOCK_SECTION_DEFAULTS = {
+    "snapshot": {}, "reference": {},
+}
+
+
+def _extract_stock_section(name: str, body):
+    if name == "snapshot":
+        return body.get("ticker") or {}
+    return body.get("results") or {}
+
+
+# Daily bars returned as chart_data. The indicators use every stored bar so
+# the EMAs have converged.
+CHART_DAYS = 365
+
+
+def _stock_bars(symbol: str):
+    return bar_store.bars(symbol)
+
+
+def _build_chart_data(bars):
+    """
+    ``bars`` is a (6, n) slice of the bar store; each column is converted
+    once rather than per bar.
+    """
+    bars = bar_store.between(bars, start=datetime.utcnow().date() - timedelta(days=CHART_DAYS))
+    columns = zip(
+        bar_store.dates(bars),
+        *(bars[i].tolist() for i in (bar_store.O, bar_store.H, bar_store.L, bar_store.C, bar_store.V)),
+    )
+    return [
+        {
+          "date":    d,
+          "open":    o, "high":h, "low":l,
+          "close":   c, "volume":v,
+        } for d, o, h, l, c, v in columns
+    ]
+
+
+def _build_indicators(bars):
+    """
+    SMA/EMA/MACD/RSI computed from the last ``INDICATOR_LOOKBACK_BARS``
+    daily closes, in the shape of Polygon's indicator ``values`` (see
+    ``api.indicators``).
+    """
+    bars = bars[:, -settings.INDICATOR_LOOKBACK_BARS:]
+    return {
+        name: indicators.polygon_values(name, bars[bar_store.T], bars[bar_store.C], **params)
+        for name, params in indicators.PARAMS.items()
+    }
+
+
+def _build_fundamentals(meta):
+    return {
+        "name":         meta.get("name"),
+        "description":  meta.get("description"),
+        "homepage_url": meta.get("homepage_url"),
+        "list_date":    meta.get("list_date"),
+        "cik":          meta.get("cik"),
+        "currency":     meta.get("currency_name"),
+        "employees":    meta.get("total_employees"),
+        "sic_code":     meta.get("sic_code"),
+        "sic_description": meta.get("sic_description"),
+        "address":      meta.get("address"),
+        "phone":        meta.get("phone_number"),
+        "exchange":     meta.get("primary_exchange"),
+        "market_cap":   meta.get("market_cap"),
+    }
+
+
+def _build_stock_detail(symbol, fetched, bars, grade):
+    """
+    Assemble the stock_detail payload from the gathered upstream sections
+    (see ``_stock_detail_requests``), the stored daily bars and the
+    serialized monthly grade.
+    """
+    snap = fetched["snapshot"]
+    cp = snap.get("lastTrade",{}).get("p",0.0)
+    dc = snap.get("todaysChange",0.0)
+    dp = snap.get("todaysChangePerc",0.0)
+    sign = "+" if dc>=0 else ""
+
+    return {
+        "symbol":               symbol,
+        "current_price":        f"{cp:.2f}",
+        "day_change":           f"{sign}{dc:.2f}",
+        "day_change_percent":   f"{sign}{dp:.2f}%",
+        "chart_data":           _build_chart_data(bars),
+        "fundamentals":         _build_fundamentals(fetched["reference"]),
+        "financials": {
+            # session vs prev
+            "today":     snap.get("day",{}),
+            "prevDay":   snap.get("prevDay",{}),
+            "lastQuote": snap.get("lastQuote",{}),
+            "indicators": _build_indicators(bars),
+        },
+        "monthly_grade":        grade,
+    }
+
+
 @api_view(["GET"])
+@polygon.priority(scheduler.INTERACTIVE)
 def stock_detail(request, symbol):
     """
     Returns:
@@ -322,125 +837,78 @@ def stock_detail(request, symbol):
       • fundamentals: metadata + description
       • financials: snapshot + indicators
       • monthly_grade
+
+    The snapshot and reference calls run concurrently on the shared fan-out
+    pool while the daily bars are read from the local bar store and the grade
+    from the database. The chart and the indicators are both computed from
+    the bars. A failed call leaves its section empty rather than failing the
+    whole response.
     """
     try:
-        # 1) Snapshot & price change
-        snap = requests.get(
-            f"{POLYGON_HOST}/v2/snapshot/locale/us/markets/stocks/tickers/{symbol}"
-            f"?apiKey={POLYGON_API_KEY}"
-        ).json().get("ticker",{})
-        cp = snap.get("lastTrade",{}).get("p",0.0)
-        dc = snap.get("todaysChange",0.0)
-        dp = snap.get("todaysChangePerc",0.0)
-        sign = "+" if dc>=0 else ""
-        # session vs prev
-        today     = snap.get("day",{})
-        prevDay   = snap.get("prevDay",{})
-        lastQuote = snap.get("lastQuote",{})
-
-        # 2) 1-year bars + chart_data
-        end   = datetime.utcnow().date()
-        start = end - timedelta(days=365)
-        bars  = requests.get(
-            f"{POLYGON_HOST}/v2/aggs/ticker/{symbol}/range/1/day/"
-            f"{start}/{end}?adjusted=true&sort=asc&limit=500&apiKey={POLYGON_API_KEY}"
-        ).json().get("results",[])
-        chart_data = [
-            {
-              "date":    datetime.utcfromtimestamp(b["t"]/1000).strftime("%Y-%m-%d"),
-              "open":    b["o"], "high":b["h"], "low":b["l"],
-              "close":   b["c"], "volume":b["v"],
-            } for b in bars
-        ]
-
-        # 3) Fundamentals metadata
-        meta = requests.get(
-            f"{POLYGON_HOST}/v3/reference/tickers/{symbol}?apiKey={POLYGON_API_KEY}"
-        ).json().get("results",{}) or {}
-        fundamentals = {
-            "name":         meta.get("name"),
-            "description":  meta.get("description"),
-            "homepage_url": meta.get("homepage_url"),
-            "list_date":    meta.get("list_date"),
-            "cik":          meta.get("cik"),
-            "currency":     meta.get("currency_name"),
-            "employees":    meta.get("total_employees"),
-            "sic_code":     meta.get("sic_code"),
-            "sic_description": meta.get("sic_description"),
-            "address":      meta.get("address"),
-            "phone":        meta.get("phone_number"),
-            "exchange":     meta.get("primary_exchange"),
-            "market_cap":   meta.get("market_cap"),
+        symbol = normalize_symbol(symbol)
+        calls = {
+            name: lambda name=name, req=req: _extract_stock_section(
+                name, polygon.get(req[0], req[1], endpoint=req[2])
+            )
+            for name, req in _stock_detail_requests(symbol).items()
         }
+        with polygon.track_staleness() as report:
+            pending = polygon.submit_all(calls)
+            bars = _stock_bars(symbol)
 
-        # 4) Technical indicators
-        def _fetch_vals(url):
-            try:
-                return requests.get(url).json().get("results",{}).get("values",[])
-            except (ValueError, JSONDecodeError):
-                return []
-        base = f"{POLYGON_HOST}/v1/indicators"
-        sma   = _fetch_vals(f"{base}/sma/{symbol}?timespan=day&adjusted=true&window=50&series_type=close&order=desc&apiKey={POLYGON_API_KEY}")
-        ema   = _fetch_vals(f"{base}/ema/{symbol}?timespan=day&adjusted=true&window=50&series_type=close&order=desc&apiKey={POLYGON_API_KEY}")
-        macd  = _fetch_vals(f"{base}/macd/{symbol}?timespan=day&adjusted=true&short_window=12&long_window=26&signal_window=9&series_type=close&order=desc&apiKey={POLYGON_API_KEY}")
-        rsi   = _fetch_vals(f"{base}/rsi/{symbol}?timespan=day&adjusted=true&window=14&series_type=close&order=desc&apiKey={POLYGON_API_KEY}")
-
-        # 5) Monthly grade 
-        latest = MonthlyGrade.objects.filter(symbol__iexact=symbol).aggregate(Max("date"))["date__max"]
-        if latest:
-            mg = MonthlyGrade.objects.get(symbol__iexact=symbol, date=latest)
-            grade = MonthlyGradeSerializer(mg).data
-        else:
-            grade = {"open_grade_sign":None,"open_grade_class":None}
+        # Monthly grade 
+        mg = grades.latest_grades([symbol]).get(symbol)
+        grade = MonthlyGradeSerializer(mg).data if mg else EMPTY_GRADE
 
-        return Response({
-            "symbol":               symbol.upper(),
-            "current_price":        f"{cp:.2f}",
-            "day_change":           f"{sign}{dc:.2f}",
-            "day_change_percent":   f"{sign}{dp:.2f}%",
-            "chart_data":           chart_data,
-            "fundamentals":         fundamentals,
-            "financials": {
-                "today":     today,
-                "prevDay":   prevDay,
-                "lastQuote": lastQuote,
-                "indicators": {
-                  "sma":  sma,
-                  "ema":  ema,
-                  "macd": macd,
-                  "rsi":  rsi,
-                }
-            },
-            "monthly_grade":        grade,
-        })
+        payload = _build_stock_detail(
+            symbol, polygon.collect(pending, STOCK_SECTION_DEFAULTS), bars, grade
+        )
+        _mark_stale([payload], report)
+        return Response(payload)
     except Exception as e:
         traceback.print_exc()
         return Response({"error":str(e)},status=500)
 
 # Symbol search
+def _search_request(query: str):
+    return (
+        "/v3/reference/tickers",
+        {"search": query, "active": "true", "limit": 5},
+    )
+
+
+def _build_search_results(data):
+    matches = data.get("results", [])
+    return [
+        {
+            "symbol": m.get("ticker", ""),
+            "name": m.get("name", ""),
+            "region": m.get("primary_exchange", ""),
+        }
+        for m in matches
+    ]
+
+
 @api_view(["GET"])
+@polygon.priority(scheduler.SEARCH)
 def search_stocks(request):
     query = request.GET.get("query", "").strip()
     if not query:
         return Response([], status=status.HTTP_200_OK)
 
     try:
-        url = (
-            f"{POLYGON_HOST}/v3/reference/tickers"
-            f"?search={query}&active=true&limit=5&apiKey={POLYGON_API_KEY}"
-        )
-        data = requests.get(url).json()
-        matches = data.get("results", [])
-
-        results = [
-            {
-                "symbol": m.get("ticker", ""),
-                "name": m.get("name", ""),
-                "region": m.get("primary_exchange", ""),
-            }
-            for m in matches
-        ]
-
+        path, params = _search_request(query)
+        with polygon.track_staleness() as report:
+            data = polygon.get(path, params, endpoint="search")
+        results = _build_search_results(data)
+        _mark_stale(results, report)
         return Response(results, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Upstream client health (cache, circuit breakers, request coalescing)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def upstream_stats(request):
+    return Response(polygon.upstream_stats(), status=status.HTTP_200_OK)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -76,6 +79,12 @@ TEMPLATES = [
 WSGI_APPLICATION = "goldenFleeceBackend.wsgi.application"
 
 
+# Serve the market-data endpoints from the native async views in
+# api/async_views.py. asgi.py turns this on; WSGI deployments keep the
+# sync views.
+MARKET_DATA_ASYNC_VIEWS = os.environ.get("MARKET_DATA_ASYNC_VIEWS", "0") == "1"
+
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -152,3 +161,147 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
 }
+
+# Polygon.io market data
+# https://polygon.io/docs/stocks
+
+POLYGON_API_KEY = os.environ.get("POLYGON_API_KEY")
+if not POLYGON_API_KEY:
+    raise ImproperlyConfigured("Set the POLYGON_API_KEY environment variable")
+
+POLYGON_HOST = "https://api.polygon.io"
+
+# Size of the keep-alive connection pool each worker keeps open to Polygon.
+POLYGON_POOL_SIZE = 20
+
+# Transient failures (connection errors and 5xx) are retried this many
+# times, sleeping backoff_factor * 2 ** (retry - 1) seconds between attempts.
+POLYGON_MAX_RETRIES = 2
+POLYGON_BACKOFF_FACTOR = 0.3
+
+# Upper bound on concurrent connections from one async worker's event loop.
+POLYGON_ASYNC_POOL_SIZE = 200
+
+# Threads per worker used to run independent Polygon calls concurrently.
+POLYGON_FANOUT_WORKERS = 16
+
+# (connect, read) timeouts in seconds, keyed by upstream endpoint family.
+POLYGON_TIMEOUTS = {
+    "default": (3.05, 10),
+    "aggs": (3.05, 10),
+    "snapshot": (3.05, 5),
+    "market_snapshot": (3.05, 20),
+    "reference": (3.05, 5),
+    "indicators": (3.05, 5),
+    "search": (3.05, 3),
+}
+
+# Upstream response cache (see api/upstream_cache.py). TTLs in seconds apply
+# while the regular session is open; after the close, the families listed in
+# POLYGON_CACHE_UNTIL_OPEN stay valid until the next open.
+POLYGON_CACHE_MAX_ENTRIES = 2048
+
+POLYGON_CACHE_TTLS = {
+    "default": 60,
+    "aggs": 60,
+    "snapshot": 15,
+    "market_snapshot": 60,
+    "indicators": 300,
+    "reference": 24 * 60 * 60,
+    "search": 60 * 60,
+}
+
+POLYGON_CACHE_UNTIL_OPEN = {"aggs", "snapshot", "market_snapshot", "indicators"}
+
+# For this many seconds after an entry expires it is still served (flagged
+# stale) while a background refresh runs.
+POLYGON_STALE_WHILE_REVALIDATE = 5 * 60
+
+# Per-endpoint circuit breaker: open after this many consecutive failures and
+# retry the upstream after POLYGON_BREAKER_RESET seconds. A probe that has not
+# reported back after POLYGON_BREAKER_PROBE_TIMEOUT seconds (longer than a
+# call with all its retries can take) is presumed lost and another is allowed.
+POLYGON_BREAKER_FAILURES = 5
+POLYGON_BREAKER_RESET = 30
+POLYGON_BREAKER_PROBE_TIMEOUT = 90
+
+# Quota scheduler for all Polygon traffic (see api/scheduler.py). The bucket
+# refills at POLYGON_RATE_PER_SECOND tokens up to POLYGON_BURST. Both are the
+# account's limits across all processes: each process gets a bucket for
+# 1/POLYGON_WORKERS of them, so set POLYGON_WORKERS to the number of web
+# workers plus one for the refresh_market_data process. Per lane:
+# priority (lower is served first), max_wait in seconds before the call is
+# dropped, max_queue waiting callers, and the fraction of the bucket that
+# must stay available for higher-priority lanes.
+POLYGON_RATE_PER_SECOND = 50
+POLYGON_BURST = 100
+POLYGON_WORKERS = int(os.environ.get("POLYGON_WORKERS", "1"))
+
+POLYGON_LANES = {
+    "interactive": {"priority": 0, "max_wait": 5.0, "max_queue": 200, "reserve": 0.0},
+    "dashboard": {"priority": 1, "max_wait": 3.0, "max_queue": 200, "reserve": 0.0},
+    "search": {"priority": 2, "max_wait": 1.0, "max_queue": 50, "reserve": 0.1},
+    "background": {"priority": 3, "max_wait": 0.0, "max_queue": 20, "reserve": 0.25},
+}
+
+# Most symbols accepted by one /api/predictions/batch/ request.
+PREDICTION_BATCH_MAX_SYMBOLS = 200
+
+# Latest prediction batch held in memory per worker (see
+# api/prediction_store.py): the database is probed for a new batch at most
+# every PROBE_INTERVAL seconds and fully reloaded at least every MAX_AGE.
+PREDICTION_SNAPSHOT_PROBE_INTERVAL = 30
+PREDICTION_SNAPSHOT_MAX_AGE = 60 * 60
+
+# Rows serialized per chunk by /api/all-predictions/?stream=1.
+PREDICTION_STREAM_CHUNK_SIZE = 500
+
+# Rendered (and gzipped) top/all prediction bodies kept per worker, keyed by
+# snapshot version and request variant (see api/conditional.py).
+PREDICTION_RESPONSE_CACHE_ENTRIES = 256
+
+# Daily OHLCV bars kept on disk, one .npy file per symbol (see
+# api/bar_store.py). A symbol's first sync fetches BAR_STORE_HISTORY_DAYS of
+# history; later syncs only fetch the bars after the last stored day.
+BAR_STORE_DIR = os.environ.get("BAR_STORE_DIR", str(BASE_DIR / "var" / "bars"))
+BAR_STORE_HISTORY_DAYS = 3 * 365
+
+# Closes stock_detail computes its indicators from (see api/indicators.py).
+# The EMAs forget older prices geometrically, so a longer history would not
+# change the values returned, only the cost of every request.
+INDICATOR_LOOKBACK_BARS = 500
+
+# Closes per symbol loaded into the screener's matrix (see api/screener.py);
+# enough for the 50-day EMA to converge.
+SCREENER_LOOKBACK_BARS = 400
+
+# /api/hot-stocks/ (see api/hot_stocks.py): rows returned by default, the
+# most a request may ask for (the heap size), and the price and session
+# volume a ticker needs to be ranked at all.
+HOT_STOCKS_COUNT = 8
+HOT_STOCKS_MAX_COUNT = 50
+HOT_STOCKS_MIN_PRICE = 1.0
+HOT_STOCKS_MIN_VOLUME = 100_000
+
+# Dashboard data precomputed by `manage.py refresh_market_data` (see
+# api/market_data.py) into a cache every worker shares. The refresher runs
+# every MARKET_DATA_REFRESH_OPEN seconds during the regular session and every
+# MARKET_DATA_REFRESH_CLOSED seconds (or at the next open, if sooner)
+# otherwise; entries expire after the cache's TIMEOUT if it stops. Without an
+# entry the views answer 503, or compute it inline when
+# MARKET_DATA_INLINE_FALLBACK is on (MARKET_DATA_INLINE_FALLBACK=1 in the
+# environment, e.g. in development without a refresher running).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "market_data": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("MARKET_DATA_CACHE_DIR", str(BASE_DIR / "var" / "market_data")),
+        "TIMEOUT": 60 * 60,
+    },
+}
+
+MARKET_DATA_REFRESH_OPEN = 15
+MARKET_DATA_REFRESH_CLOSED = 10 * 60
+MARKET_DATA_INLINE_FALLBACK = os.environ.get("MARKET_DATA_INLINE_FALLBACK", "0") == "1"